@@ -1,33 +1,57 @@
+import instrument # First, so the startup time of --profile includes the other imports
+import sys
 import ui
 import pickle
+import signal
+from board import Board, MISS, create_board
+from bot import create_bot, strongest_bot
+from engine import GameState, is_placement_possible
+from fleet import place_randomly, random_board
+from instrument import timed, timer
+from scoreboard import (PERIODS, PERIODS_DIRECTORY, SCOREBOARD_BACKENDS, SCOREBOARD_FILE, LazyScoreboard, PeriodScoreboard,
+                        ScoreboardLog, WriteBehindScoreboard)
+from stats import RANKINGS, STATS_FILE, PlayerStats, WriteBehindStats
+
+instrument.milestone('import') # Time until all modules are imported, reported by --profile
 
 SHIPS = [("Speedboat", 2), ("Destroyer", 4), ("Attacker", 3), ("Attacker", 3), ("Aircraft Carrier", 5), ]
 
+BOT_PLAYER = "Computer" # Name of player B when playing against a bot, no human player may take it
 
-def main():
-    # Load the scoreboard from a file at the beginning
-    scoreboard = load_scoreboard()
-    
-    while True:
-        items = menu() # Show the menu and get the user's choice
-
-        if items == 1:
-            # Start a new game of Battleships and update the scoreboard if there's a winner
-            winner = play_battleships()
-
-            if winner:
-                # Update the scoreboard and save it to the file
-                scoreboard[winner] = scoreboard.get(winner, 0) + 1  
-                save_scoreboard(scoreboard)
-
-        elif items == 2:
-            # Display the scoreboard
-            ui.display_headline("scoreboard battleships")
-            ui.display_scoreboard(scoreboard)
-            ui.prompt("Press ENTER to return to the menu")
-            
-        elif items == 3:
-            return None # Exit the program
+SCOREBOARD_PAGE = 20 # Players shown per page of the scoreboard
+
+
+def main(scoreboard_backend='file'):
+    # The scoreboard is only read when it is first used, by a win or the scoreboard option, so the menu shows up at once.
+    # Wins are written in the background, so returning to the menu never waits for the disk.
+    scoreboard = WriteBehindScoreboard(LazyScoreboard(scoreboard_backend))
+    periods = WriteBehindScoreboard(PeriodScoreboard(PERIODS_DIRECTORY)) # Wins of the last days for the daily, weekly and monthly leaderboards
+    stats = WriteBehindStats(PlayerStats(STATS_FILE)) # Statistics of every finished game, also recorded in the background
+
+    try:
+        while True:
+            items = menu() # Show the menu and get the user's choice
+
+            if items in (1, 4):
+                # Start a new game of Battleships, against the computer for choice 4, and update the scoreboard if there's a winner
+                winner = play_battleships(bot=strongest_bot() if items == 4 else None, stats=stats)
+
+                if winner and winner != BOT_PLAYER:
+                    # Update the scoreboard, only the win is written instead of the whole scoreboard, wins of the computer are not ranked
+                    record_win(scoreboard, winner)
+                    periods.record_win(winner)
+
+            elif items == 2:
+                # Display the scoreboard, the leaderboards of the last days and the rankings of the statistics are other views of it
+                show_scoreboard(scoreboard, periods, stats)
+
+            elif items == 3:
+                return None # Exit the program
+
+    finally:
+        scoreboard.close() # Write the pending wins and games, also if the program is interrupted
+        periods.close()
+        stats.close()
 
 
 
@@ -35,10 +59,12 @@ def main():
 
 def menu():
     # Menu items to display to the user
-    items = ["Play Battleships", "Scoreboard", "Exit"]
+    # Playing against the computer comes last, so the numbers of the other items stay the same
+    items = ["Play Battleships", "Scoreboard", "Exit", "Play against the computer"]
 
     ui.display_headline("menu battleships")
     ui.display_menu(items)
+    instrument.milestone('first_paint') # Time until the menu is first shown, reported by --profile
 
     while True:
         # Prompt the user to choose an option
@@ -56,10 +82,10 @@ def menu():
     
 
 
+@timed('save')
 def save_scoreboard(scoreboard):
-    # Save the scoreboard to a file using pickle
-    with open("scoreboard.dat", "wb") as file:
-        pickle.dump(scoreboard, file)
+    # Save the scoreboard to a file as new snapshot, which also compacts the log of wins
+    ScoreboardLog(SCOREBOARD_FILE).save(scoreboard)
 
     return None
 
@@ -68,17 +94,117 @@ def save_scoreboard(scoreboard):
 
 
 
+@timed('load')
 def load_scoreboard():
-    try: # Try to load the scoreboard from the file
-        with open("scoreboard.dat", "rb") as file:
-            scoreboard = pickle.load(file)
+    # Load the snapshot of the scoreboard file and replay the wins logged since, only players with a positive score are kept
+    return ScoreboardLog(SCOREBOARD_FILE).load()
+
+
+
+
+
+
+@timed('save')
+def record_win(scoreboard, winner):
+    # Write only the win instead of the whole scoreboard, e.g. append it to the log of the scoreboard file
+    return scoreboard.record_win(winner)
+
+
+
 
-            # Only return players with a valid score (positive integers)
-            return {player: score for player, score in scoreboard.items() if isinstance(score, int) and score > 0}
 
 
-    except (FileNotFoundError, pickle.UnpicklingError, EOFError):
-        return {} # Return an empty scoreboard if there was an error loading the file
+def scoreboard_views(scoreboard, periods=None, stats=None):
+    # The views of the scoreboard screen as (menu item, headline, function returning a page of players, column) tuples,
+    # all wins first, the column is the statistic of the values, see ui.display_scoreboard
+    views = [("All time", "scoreboard battleships", scoreboard.top, None)]
+
+    if periods is not None:
+        for period, days in PERIODS.items():
+            views.append((f"{period.capitalize()} leaderboard", f"{period} leaderboard battleships",
+                          lambda count, offset, days=days: periods.top(count, offset, days=days), None))
+
+    if stats is not None:
+        for ranking in RANKINGS:
+            name = ranking.replace('_', ' ')
+            views.append((f"Players by {name}", f"players by {name}",
+                          lambda count, offset, ranking=ranking: stats.top(ranking, count, offset), ranking))
+
+    return views
+
+
+
+
+
+
+def choose_view(views):
+    # Let the user choose another view of the scoreboard
+    ui.display_headline("scoreboard views")
+    ui.display_menu([item for item, _, _, _ in views])
+
+    while True:
+        choice = ui.prompt("Enter the number of the view")
+
+        if choice.isdigit() and 1 <= int(choice) <= len(views):
+            return views[int(choice) - 1]
+
+
+
+
+
+
+def show_scoreboard(scoreboard, periods=None, stats=None):
+    # Show the scoreboard page by page, only the players of a page are read, the other views are chosen with v
+    views = scoreboard_views(scoreboard, periods, stats)
+    _, headline, top, column = views[0]
+    offset = 0
+
+    while True:
+        ui.display_headline(headline)
+        page = top(SCOREBOARD_PAGE + 1, offset) # One more to know whether there is another page
+        ui.display_scoreboard(page[:SCOREBOARD_PAGE], offset + 1, column)
+
+        more = len(page) > SCOREBOARD_PAGE
+
+        if len(views) == 1:
+            choice = ui.prompt("Press ENTER to show the next page or q to return to the menu" if more else
+                               "Press ENTER to return to the menu")
+        else:
+            choice = ui.prompt("Press ENTER to show the next page, v to change the view or q to return to the menu" if more
+                               else "Press ENTER to return to the menu or v to change the view")
+        choice = choice.strip().lower()
+
+        if len(views) > 1 and choice == "v":
+            _, headline, top, column = choose_view(views)
+            offset = 0
+        elif not more or choice == "q":
+            return None
+        else:
+            offset += SCOREBOARD_PAGE
+
+
+
+
+
+
+def show_leaderboard(period, count=SCOREBOARD_PAGE):
+    # Show the players with the most wins of the last day, week or month, added up from the wins of each day
+    ui.display_headline(f"{period} leaderboard battleships")
+    ui.display_scoreboard(PeriodScoreboard().top(count, days=PERIODS[period]))
+
+    return None
+
+
+
+
+
+
+def show_stats(ranking, count=100):
+    # Show the best players of a statistic, e.g. the 100 players with the best accuracy, read from its precomputed order
+    ui.display_headline(f"top {count} by {ranking.replace('_', ' ')}")
+    ui.display_scoreboard(PlayerStats().top(ranking, count), column=ranking)
+
+    return None
 
 
 
@@ -86,6 +212,9 @@ def load_scoreboard():
 
 
 def is_game_won(grid):
+    if isinstance(grid, Board):
+        return grid.is_cleared() # Answered from the counter of intact ship cells
+
     # Check if all ships are hit
     for row in grid:
         if True in row:  # If any ship part still exists
@@ -98,14 +227,13 @@ def is_game_won(grid):
 
 
 
-def play_turn(grid_a, grid_b, player_name, is_player_a):
+def play_turn(grid_a, grid_b, player_name, is_player_a, game=None):
 
     target_grid = grid_b if is_player_a else grid_a
 
     while True:
         # Display the player's turn and the game grid
-        ui.display_turn_start(player_name, is_player_a)
-        ui.display_game(grid_a, grid_b)
+        ui.display_turn(player_name, is_player_a, grid_a, grid_b, getattr(target_grid, 'last_shot', None))
 
 
         while True:
@@ -113,9 +241,23 @@ def play_turn(grid_a, grid_b, player_name, is_player_a):
             user_input = ui.prompt("Please select a row and a column")
 
             try:
-                row, col = map(int, user_input.split()) # Convert input to integers
+                with timer('parse'):
+                    row, col = map(int, user_input.split()) # Convert input to integers
 
 
+                if isinstance(target_grid, Board):
+                    # Fire through the game if there is one, shots outside of the board raise an IndexError
+                    with timer('shot'):
+                        if game is not None:
+                            result = game.fire(player_name, row - 1, col - 1)
+                        else:
+                            result = target_grid.fire(row - 1, col - 1)
+
+                    # None if the cell was already shot at
+                    if result is None:
+                        continue
+                    return result != MISS # Hit or sunk
+
                 # Check if the input is within the grid bounds
                 if not (1 <= row <= len(target_grid) and 1 <= col <= len(target_grid[0])):
                     continue
@@ -143,6 +285,8 @@ def play_turn(grid_a, grid_b, player_name, is_player_a):
 
 
 def is_ship_position_possible(length, start_row, start_col, end_row, end_col, grid):
+    if isinstance(grid, Board):
+        return is_placement_possible(grid, length, (start_row, start_col), (end_row, end_col))
 
     # Check if the ship's position is valid (either horizontal or vertical)
     if not (start_row == end_row or start_col == end_col):
@@ -167,21 +311,30 @@ def is_ship_position_possible(length, start_row, start_col, end_row, end_col, gr
 
 
 
-def position_ships(player, rows, cols, ships):
-    grid = [[None for _ in range(cols)] for _ in range(rows)] # Create an empty grid for placing ships
+def position_ships(player, rows, cols, ships, backend='bitboard'):
+    grid = create_board(rows, cols, backend) # Create an empty board for placing ships
+
+    focus = None # Start of the last placed ship, shown if the board is larger than the terminal
 
-    for ship_name, ship_length in ships:
+    for index, (ship_name, ship_length) in enumerate(ships):
         while True:
             # Display the ship positioning screen
             ui.display_headline(f"{player} position the ship {ship_name.upper()} - length {ship_length}")
-            ui.display_grid(grid)
+            ui.display_grid(grid, focus)
 
             while True:
                 try:
                     # Get the start and end cell for the ship placement
-                    start, end = ui.prompt("Select beginning and end cell").split(",")
-                    start_row, start_col = map(int, start.strip().split())
-                    end_row, end_col = map(int, end.strip().split())
+                    user_input = ui.prompt("Select beginning and end cell")
+
+                    if user_input.strip().lower() == "auto":
+                        # Place this ship and all remaining ones randomly
+                        return place_randomly(grid, ships[index:])
+
+                    with timer('parse'):
+                        start, end = user_input.split(",")
+                        start_row, start_col = map(int, start.strip().split())
+                        end_row, end_col = map(int, end.strip().split())
 
                     # Adjust for zero-indexing
                     start_row -= 1
@@ -190,14 +343,14 @@ def position_ships(player, rows, cols, ships):
                     end_col -= 1
 
                     # Check if the ship can be placed at the given coordinates
-                    if is_ship_position_possible(ship_length, start_row, start_col, end_row, end_col, grid):
+                    with timer('validate'):
+                        possible = is_ship_position_possible(ship_length, start_row, start_col, end_row, end_col, grid)
 
-                        # Mark the grid with the ship's cells
-                        for col in range(min(start_col, end_col), max(start_col, end_col) + 1):
-                            grid[start_row][col] = True
+                    if possible:
 
-                        for row in range(min(start_row, end_row), max(start_row, end_row) + 1):
-                            grid[row][start_col] = True
+                        # Mark the board with the ship's cells
+                        grid.place(grid.line_mask(start_row, start_col, end_row, end_col), ship_name)
+                        focus = (start_row, start_col)
 
                         break # Move to the next ship
 
@@ -212,56 +365,119 @@ def position_ships(player, rows, cols, ships):
 
 
 
-def play_battleships(ships=SHIPS):
+def bot_turn(game, bot):
+    # Let the bot fire at the cell of its choice and tell it the result
+    row, col = bot.choose()
+    result = game.fire(game.turn, row, col)
+    bot.observe(row, col, result)
 
-    # Initialize the game grid
-    grid_rows = 8
-    grid_cols = 8
+    return result != MISS # Hit or sunk
 
-    # Get player names
-    ui.display_headline("enter player names")
 
-    while True:
-        player_a = ui.prompt("Enter the name of player A").strip()
-        if player_a:
-            break
 
-    while True: 
-        player_b = ui.prompt("Enter the name of player B").strip()
-        if player_b and player_b != player_a: # Ensure player B is different from player A
-            break
 
-    # Position the ships for both players
-    grid_a = position_ships(player_a, grid_rows, grid_cols, ships)
-    grid_b = position_ships(player_b, grid_rows, grid_cols, ships)
 
-    # Start the game
-    is_player_a_turn = True
 
-    while True:
-        # Determine the current player
-        winner = player_a if is_player_a_turn else player_b
-        play_turn(grid_a, grid_b, winner, is_player_a_turn)
+def play_battleships(ships=SHIPS, grid_rows=8, grid_cols=8, backend='bitboard', bot=None, stats=None):
+
+    # Get player names
+    ui.display_headline("enter player names")
 
-        # Check if the game is won
-        if is_game_won(grid_b if is_player_a_turn else grid_a):
-            ui.display_headline("the game is over!")
-            ui.display_game(grid_a, grid_b)
-            ui.display_message(f"{winner} won the game!")
-            break # Exit the loop after the game ends
+    while True:
+        player_a = ui.prompt("Enter the name of player A").strip()
+        if player_a and player_a != BOT_PLAYER:
+            break
 
-        # Switch turns
-        is_player_a_turn = not is_player_a_turn
+    if bot:
+        player_b = BOT_PLAYER # Player B is played by the bot
+    else:
+        while True: 
+            player_b = ui.prompt("Enter the name of player B").strip()
+            if player_b and player_b not in (player_a, BOT_PLAYER): # Ensure player B is different from player A
+                break
+
+    # The game state applies the rules, this function only drives the terminal
+    game = GameState(player_a, player_b, ships, grid_rows, grid_cols, backend)
+    bots = {player_b: create_bot(bot, grid_rows, grid_cols, ships)} if bot else {}
+
+    # Position the ships for both players, bots place their fleet randomly
+    for player in game.players:
+        if player in bots:
+            game.set_board(player, random_board(grid_rows, grid_cols, ships, backend))
+        else:
+            game.set_board(player, position_ships(player, grid_rows, grid_cols, ships, backend))
+
+    grid_a, grid_b = game.boards[player_a], game.boards[player_b]
+
+    # Take turns until one player has hit every ship cell of the other player
+    while game.winner is None:
+        if game.turn in bots:
+            bot_turn(game, bots[game.turn])
+        else:
+            play_turn(grid_a, grid_b, game.turn, game.turn == player_a, game)
+
+    ui.display_headline("the game is over!")
+    ui.display_game(grid_a, grid_b, game.boards[game.opponent(game.winner)].last_shot)
+    ui.display_message(f"{game.winner} won the game!")
+
+    # Add the game to the statistics of both players
+    if stats is not None:
+        stats.record_game(game.winner, game.opponent(game.winner), game.shots, game.hits)
 
     ui.prompt("Press ENTER to return to the menu")
 
-    return winner
+    return game.winner
     
     
 
 
 if __name__ == '__main__':
-    main()
+    args = sys.argv[1:]
+
+    # Time the hot paths with --profile (report on exit) or --profile=FILE (JSON dump)
+    for arg in [arg for arg in args if arg == '--profile' or arg.startswith('--profile=')]:
+        instrument.enable(arg.partition('=')[2] or None)
+        args.remove(arg)
+
+    # Repaint only the changed cells of each turn with --diff-render
+    if '--diff-render' in args:
+        ui.enable_diff_rendering()
+        args.remove('--diff-render')
+
+    # Select how the screen is cleared with --clear=reset|erase|auto|none
+    for arg in [arg for arg in args if arg.startswith('--clear=')]:
+        ui.set_clear_strategy(arg.partition('=')[2])
+        args.remove(arg)
+
+    # Select the scoreboard backend with --scoreboard=file|sqlite|mmap
+    scoreboard_backend = 'file'
+    for arg in [arg for arg in args if arg.startswith('--scoreboard=')]:
+        scoreboard_backend = arg.partition('=')[2]
+        args.remove(arg)
+
+    # Exit normally on SIGTERM, so the pending wins and games are written like on any other exit
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    if args[:1] == ['simulate']:
+        # Batch simulation of bot games: python -m battleships simulate --games N --workers K
+        import simulate
+        simulate.main(args[1:], SHIPS)
+    elif args[:1] == ['leaderboard']:
+        # Players with the most wins of the last days: python battleships.py leaderboard [daily|weekly|monthly]
+        period = args[1] if len(args) > 1 else 'weekly'
+        if period not in PERIODS:
+            sys.exit(f'unknown period {period!r}, choose one of {", ".join(PERIODS)}')
+        show_leaderboard(period)
+    elif args[:1] == ['stats']:
+        # Best players of a statistic: python battleships.py stats [wins|games|shots|accuracy|turns_to_win]
+        ranking = args[1] if len(args) > 1 else 'wins'
+        if ranking not in RANKINGS:
+            sys.exit(f'unknown ranking {ranking!r}, choose one of {", ".join(RANKINGS)}')
+        show_stats(ranking)
+    elif scoreboard_backend not in SCOREBOARD_BACKENDS:
+        sys.exit(f'unknown scoreboard backend {scoreboard_backend!r}, choose one of {", ".join(SCOREBOARD_BACKENDS)}')
+    else:
+        main(scoreboard_backend)
 
 
 
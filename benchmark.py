@@ -0,0 +1,217 @@
+"""
+Benchmarks of the core game functions.
+
+    python benchmark.py --output bench.json
+    python benchmark.py --compare bench.json --threshold 0.25
+
+Results are written as JSON, one entry per benchmark and size with the best time
+per operation in seconds. In comparison mode every entry that got slower than the
+baseline by more than the threshold is reported as a regression, and the exit
+code is 1 if there is any.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+
+import ui
+from battleships import SHIPS, is_game_won, is_ship_position_possible, load_scoreboard, record_win, save_scoreboard
+from fleet import random_board
+from scoreboard import ScoreboardLog
+from simulate import play_game
+
+BOARD_SIZES = (8, 32, 100, 1000)
+GAME_SIZES = (8, 32, 100)  # Whole games on larger boards take minutes
+PLAYER_COUNTS = (10, 1_000, 100_000, 10_000_000)
+
+
+def measure(function, repeat=5, number=1):
+    """
+    Measures the fastest of several runs of a function.
+
+    :function: Function without arguments to run.
+    :repeat: Number of runs.
+    :number: Number of operations one call of the function performs.
+    :return: Best time per operation in seconds.
+    """
+    best = float('inf')
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+
+    return best / number
+
+
+def fleet_for(size):
+    """
+    Returns a fleet for a square board of a size, more ships on larger boards.
+    """
+    return SHIPS * max(1, size * size // 400)
+
+
+def bench_board(size, rng):
+    """
+    Measures placement checks, win checks, shots and rendering on a square board.
+
+    :return: List of result entries.
+    """
+    board = random_board(size, size, fleet_for(size), rng=rng)
+    candidates = [(rng.randrange(size), rng.randrange(size - 2)) for _ in range(1000)]
+    cells = [(row, col) for row in range(size) for col in range(size)]
+    shots = rng.sample(cells, min(len(cells), 10_000))
+
+    def check_positions():
+        for row, col in candidates:
+            is_ship_position_possible(3, row, col, row, col + 2, board)
+
+    def check_won():
+        for _ in range(1000):
+            is_game_won(board)
+
+    def fire():
+        target = random_board(size, size, fleet_for(size), rng=random.Random(0))
+        start = time.perf_counter()
+        for row, col in shots:
+            target.fire(row, col)
+        return time.perf_counter() - start
+
+    def render():
+        with contextlib.redirect_stdout(io.StringIO()):
+            ui.display_game(board, board)
+
+    repeat = 5 if size <= 100 else 1
+
+    return [
+        {'benchmark': 'is_ship_position_possible', 'size': size, 'seconds': measure(check_positions, repeat, 1000)},
+        {'benchmark': 'is_game_won', 'size': size, 'seconds': measure(check_won, repeat, 1000)},
+        {'benchmark': 'fire', 'size': size, 'seconds': min(fire() for _ in range(repeat)) / len(shots)},
+        {'benchmark': 'display_game', 'size': size, 'seconds': measure(render, repeat)},
+    ]
+
+
+def bench_game(size):
+    """
+    Measures whole headless games between random bots on a square board.
+
+    :return: List of result entries.
+    """
+    games = 20 if size <= 32 else 2
+
+    def play():
+        for seed in range(games):
+            play_game(seed, seed, size, size, fleet_for(size))
+
+    return [{'benchmark': 'headless_game', 'size': size, 'seconds': measure(play, 3, games)}]
+
+
+def bench_scoreboard(players):
+    """
+    Measures saving, loading and recording a win in a scoreboard with a number of players, in a temporary directory.
+
+    :return: List of result entries.
+    """
+    scoreboard = {f'Player {i}': i % 100 + 1 for i in range(players)}
+    repeat = 5 if players <= 100_000 else 1
+    cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        try:
+            save = measure(lambda: save_scoreboard(scoreboard), repeat)
+            load = measure(load_scoreboard, repeat)
+            log = ScoreboardLog()
+            log.load()
+            win = measure(lambda: [record_win(log, f'Player {i}') for i in range(100)], repeat, 100)
+        finally:
+            os.chdir(cwd)
+
+    return [
+        {'benchmark': 'save_scoreboard', 'players': players, 'seconds': save},
+        {'benchmark': 'load_scoreboard', 'players': players, 'seconds': load},
+        {'benchmark': 'record_win', 'players': players, 'seconds': win},
+    ]
+
+
+def run(board_sizes=BOARD_SIZES, game_sizes=GAME_SIZES, player_counts=PLAYER_COUNTS, log=sys.stderr):
+    """
+    Runs all benchmarks.
+
+    :log: File to report progress to, None for no progress.
+    :return: List of result entries with the keys benchmark, size or players, and seconds.
+    """
+    rng = random.Random(0)
+    results = []
+    jobs = ([(bench_board, size, rng) for size in board_sizes]
+            + [(bench_game, size) for size in game_sizes]
+            + [(bench_scoreboard, players) for players in player_counts])
+
+    for bench, *args in jobs:
+        for result in bench(*args):
+            results.append(result)
+            if log:
+                print(f"{key(result):40} {result['seconds'] * 1e6:14.2f} us", file=log)
+
+    return results
+
+
+def key(result):
+    """
+    Returns the name of a result entry used to match it with the baseline.
+    """
+    if 'players' in result:
+        return f"{result['benchmark']}[{result['players']} players]"
+    return f"{result['benchmark']}[{result['size']}x{result['size']}]"
+
+
+def compare(results, baseline, threshold=0.25):
+    """
+    Compares results with a baseline.
+
+    :results: List of result entries.
+    :baseline: List of result entries of an earlier run.
+    :threshold: Relative slowdown that counts as regression, 0.25 for 25 % slower.
+    :return: List of tuples (key, baseline seconds, seconds) of the regressions.
+    """
+    baseline = {key(result): result['seconds'] for result in baseline}
+
+    return [(key(result), baseline[key(result)], result['seconds']) for result in results
+            if key(result) in baseline and result['seconds'] > baseline[key(result)] * (1 + threshold)]
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description='Benchmark the core game functions.')
+    parser.add_argument('--output', default='bench.json', help='file the results are written to')
+    parser.add_argument('--compare', metavar='BASELINE', help='results file to compare with')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative slowdown that counts as regression')
+    parser.add_argument('--sizes', type=int, nargs='+', default=BOARD_SIZES, help='board sizes')
+    parser.add_argument('--game-sizes', type=int, nargs='+', default=GAME_SIZES, help='board sizes of whole games')
+    parser.add_argument('--players', type=int, nargs='+', default=PLAYER_COUNTS, help='scoreboard sizes')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.game_sizes, args.players)
+
+    with open(args.output, 'w') as file:
+        json.dump({'python': platform.python_version(), 'results': results}, file, indent=1)
+
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(results, json.load(file)['results'], args.threshold)
+
+        for name, before, after in regressions:
+            print(f'REGRESSION {name}: {before * 1e6:.2f} us -> {after * 1e6:.2f} us', file=sys.stderr)
+
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,340 @@
+import os
+
+from placement import MAX_TABLE_CELLS, normalize_ends, placement_table
+
+# Enables expensive consistency checks of the incremental bookkeeping
+DEBUG = bool(os.environ.get('BATTLESHIPS_DEBUG'))
+
+# Results of a shot, a sunk ship is reported as 'sunk <name>'
+MISS = 'miss'
+HIT = 'hit'
+SUNK = 'sunk'
+
+
+class Board:
+    """
+    A battleships grid stored as integer bitmasks instead of a list of lists.
+
+    Cell (row, col) is represented by bit row * cols + col. Three masks hold the
+    state of the grid: ships (cells occupied by a ship), hits (ship cells that
+    were shot) and misses (empty cells that were shot). The number of intact
+    ship cells is tracked in remaining as ships are placed and hit, so a win
+    can be detected without looking at the masks.
+
+    Every placed ship gets an id. The board maps the index of each ship cell
+    to the id of its ship and counts the intact cells per ship, so a hit can
+    be reported as sinking a ship without looking at the neighbouring cells.
+
+    For compatibility with the ui functions, a board can be indexed like the
+    old two-dimensional grids: board[row] returns the list of cell values of
+    that row, where True indicates an intact ship cell, False a hit ship cell,
+    'miss' a missed shot and None an empty cell.
+    """
+
+    def __init__(self, rows, cols):
+        """
+        Creates an empty board.
+
+        :rows: Number of rows of the board.
+        :cols: Number of columns of the board.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.ships = 0
+        self.hits = 0
+        self.misses = 0
+        self.remaining = 0
+        self.ship_ids = {}  # Cell index -> ship id
+        self.ship_names = []  # Ship id -> name
+        self.ship_remaining = []  # Ship id -> number of intact cells
+        self.last_shot = None  # (row, col) of the last shot, used by the ui to show that part of large boards
+
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Creates a board from a two-dimensional grid of cell values.
+
+        :grid: The grid as a list of rows, using True, False, 'miss' and None as cell values.
+        :return: The equivalent board.
+        """
+        board = cls(len(grid), len(grid[0]))
+
+        for row, values in enumerate(grid):
+            for col, value in enumerate(values):
+                bit = board.bit(row, col)
+                if value == 'miss':
+                    board.misses |= bit
+                elif value is True:
+                    board.ships |= bit
+                elif value is False:
+                    board.ships |= bit
+                    board.hits |= bit
+
+        board.remaining = board.count_remaining()
+
+        return board
+
+
+    def to_grid(self):
+        """
+        Converts the board to a two-dimensional grid of cell values.
+
+        :return: The grid as a list of rows, using True, False, 'miss' and None as cell values.
+        """
+        return [self[row] for row in range(self.rows)]
+
+
+    def bit(self, row, col):
+        """
+        Returns the bitmask of a single cell.
+
+        :row: Zero-based row index.
+        :col: Zero-based column index.
+        :return: Integer with only the bit of the cell set.
+        """
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError(f'cell ({row}, {col}) is outside of the board')
+
+        return 1 << (row * self.cols + col)
+
+
+    def line_mask(self, start_row, start_col, end_row, end_col):
+        """
+        Returns the bitmask of a horizontal or vertical line of cells, including both ends.
+        Masks of boards up to MAX_TABLE_CELLS cells are looked up in the cached placement table.
+
+        :return: Integer with the bits of all cells of the line set.
+        """
+        start_row, start_col, end_row, end_col = normalize_ends(start_row, start_col, end_row, end_col)
+        length = end_row - start_row + end_col - start_col + 1
+
+        if self.rows * self.cols <= MAX_TABLE_CELLS:
+            table = placement_table(self.rows, self.cols, length)
+            placement_id = table.ids.get((start_row, start_col, end_row, end_col))
+            if placement_id is None:
+                raise IndexError('line is outside of the board')
+            return table.masks[placement_id]
+
+        # Raise an IndexError if the line leaves the board
+        self.bit(start_row, start_col)
+        self.bit(end_row, end_col)
+
+        if start_row == end_row:
+            line = (1 << length) - 1  # A horizontal line is a run of consecutive bits
+        else:
+            line = sum(1 << (i * self.cols) for i in range(length))
+
+        return line << (start_row * self.cols + start_col)
+
+
+    def is_free(self, mask):
+        """
+        Checks that none of the cells of a mask are occupied by a ship.
+
+        :mask: Bitmask of the cells to check.
+        :return: True if no ship occupies any of the cells.
+        """
+        return self.ships & mask == 0
+
+
+    def place(self, mask, name='Ship'):
+        """
+        Places a ship on the cells of a mask.
+
+        :mask: Bitmask of the ship's cells.
+        :name: Name of the ship, reported when it is sunk.
+        :return: The id of the placed ship.
+        """
+        ship_id = len(self.ship_names)
+        length = 0
+
+        # Index every cell of the ship by walking the set bits from the lowest one
+        cells = mask
+        while cells:
+            lowest = cells & -cells
+            self.ship_ids[lowest.bit_length() - 1] = ship_id
+            cells ^= lowest
+            length += 1
+
+        self.ship_names.append(name)
+        self.ship_remaining.append(length)
+        self.ships |= mask
+        self.remaining += length
+
+        return ship_id
+
+
+    def fire(self, row, col):
+        """
+        Fires a shot at a cell and records the hit or miss.
+
+        :row: Zero-based row index.
+        :col: Zero-based column index.
+        :return: 'hit', 'sunk <name>' or 'miss', and None if the cell was already shot at.
+        """
+        bit = self.bit(row, col)
+
+        if (self.hits | self.misses) & bit:
+            return None
+
+        self.last_shot = (row, col)
+
+        if self.ships & bit:
+            self.hits |= bit
+            self.remaining -= 1
+
+            ship_id = self.ship_ids.get(row * self.cols + col)
+            if ship_id is None:
+                return HIT  # Ships of boards created from grids are not identified
+
+            self.ship_remaining[ship_id] -= 1
+            if self.ship_remaining[ship_id] == 0:
+                return f'{SUNK} {self.ship_names[ship_id]}'
+
+            return HIT
+
+        self.misses |= bit
+        return MISS
+
+
+    def ship_cells(self):
+        """
+        Returns the number of cells occupied by ships.
+        """
+        return self.ships.bit_count()
+
+
+    def count_remaining(self):
+        """
+        Counts the intact ship cells from the masks instead of the tracked counter.
+        """
+        return (self.ships & ~self.hits).bit_count()
+
+
+    def is_cleared(self):
+        """
+        Checks if every ship cell of the board has been hit.
+        In debug mode the tracked counter is cross-checked against the masks.
+
+        :return: True if no intact ship cell is left.
+        """
+        if DEBUG and self.remaining != self.count_remaining():
+            raise AssertionError(f'remaining is {self.remaining}, but {self.count_remaining()} ship cells are intact')
+
+        return self.remaining == 0
+
+
+    def cell(self, row, col):
+        """
+        Returns the value of a cell in the grid encoding used by the ui.
+
+        :return: True for an intact ship cell, False for a hit ship cell, 'miss' for a missed shot and None otherwise.
+        """
+        bit = self.bit(row, col)
+
+        if self.ships & bit:
+            return not self.hits & bit
+        if self.misses & bit:
+            return 'miss'
+
+        return None
+
+
+    def row_slice(self, row, start, stop):
+        """
+        Returns the cell values of a part of a row, without decoding the rest of the row.
+
+        :row: Zero-based row index.
+        :start: First column.
+        :stop: Column after the last one.
+        :return: List of the cell values in the grid encoding used by the ui.
+        """
+        if not 0 <= row < self.rows:
+            raise IndexError(f'row {row} is outside of the board')
+
+        # Extract the bits of the columns once and decode them column by column
+        offset = row * self.cols + start
+        width = (1 << (stop - start)) - 1
+        ships = (self.ships >> offset) & width
+        hits = (self.hits >> offset) & width
+        misses = (self.misses >> offset) & width
+
+        values = []
+        for col in range(stop - start):
+            bit = 1 << col
+            if ships & bit:
+                values.append(not hits & bit)
+            elif misses & bit:
+                values.append('miss')
+            else:
+                values.append(None)
+
+        return values
+
+
+    def overview(self, block):
+        """
+        Summarizes square blocks of cells, e.g. for a minimap of a large board.
+
+        :block: Number of rows and columns of a block.
+        :return: List of rows of block values: False if a ship cell in the block was hit, 'miss' if
+                 cells were missed, True if the block contains intact ship cells and None otherwise.
+        """
+        band = (1 << (block * self.cols)) - 1  # All cells of a row of blocks
+        widths = {min(block, self.cols - left) for left in range(0, self.cols, block)}
+        patterns = {width: sum(((1 << width) - 1) << (row * self.cols) for row in range(block)) for width in widths}
+
+        values = []
+        for top in range(0, self.rows, block):
+            offset = top * self.cols
+            hits = (self.hits >> offset) & band
+            misses = (self.misses >> offset) & band
+            ships = (self.ships >> offset) & band
+
+            row = []
+            for left in range(0, self.cols, block):
+                mask = patterns[min(block, self.cols - left)] << left
+                if hits & mask:
+                    row.append(False)
+                elif misses & mask:
+                    row.append('miss')
+                else:
+                    row.append(True if ships & mask else None)
+            values.append(row)
+
+        return values
+
+
+    def __len__(self):
+        return self.rows
+
+
+    def __getitem__(self, row):
+        return self.row_slice(row, 0, self.cols)
+
+
+    def __iter__(self):
+        for row in range(self.rows):
+            yield self[row]
+
+
+
+
+def create_board(rows, cols, backend='bitboard'):
+    """
+    Creates an empty board with the selected backend.
+
+    :rows: Number of rows of the board.
+    :cols: Number of columns of the board.
+    :backend: 'bitboard' for a Board or 'numpy' for a NumpyBoard, which needs NumPy to be installed.
+    :return: The empty board.
+    """
+    if backend == 'bitboard':
+        return Board(rows, cols)
+
+    if backend == 'numpy':
+        from numpy_board import NumpyBoard  # NumPy is only imported when the backend is selected
+        return NumpyBoard(rows, cols)
+
+    raise ValueError(f'unknown board backend {backend!r}')
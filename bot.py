@@ -0,0 +1,79 @@
+import importlib.util
+import random
+
+
+class RandomBot:
+    """
+    A computer player that fires at random cells it has not fired at before.
+
+    Bots choose a cell with choose() and are told the result of the shot with
+    observe(), so they can be plugged into any turn loop over a GameState.
+    All rows and columns are zero-based.
+    """
+
+    def __init__(self, rows, cols, ships, rng=random):
+        """
+        Creates the bot.
+
+        :rows: Number of rows of the board to attack.
+        :cols: Number of columns of the board to attack.
+        :ships: The fleet to sink as list of (name, length) tuples like SHIPS.
+        :rng: Random number generator.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.cells = list(range(rows * cols))
+        rng.shuffle(self.cells)
+
+
+    def choose(self):
+        """
+        Chooses the next cell to fire at.
+
+        :return: Tuple (row, col).
+        """
+        return divmod(self.cells.pop(), self.cols)
+
+
+    def observe(self, row, col, result):
+        """
+        Tells the bot the result of its last shot.
+
+        :result: 'hit', 'sunk <name>' or 'miss'.
+        """
+
+
+
+
+# Names of the bots that can be selected, the density bot needs NumPy to be installed
+BOT_NAMES = ('random', 'density')
+
+
+def create_bot(name, rows, cols, ships, rng=random):
+    """
+    Creates a bot by its name.
+
+    :name: 'random' for a RandomBot or 'density' for a DensityBot.
+    :rows: Number of rows of the board to attack.
+    :cols: Number of columns of the board to attack.
+    :ships: The fleet to sink as list of (name, length) tuples like SHIPS.
+    :rng: Random number generator.
+    :return: The bot.
+    """
+    if name == 'random':
+        return RandomBot(rows, cols, ships, rng)
+
+    if name == 'density':
+        from density_bot import DensityBot  # NumPy is only imported when the bot is selected
+        return DensityBot(rows, cols, ships, rng)
+
+    raise ValueError(f'unknown bot {name!r}')
+
+
+
+
+def strongest_bot():
+    """
+    Returns the name of the strongest bot that can be created: 'density' if NumPy is installed, 'random' otherwise.
+    """
+    return 'density' if importlib.util.find_spec('numpy') else 'random'
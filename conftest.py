@@ -45,6 +45,10 @@ from collections import namedtuple
 
 import pytest
 
+# The tests of the exact output expect the screen to be cleared by a full reset,
+# set before the ui module is imported, so also in programs started by the tests
+os.environ.setdefault('BATTLESHIPS_CLEAR', 'reset')
+
 
 __all__ = ("is_debugging", "Settings")
 
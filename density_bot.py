@@ -0,0 +1,249 @@
+import random
+
+import numpy as np
+
+from board import DEBUG, HIT, MISS, SUNK
+
+# What the bot knows about a cell of the attacked board
+UNKNOWN = 0
+MISSED = 1
+HIT_SHIP = 2  # Hit cell of a ship that is not sunk yet
+SUNK_SHIP = 3  # Cell of a sunk ship
+
+# How much more a placement counts per hit cell it covers, so the bot finishes hit ships first
+TARGET_WEIGHT = 50
+
+
+def window_sums(values, length, axis):
+    """
+    Sums all windows of consecutive cells of a length along an axis.
+
+    :values: Two-dimensional array.
+    :return: Array that is length - 1 shorter along the axis, entry i is the sum of the cells i to i + length - 1.
+    """
+    sums = np.cumsum(values, axis=axis)
+    sums = np.insert(sums, 0, 0, axis=axis)
+
+    if axis == 0:
+        return sums[length:] - sums[:-length]
+    return sums[:, length:] - sums[:, :-length]
+
+
+class DensityBot:
+    """
+    A computer player that fires at the cell covered by the most placements of the ships still afloat.
+
+    For every remaining ship, all horizontal and vertical placements that do not
+    cross a miss or a sunk ship are counted per cell. Placements covering hits
+    of ships that are not sunk yet get a higher weight, so the bot hunts around
+    hits.
+
+    The counts are computed once for the empty board, vectorized with window sums,
+    and then maintained incrementally: a shot only updates the placements crossing
+    its cell, and a sunk ship retires the placements of its length. In verify mode
+    the counts are compared with a full recount after every shot.
+    """
+
+    def __init__(self, rows, cols, ships, rng=random, verify=DEBUG):
+        """
+        Creates the bot.
+
+        :rows: Number of rows of the board to attack.
+        :cols: Number of columns of the board to attack.
+        :ships: The fleet to sink as list of (name, length) tuples like SHIPS.
+        :rng: Random number generator, used to choose among equally good cells.
+        :verify: True to check the incremental counts against a full recount after every shot.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.rng = rng
+        self.verify = verify
+        self.state = np.zeros((rows, cols), dtype=np.int8)
+        self.afloat = list(ships)
+
+        self.multiplicity = {}  # Ship length -> number of ships of that length afloat
+        for _, length in self.afloat:
+            self.multiplicity[length] = self.multiplicity.get(length, 0) + 1
+
+        self.weights = {}  # (length, axis) -> weight of each placement, indexed by its first cell
+        self.coverage = {}  # Length -> sum of the weights of the placements of one ship covering each cell
+        self.counts = np.zeros((rows, cols), dtype=np.int64)
+
+        for length, multiplicity in self.multiplicity.items():
+            self.coverage[length] = np.zeros((rows, cols), dtype=np.int64)
+            for axis in self.__axes(length):
+                self.weights[length, axis] = self.placement_weights(length, axis)
+                self.coverage[length] += self.spread(self.weights[length, axis], length, axis)
+            self.counts += multiplicity * self.coverage[length]
+
+
+    def __axes(self, length):
+        # Orientations in which a ship fits, a ship of length 1 has only one
+        return [axis for axis in (1, 0) if length <= self.state.shape[axis] and not (length == 1 and axis == 0)]
+
+
+    def placement_weights(self, length, axis):
+        """
+        Computes the weights of all placements of a ship length in one orientation.
+
+        :axis: 1 for horizontal, 0 for vertical placements.
+        :return: Array of weights indexed by the first cell of each placement,
+                 0 for placements crossing a miss or a sunk ship.
+        """
+        blocked = ((self.state == MISSED) | (self.state == SUNK_SHIP)).astype(np.int64)
+        hits = (self.state == HIT_SHIP).astype(np.int64)
+        free = window_sums(blocked, length, axis) == 0
+
+        return free * (1 + TARGET_WEIGHT * window_sums(hits, length, axis))
+
+
+    def spread(self, weights, length, axis):
+        """
+        Spreads placement weights to the cells the placements cover.
+
+        :return: Array where every cell holds the sum of the weights of the placements covering it.
+        """
+        # Every cell collects the weights of the placements starting up to length - 1 cells before it
+        padding = [(0, 0), (0, 0)]
+        padding[axis] = (length - 1, length - 1)
+
+        return window_sums(np.pad(weights, padding), length, axis)
+
+
+    def count_density(self):
+        """
+        Recounts the weighted placements of the ships afloat covering each cell from scratch.
+
+        :return: Array of the counts, the incremental counts must always be equal.
+        """
+        counts = np.zeros((self.rows, self.cols), dtype=np.int64)
+
+        for length, multiplicity in self.multiplicity.items():
+            for axis in self.__axes(length):
+                counts += multiplicity * self.spread(self.placement_weights(length, axis), length, axis)
+
+        return counts
+
+
+    def density(self):
+        """
+        Returns the weighted placements of the ships afloat covering each cell.
+
+        :return: Array of the counts, cells that were already fired at are -1.
+        """
+        return np.where(self.state == UNKNOWN, self.counts, -1)
+
+
+    def choose(self):
+        """
+        Chooses the cell covered by the most placements, a random one of them on ties.
+
+        :return: Tuple (row, col).
+        """
+        density = self.density()
+        best = np.flatnonzero(density == density.max())
+
+        return divmod(int(best[self.rng.randrange(len(best))]), self.cols)
+
+
+    def observe(self, row, col, result):
+        """
+        Tells the bot the result of its last shot.
+
+        :result: 'hit', 'sunk <name>' or 'miss'.
+        """
+        if result == MISS:
+            self.state[row, col] = MISSED
+        else:
+            self.state[row, col] = HIT_SHIP
+
+        self.update([(row, col)])
+
+        if result not in (HIT, MISS) and result.startswith(SUNK):
+            self.sink(row, col, result[len(SUNK) + 1:])
+
+        if self.verify and not np.array_equal(self.counts, self.count_density()):
+            raise AssertionError(f'incremental counts differ from a full recount after the shot at ({row}, {col})')
+
+
+    def update(self, cells):
+        """
+        Updates the counts after the state of some cells changed.
+        Only the placements crossing one of the cells are recomputed.
+
+        :cells: List of (row, col) tuples of the changed cells.
+        """
+        for length, multiplicity in self.multiplicity.items():
+            coverage = self.coverage[length]
+
+            for axis in self.__axes(length):
+                weights = self.weights[length, axis]
+
+                # First cells of the placements crossing a changed cell
+                starts = set()
+                for row, col in cells:
+                    if axis == 1:
+                        first, last = max(0, col - length + 1), min(col, self.cols - length)
+                        starts.update((row, start) for start in range(first, last + 1))
+                    else:
+                        first, last = max(0, row - length + 1), min(row, self.rows - length)
+                        starts.update((start, col) for start in range(first, last + 1))
+
+                for row, col in starts:
+                    if axis == 1:
+                        cells_covered = (row, slice(col, col + length))
+                    else:
+                        cells_covered = (slice(row, row + length), col)
+
+                    window = self.state[cells_covered]
+                    if ((window == MISSED) | (window == SUNK_SHIP)).any():
+                        weight = 0
+                    else:
+                        weight = 1 + TARGET_WEIGHT * int(np.count_nonzero(window == HIT_SHIP))
+
+                    delta = weight - int(weights[row, col])
+                    if delta:
+                        weights[row, col] = weight
+                        coverage[cells_covered] += delta
+                        self.counts[cells_covered] += multiplicity * delta
+
+
+    def sink(self, row, col, name):
+        """
+        Retires a sunk ship: the placements of one ship of its length are no longer counted
+        and its cells no longer attract shots. The cells are the line of hits of the
+        ship's length through the last shot. A name that is not afloat, like a ship sunk
+        twice, raises a ValueError.
+        """
+        length = next((ship_length for ship_name, ship_length in self.afloat if ship_name == name), None)
+        if length is None:
+            raise ValueError(f'no ship named {name!r} is afloat')
+        self.afloat.remove((name, length))
+
+        self.counts -= self.coverage[length]
+        self.multiplicity[length] -= 1
+        if self.multiplicity[length] == 0:
+            # No ship of this length is left, retire its placements entirely
+            del self.multiplicity[length], self.coverage[length]
+            for axis in (0, 1):
+                self.weights.pop((length, axis), None)
+
+        cells = [(row, col)]  # If no line of hits is found, retire at least the last shot
+        for start_row, start_col, end_row, end_col in self.__lines(row, col, length):
+            if (self.state[start_row:end_row + 1, start_col:end_col + 1] == HIT_SHIP).all():
+                cells = [(r, c) for r in range(start_row, end_row + 1) for c in range(start_col, end_col + 1)]
+                break
+
+        for cell in cells:
+            self.state[cell] = SUNK_SHIP
+
+        self.update(cells)
+
+
+    def __lines(self, row, col, length):
+        # All horizontal and vertical lines of a length on the board through a cell
+        for offset in range(length):
+            if 0 <= col - offset and col - offset + length <= self.cols:
+                yield row, col - offset, row, col - offset + length - 1
+            if 0 <= row - offset and row - offset + length <= self.rows:
+                yield row - offset, col, row - offset + length - 1, col
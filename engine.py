@@ -0,0 +1,162 @@
+from board import MISS, create_board
+
+
+def is_placement_possible(board, length, start, end):
+    """
+    Checks if a ship can be placed on a board between two cells.
+
+    :board: The board to place the ship on.
+    :length: Length of the ship.
+    :start: Zero-based (row, col) of the first cell of the ship.
+    :end: Zero-based (row, col) of the last cell of the ship.
+    :return: True if the ship is horizontal or vertical, has the right length, lies on the board
+             and does not overlap another ship.
+    """
+    (start_row, start_col), (end_row, end_col) = start, end
+
+    # The ship must be either horizontal or vertical and have the right length
+    if not (start_row == end_row or start_col == end_col):
+        return False
+    if abs(end_row - start_row) + abs(end_col - start_col) + 1 != length:
+        return False
+
+    try:
+        return board.is_free(board.line_mask(start_row, start_col, end_row, end_col))
+    except IndexError:
+        return False  # The ship leaves the board
+
+
+
+
+class GameState:
+    """
+    The rules of a game of battleships between two players, without any user interaction.
+
+    Both players first place their fleets, player A before player B. Then they take
+    turns firing at the board of the other player, starting with player A, until
+    every ship cell of one board has been hit. All rows and columns are zero-based.
+    """
+
+    def __init__(self, player_a, player_b, ships, rows=8, cols=8, backend='bitboard'):
+        """
+        Creates a game with empty boards.
+
+        :player_a: Name of player A.
+        :player_b: Name of player B, which must differ from the name of player A.
+        :ships: The fleet of each player as list of (name, length) tuples like SHIPS.
+        :rows: Number of rows of the boards.
+        :cols: Number of columns of the boards.
+        :backend: Board backend, see create_board.
+        """
+        if player_a == player_b:
+            raise ValueError('the players need different names')
+
+        self.players = (player_a, player_b)
+        self.ships = list(ships)
+        self.boards = {player: create_board(rows, cols, backend) for player in self.players}
+        self.pending = {player: list(ships) for player in self.players}  # Ships that are not placed yet
+        self.turn = player_a
+        self.shots = {player: 0 for player in self.players}
+        self.hits = {player: 0 for player in self.players}
+        self.winner = None
+
+
+    @property
+    def placing(self):
+        """
+        The player who is placing ships, or None once both fleets are placed.
+        """
+        for player in self.players:
+            if self.pending[player]:
+                return player
+
+        return None
+
+
+    @property
+    def turns(self):
+        """
+        The number of shots fired by both players.
+        """
+        return sum(self.shots.values())
+
+
+    def opponent(self, player):
+        """
+        Returns the name of the other player.
+        """
+        return self.players[1] if player == self.players[0] else self.players[0]
+
+
+    def place(self, ship, start, end):
+        """
+        Places a ship of the player who is currently placing ships.
+
+        :ship: The (name, length) tuple of a ship that is not placed yet.
+        :start: Zero-based (row, col) of the first cell of the ship.
+        :end: Zero-based (row, col) of the last cell of the ship.
+        :return: True if the ship was placed, False if the position is not possible.
+        """
+        player = self.placing
+
+        if player is None:
+            raise ValueError('all ships are placed')
+        if ship not in self.pending[player]:
+            raise ValueError(f'{ship} is not a ship left to place')
+
+        ship_name, ship_length = ship
+        board = self.boards[player]
+
+        if not is_placement_possible(board, ship_length, start, end):
+            return False
+
+        board.place(board.line_mask(*start, *end), ship_name)
+        self.pending[player].remove(ship)
+
+        return True
+
+
+    def set_board(self, player, board):
+        """
+        Uses a board whose fleet was placed elsewhere, e.g. interactively or randomly.
+
+        :player: Name of the player owning the board.
+        :board: The board with the complete fleet of the player.
+        """
+        self.boards[player] = board
+        self.pending[player] = []
+
+
+    def fire(self, player, row, col):
+        """
+        Fires a shot of a player at the board of the other player.
+        The turn passes to the other player unless the shot was repeated or won the game.
+
+        :player: Name of the player whose turn it is.
+        :row: Zero-based row index.
+        :col: Zero-based column index.
+        :return: 'hit', 'sunk <name>' or 'miss', and None if the cell was already shot at.
+        """
+        if self.placing is not None:
+            raise ValueError('the ships are not placed yet')
+        if self.winner is not None:
+            raise ValueError('the game is over')
+        if player != self.turn:
+            raise ValueError(f'it is not the turn of {player}')
+
+        target = self.boards[self.opponent(player)]
+        result = target.fire(row, col)  # Shots outside of the board raise an IndexError
+
+        if result is None:
+            return None
+
+        self.shots[player] += 1
+        if result != MISS:
+            self.hits[player] += 1
+
+        if target.is_cleared():
+            self.winner = player
+        else:
+            self.turn = self.opponent(player)
+
+        return result
@@ -0,0 +1,359 @@
+import copy
+import random
+
+from board import create_board
+from placement import LegalPlacements, placement_count, placement_ends
+
+# Random draws per ship before the free placements are enumerated
+RANDOM_DRAWS = 32
+# Share of the cells covered by ships from which place_randomly tracks the free placements
+CROWDED_SHARE = 0.5
+# Rejected fleets before the fleets are counted, and the most frontiers times count fields to count them
+COUNT_AFTER_TRIES = 1000
+MAX_COUNT_STATES = 2_000_000
+
+
+def random_ends(board, length, rng=random, legal=None):
+    """
+    Draws a free placement of a ship length uniformly among all free placements of the board.
+
+    Placements are drawn by id, which is cheap on sparse boards of any size. Only
+    if every draw hits a ship, the free placements are enumerated and one of them
+    is chosen, so crowded boards need no long retry loops. If the free placements
+    are tracked, one of them is chosen at once.
+
+    :board: The board to place the ship on.
+    :length: Length of the ship.
+    :rng: Random number generator.
+    :legal: LegalPlacements of the board tracking the length, or None.
+    :return: Tuple (start_row, start_col, end_row, end_col), or None if the ship does not fit anymore.
+    """
+    if legal is not None:
+        free = legal.placements(length)
+        return rng.choice(free) if free else None
+
+    count = placement_count(board.rows, board.cols, length)
+    if count == 0:
+        return None
+
+    for _ in range(RANDOM_DRAWS):
+        ends = placement_ends(board.rows, board.cols, length, rng.randrange(count))
+        if board.is_free(board.line_mask(*ends)):
+            return ends
+
+    free = [ends for ends in (placement_ends(board.rows, board.cols, length, placement_id)
+                              for placement_id in range(count))
+            if board.is_free(board.line_mask(*ends))]
+
+    return rng.choice(free) if free else None
+
+
+
+
+def place_randomly(board, ships, rng=random, attempts=100):
+    """
+    Places a fleet on a copy of a board, one ship after the other, each on a random free placement.
+    If a ship does not fit anymore, the fleet is placed again from the start.
+
+    This sampler is fast on any board size, but fleets are not exactly uniform:
+    ships placed first constrain the later ones. Use place_uniformly for statistics.
+    Once ships cover CROWDED_SHARE of the board, the free placements of the remaining
+    ships are collected and then updated with every ship placed, instead of being
+    enumerated again for every ship.
+
+    :board: The board to add the fleet to, it is not modified.
+    :ships: List of (name, length) tuples like SHIPS.
+    :rng: Random number generator.
+    :attempts: Number of attempts before giving up.
+    :return: A new board with the fleet placed.
+    """
+    for _ in range(attempts):
+        placed = copy.deepcopy(board)
+        legal = None  # Free placements of the remaining ships, once the board is crowded
+
+        for index, (ship_name, ship_length) in enumerate(ships):
+            if legal is None and placed.ship_cells() >= CROWDED_SHARE * placed.rows * placed.cols:
+                legal = LegalPlacements(placed, [length for _, length in ships[index:]])
+
+            ends = random_ends(placed, ship_length, rng, legal)
+            if ends is None:
+                break  # Dead end, start over
+            placed.place(placed.line_mask(*ends), ship_name)
+            if legal is not None:
+                legal.place(*ends)
+        else:
+            return placed
+
+    raise ValueError(f'the fleet does not fit on the board after {attempts} attempts')
+
+
+
+
+class FleetCounts:
+    """
+    The number of fleets that fit on a board, counted to draw one of them exactly uniformly.
+
+    The cells are visited row by row, along the shorter side of the board. After a cell, a
+    partial fleet is described by its frontier: for every column, how many of its next cells
+    are covered by a vertical ship already placed, or -1 if the next one is covered by a
+    horizontal ship. At a free cell a ship may start horizontally or vertically, or the cell
+    stays empty. For every frontier, the numbers of partial fleets with each number of ships
+    of each length are packed into the fields of one integer, so placing a ship shifts the
+    fields and partial fleets reaching the same frontier are added up at once. The effort
+    grows exponentially with the width of the board, but only with the product of the numbers
+    of ships of each length, see countable.
+
+    Ships of equal length are counted once however they are ordered. A fleet is drawn
+    backwards from the last cell, each cell in proportion to the partial fleets before it.
+    """
+
+    def __init__(self, board, lengths):
+        """
+        Counts the fleets of a board.
+
+        :board: The board, ships already on it are kept.
+        :lengths: Lengths of the ships of the fleet.
+        """
+        self.transposed = board.cols > board.rows
+        self.rows, self.cols = (board.cols, board.rows) if self.transposed else (board.rows, board.cols)
+        self.free = [board.is_free(board.line_mask(*self.ends(row, col, row, col)))
+                     for row in range(self.rows) for col in range(self.cols)]
+        self.lengths = sorted(set(lengths))
+        counts = [lengths.count(length) for length in self.lengths]
+
+        # The field of the partial fleets with used[j] ships of length j has the index sum(used[j] * strides[j])
+        self.strides = [1]
+        for count in counts[:-1]:
+            self.strides.append(self.strides[-1] * (count + 1))
+        fields = self.strides[-1] * (counts[-1] + 1)
+        self.complete = sum(count * stride for count, stride in zip(counts, self.strides))
+
+        # Fields are wide enough for every choice of placements of every ship
+        self.width = sum(count * placement_count(self.rows, self.cols, length).bit_length()
+                         for length, count in zip(self.lengths, counts)) + 1
+        # Fields of the partial fleets that can place another ship of each length
+        self.masks = [sum(((1 << self.width) - 1) << (field * self.width)
+                          for field in range(fields) if field // stride % (count + 1) < count)
+                      for stride, count in zip(self.strides, counts)]
+
+        self.layers = [{(0,) * self.cols: 1}]  # Cell index -> frontier before the cell -> packed counts
+        for index in range(len(self.free)):
+            layer = {}
+            for frontier, packed in self.layers[index].items():
+                for following, ship in self.transitions(index, frontier):
+                    if ship is not None:
+                        packed_ship = (packed & self.masks[ship]) << (self.strides[ship] * self.width)
+                        if packed_ship:
+                            layer[following] = layer.get(following, 0) + packed_ship
+                    else:
+                        layer[following] = layer.get(following, 0) + packed
+            self.layers.append(layer)
+
+        self.total = self.count(len(self.free), (0,) * self.cols, self.complete)
+
+
+    @staticmethod
+    def countable(board, lengths):
+        """
+        Tells whether the fleets of a board can be counted in reasonable time and memory.
+
+        Between two rows, every column of a frontier holds a number below the longest length,
+        and every frontier packs a field for each number of ships of each length.
+
+        :board: The board.
+        :lengths: Lengths of the ships of the fleet.
+        :return: True if there are at most MAX_COUNT_STATES frontiers times fields.
+        """
+        states = max(lengths) ** min(board.rows, board.cols)
+        for length in set(lengths):
+            states *= lengths.count(length) + 1
+        return states <= MAX_COUNT_STATES
+
+
+    def ends(self, start_row, start_col, end_row, end_col):
+        """
+        Returns the ends of a ship on the board from the ends in the order the cells are visited.
+        """
+        if self.transposed:
+            return start_col, start_row, end_col, end_row
+        return start_row, start_col, end_row, end_col
+
+
+    def count(self, index, frontier, field):
+        """
+        Returns the number of partial fleets before a cell with a frontier and the numbers of ships of a field.
+        """
+        return self.layers[index].get(frontier, 0) >> (field * self.width) & ((1 << self.width) - 1)
+
+
+    def transitions(self, index, frontier):
+        """
+        Generates the frontiers after a cell.
+
+        :index: Index of the cell, row * cols + col in the order the cells are visited.
+        :frontier: Frontier before the cell.
+        :return: Generator of tuples (frontier, ship), ship is the index of the length of a ship starting at the cell, or None.
+        """
+        row, col = divmod(index, self.cols)
+        covered = frontier[col]
+
+        if covered:
+            # The cell belongs to a ship that is already placed
+            if self.free[index]:
+                yield frontier[:col] + (max(covered - 1, 0),) + frontier[col + 1:], None
+            return
+
+        yield frontier, None  # The cell stays empty
+
+        if not self.free[index]:
+            return
+
+        for ship, length in enumerate(self.lengths):
+            if col + length <= self.cols and not any(frontier[col + 1:col + length]):
+                yield frontier[:col] + (0,) + (-1,) * (length - 1) + frontier[col + length:], ship
+
+            if length > 1 and row + length <= self.rows:
+                yield frontier[:col] + (length - 1,) + frontier[col + 1:], ship
+
+
+    def origins(self, index, frontier):
+        """
+        Generates the frontiers before a cell that lead to a frontier after it, the inverse of transitions.
+
+        :return: Generator of tuples (frontier, ship, ends), ends of the ship starting at the cell, or None.
+        """
+        row, col = divmod(index, self.cols)
+        covered = frontier[col]
+
+        if not self.free[index]:
+            if not covered:
+                yield frontier, None, None
+            return
+
+        if covered > 0:
+            if covered + 1 < max(self.lengths):
+                yield frontier[:col] + (covered + 1,) + frontier[col + 1:], None, None  # A vertical ship continues
+        else:
+            for before in (1, -1, 0):  # The end of a vertical ship, a horizontal ship or an empty cell
+                yield frontier[:col] + (before,) + frontier[col + 1:], None, None
+
+        for ship, length in enumerate(self.lengths):
+            if not covered and col + length <= self.cols and frontier[col + 1:col + length] == (-1,) * (length - 1):
+                yield frontier[:col] + (0,) * length + frontier[col + length:], ship, (row, col, row, col + length - 1)
+
+            if length > 1 and covered == length - 1 and row + length <= self.rows:
+                yield frontier[:col] + (0,) + frontier[col + 1:], ship, (row, col, row + length - 1, col)
+
+
+    def sample(self, rng=random):
+        """
+        Draws a fleet uniformly among all fleets.
+
+        :rng: Random number generator.
+        :return: List of (length, ends) tuples of the ships.
+        """
+        if not self.total:
+            raise ValueError('the fleet does not fit on the board')
+
+        frontier, field = (0,) * self.cols, self.complete
+        ships = []
+
+        for index in range(len(self.free) - 1, -1, -1):
+            choice = rng.randrange(self.count(index + 1, frontier, field))
+
+            for before, ship, ends in self.origins(index, frontier):
+                used = field - self.strides[ship] if ship is not None else field
+                choice -= self.count(index, before, used)
+                if choice < 0:
+                    break
+
+            frontier, field = before, used
+            if ship is not None:
+                ships.append((self.lengths[ship], self.ends(*ends)))
+
+        return ships
+
+
+
+
+def place_uniformly(board, ships, rng=random, max_tries=1_000_000, count_after=COUNT_AFTER_TRIES):
+    """
+    Places a fleet on a copy of a board, exactly uniformly among all fleets that fit.
+
+    Sparse fleets are drawn by rejection: every ship is drawn uniformly among all of
+    its placements, which are counted and decoded by id, and the whole fleet is
+    rejected as soon as a ship overlaps. Accepted fleets are uniformly distributed,
+    no matter in which order ships are drawn or rejected. As the acceptance rate falls
+    exponentially with the density of the fleet, crowded fleets are drawn from the
+    exact counts of FleetCounts after count_after rejected fleets instead, and the ships
+    of each length are assigned to the drawn positions in random order. Boards too wide
+    to be counted keep rejecting fleets up to max_tries.
+
+    :board: The board to add the fleet to, it is not modified.
+    :ships: List of (name, length) tuples like SHIPS.
+    :rng: Random number generator.
+    :max_tries: Number of tries before giving up if the fleets cannot be counted.
+    :count_after: Number of fleets drawn by rejection before the fleets are counted.
+    :return: A new board with the fleet placed.
+    """
+    counts = [placement_count(board.rows, board.cols, ship_length) for _, ship_length in ships]
+    if 0 in counts:
+        raise ValueError('a ship of the fleet does not fit on the board')
+
+    lengths = [ship_length for _, ship_length in ships]
+    countable = FleetCounts.countable(board, lengths)
+
+    for _ in range(min(count_after, max_tries) if countable else max_tries):
+        fleet = []
+        taken = set()
+
+        for (ship_name, ship_length), count in zip(ships, counts):
+            ends = placement_ends(board.rows, board.cols, ship_length, rng.randrange(count))
+            start_row, start_col, end_row, end_col = ends
+            cells = {(row, col) for row in range(start_row, end_row + 1) for col in range(start_col, end_col + 1)}
+
+            if not taken.isdisjoint(cells) or not board.is_free(board.line_mask(*ends)):
+                break  # Reject the whole fleet
+
+            taken |= cells
+            fleet.append((ship_name, ends))
+        else:
+            break
+    else:
+        if not countable:
+            raise ValueError(f'no fitting fleet was drawn in {max_tries} tries')
+
+        positions = {}  # Length -> ends of the drawn ships of the length
+        for ship_length, ends in FleetCounts(board, lengths).sample(rng):
+            positions.setdefault(ship_length, []).append(ends)
+        for ends in positions.values():
+            rng.shuffle(ends)
+        fleet = [(ship_name, positions[ship_length].pop()) for ship_name, ship_length in ships]
+
+    placed = copy.deepcopy(board)
+    for ship_name, ends in fleet:
+        placed.place(placed.line_mask(*ends), ship_name)
+
+    return placed
+
+
+
+
+def random_board(rows, cols, ships, backend='bitboard', uniform=False, rng=random):
+    """
+    Creates a board with a randomly placed fleet, without any user interaction.
+
+    :rows: Number of rows of the board.
+    :cols: Number of columns of the board.
+    :ships: List of (name, length) tuples like SHIPS.
+    :backend: Board backend, see create_board.
+    :uniform: True to use the exactly uniform sampler instead of the fast one.
+    :rng: Random number generator.
+    :return: The board with the fleet placed.
+    """
+    board = create_board(rows, cols, backend)
+
+    if uniform:
+        return place_uniformly(board, ships, rng)
+
+    return place_randomly(board, ships, rng)
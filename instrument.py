@@ -0,0 +1,228 @@
+"""
+Opt-in timing of the hot paths of a session: input parsing, validation, shots,
+screen clearing, rendering and scoreboard I/O.
+
+Instrumentation is enabled with the BATTLESHIPS_PROFILE environment variable or
+the --profile command line flag of battleships.py. Set it to 1 for a report on
+standard error when the program exits, or to a file name to dump the histograms
+as JSON instead. When disabled, a timer costs one flag check.
+"""
+import atexit
+import functools
+import os
+import sys
+import time
+
+enabled = False
+histograms = {}  # Phase -> Histogram
+dump_path = None
+started = time.perf_counter_ns()  # Start of the program, as far as it can be measured: this module is imported first
+milestones = set()  # Phases recorded by milestone
+
+
+class Histogram:
+    """
+    Latencies of a phase in buckets of powers of two nanoseconds.
+    """
+
+    def __init__(self):
+        self.buckets = [0] * 64  # Bucket i counts latencies below 2 ** i nanoseconds
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+    def add(self, nanoseconds):
+        """
+        Records one latency.
+        """
+        self.buckets[min(nanoseconds.bit_length(), 63)] += 1
+        self.count += 1
+        self.total += nanoseconds
+        self.max = max(self.max, nanoseconds)
+
+
+    def percentile(self, percent):
+        """
+        Returns the upper bound of the bucket containing a percentile, in nanoseconds.
+        """
+        rank = self.count * percent / 100
+        seen = 0
+
+        for bucket, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** bucket, self.max)
+
+        return self.max
+
+
+    def summary(self):
+        """
+        Returns count, mean, percentiles and maximum in microseconds as dictionary.
+        """
+        return {
+            'count': self.count,
+            'mean_us': self.total / self.count / 1000 if self.count else 0,
+            'p50_us': self.percentile(50) / 1000,
+            'p90_us': self.percentile(90) / 1000,
+            'p99_us': self.percentile(99) / 1000,
+            'max_us': self.max / 1000,
+        }
+
+
+
+
+class Timer:
+    """
+    Context manager adding the time spent in its block to the histogram of a phase.
+    """
+    __slots__ = ('phase', 'start')
+
+    def __init__(self, phase):
+        self.phase = phase
+
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+
+    def __exit__(self, *exc_info):
+        record(self.phase, time.perf_counter_ns() - self.start)
+
+
+class NullTimer:
+    """
+    Context manager doing nothing, used while instrumentation is disabled.
+    """
+
+    def __enter__(self):
+        pass
+
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+
+
+def record(phase, nanoseconds):
+    """
+    Adds a latency to the histogram of a phase.
+    """
+    histogram = histograms.get(phase)
+    if histogram is None:
+        histogram = histograms[phase] = Histogram()
+
+    histogram.add(nanoseconds)
+
+
+
+
+def milestone(phase):
+    """
+    Records the time since the program started as phase, only the first time it is reached,
+    e.g. milestone('first_paint') when the menu is shown. Milestones are recorded even before
+    instrumentation is enabled by the command line.
+    """
+    if phase not in milestones:
+        milestones.add(phase)
+        record(phase, time.perf_counter_ns() - started)
+
+
+
+
+def timer(phase):
+    """
+    Returns a context manager timing its block as phase, e.g. with timer('parse'): ...
+    """
+    return Timer(phase) if enabled else NULL_TIMER
+
+
+
+
+def timed(phase):
+    """
+    Decorator timing every call of a function as phase.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return function(*args, **kwargs)
+
+            with Timer(phase):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+
+
+def enable(path=None):
+    """
+    Enables instrumentation and reports or dumps the histograms when the program exits.
+
+    :path: File to dump the histograms to as JSON, None to print a report on standard error.
+    """
+    global enabled, dump_path
+
+    if not enabled:
+        atexit.register(finish)
+
+    enabled = True
+    dump_path = path
+
+
+
+
+def report(file=None):
+    """
+    Prints a table of the latencies of every phase.
+    """
+    file = file or sys.stderr
+    print(f"{'phase':12} {'count':>8} {'mean us':>10} {'p50 us':>10} {'p90 us':>10} {'p99 us':>10} {'max us':>10}",
+          file=file)
+
+    for phase, histogram in sorted(histograms.items()):
+        summary = histogram.summary()
+        print(f"{phase:12} {summary['count']:8d} {summary['mean_us']:10.1f} {summary['p50_us']:10.1f} "
+              f"{summary['p90_us']:10.1f} {summary['p99_us']:10.1f} {summary['max_us']:10.1f}", file=file)
+
+
+
+
+def dump(path):
+    """
+    Writes the summaries and non-empty buckets of every phase to a JSON file.
+    """
+    import json  # Only imported when dumping, so it does not add to the startup time
+
+    with open(path, 'w') as file:
+        # Only non-empty buckets, keyed by their upper bound in nanoseconds
+        json.dump({phase: dict(histogram.summary(),
+                               buckets={2 ** bucket: count for bucket, count in enumerate(histogram.buckets) if count})
+                   for phase, histogram in histograms.items()}, file, indent=1)
+
+
+
+
+def finish():
+    """
+    Reports or dumps the histograms, called when the program exits.
+    """
+    if dump_path:
+        dump(dump_path)
+    else:
+        report()
+
+
+
+
+if os.environ.get('BATTLESHIPS_PROFILE'):
+    enable(None if os.environ['BATTLESHIPS_PROFILE'] == '1' else os.environ['BATTLESHIPS_PROFILE'])
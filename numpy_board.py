@@ -0,0 +1,252 @@
+import numpy as np
+
+from board import Board, HIT, MISS, SUNK
+
+# Cell states stored in the int8 array of a NumpyBoard
+EMPTY_CELL = 0
+SHIP_CELL = 1
+HIT_CELL = 2
+MISS_CELL = 3
+
+# Cell state -> cell value in the grid encoding used by the ui
+GRID_VALUES = (None, True, False, 'miss')
+
+
+class NumpyBoard(Board):
+    """
+    A battleships grid stored as a NumPy array of int8 cell states, meant for very large boards.
+
+    It offers the same interface as Board, but ship positions are regions of the
+    array (a pair of slices) instead of bitmasks, so placement checks, batches of
+    shots and win checks are vectorized. Cell values for the ui are only decoded
+    when a row is requested.
+    """
+
+    def __init__(self, rows, cols):
+        """
+        Creates an empty board.
+
+        :rows: Number of rows of the board.
+        :cols: Number of columns of the board.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.cells = np.zeros((rows, cols), dtype=np.int8)
+        self.remaining = 0
+        self.ship_ids = np.full((rows, cols), -1, dtype=np.int32)  # Cell -> ship id, -1 for no ship
+        self.ship_names = []  # Ship id -> name
+        self.ship_remaining = []  # Ship id -> number of intact cells
+        self.last_shot = None  # (row, col) of the last shot, used by the ui to show that part of large boards
+
+
+    @classmethod
+    def from_grid(cls, grid):
+        """
+        Creates a board from a two-dimensional grid of cell values.
+
+        :grid: The grid as a list of rows, using True, False, 'miss' and None as cell values.
+        :return: The equivalent board.
+        """
+        board = cls(len(grid), len(grid[0]))
+        states = {True: SHIP_CELL, False: HIT_CELL, 'miss': MISS_CELL}
+        board.cells[:] = [[states.get(value, EMPTY_CELL) for value in values] for values in grid]
+        board.remaining = board.count_remaining()
+
+        return board
+
+
+    def line_mask(self, start_row, start_col, end_row, end_col):
+        """
+        Returns the region of a horizontal or vertical line of cells, including both ends.
+
+        :return: Pair of slices selecting the cells of the line.
+        """
+        if not (0 <= min(start_row, end_row) and max(start_row, end_row) < self.rows
+                and 0 <= min(start_col, end_col) and max(start_col, end_col) < self.cols):
+            raise IndexError('line is outside of the board')
+
+        return (slice(min(start_row, end_row), max(start_row, end_row) + 1),
+                slice(min(start_col, end_col), max(start_col, end_col) + 1))
+
+
+    def is_free(self, mask):
+        """
+        Checks that none of the cells of a region are occupied by a ship.
+
+        :mask: Region of the cells to check.
+        :return: True if no ship occupies any of the cells.
+        """
+        return not self.cells[mask].any()
+
+
+    def place(self, mask, name='Ship'):
+        """
+        Places a ship on the cells of a region.
+
+        :mask: Region of the ship's cells.
+        :name: Name of the ship, reported when it is sunk.
+        :return: The id of the placed ship.
+        """
+        ship_id = len(self.ship_names)
+        length = self.cells[mask].size
+
+        self.cells[mask] = SHIP_CELL
+        self.ship_ids[mask] = ship_id
+        self.ship_names.append(name)
+        self.ship_remaining.append(length)
+        self.remaining += length
+
+        return ship_id
+
+
+    def fire(self, row, col):
+        """
+        Fires a shot at a cell and records the hit or miss.
+
+        :row: Zero-based row index.
+        :col: Zero-based column index.
+        :return: 'hit', 'sunk <name>' or 'miss', and None if the cell was already shot at.
+        """
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError(f'cell ({row}, {col}) is outside of the board')
+
+        state = self.cells[row, col]
+
+        if state == EMPTY_CELL or state == SHIP_CELL:
+            self.last_shot = (row, col)
+
+        if state == EMPTY_CELL:
+            self.cells[row, col] = MISS_CELL
+            return MISS
+
+        if state != SHIP_CELL:
+            return None
+
+        self.cells[row, col] = HIT_CELL
+        self.remaining -= 1
+
+        ship_id = self.ship_ids[row, col]
+        if ship_id < 0:
+            return HIT  # Ships of boards created from grids are not identified
+
+        self.ship_remaining[ship_id] -= 1
+        if self.ship_remaining[ship_id] == 0:
+            return f'{SUNK} {self.ship_names[ship_id]}'
+
+        return HIT
+
+
+    def fire_many(self, rows, cols):
+        """
+        Fires a batch of shots at once. Repeated shots at a cell only count once.
+
+        :rows: Sequence of zero-based row indices.
+        :cols: Sequence of zero-based column indices.
+        :return: Tuple of the array of cell states after each shot (HIT_CELL or MISS_CELL,
+                 -1 for cells that were already shot at) and the list of names of the sunk ships.
+        """
+        rows = np.asarray(rows, dtype=np.intp)
+        cols = np.asarray(cols, dtype=np.intp)
+
+        if rows.size and (rows.min() < 0 or rows.max() >= self.rows or cols.min() < 0 or cols.max() >= self.cols):
+            raise IndexError('shot is outside of the board')
+
+        # Only the first shot at a cell counts, later ones are reported as repeated
+        _, first = np.unique(rows * self.cols + cols, return_index=True)
+        fresh = np.zeros(rows.size, dtype=bool)
+        fresh[first] = True
+
+        before = self.cells[rows, cols]
+        fresh &= (before == EMPTY_CELL) | (before == SHIP_CELL)
+        hit = fresh & (before == SHIP_CELL)
+        miss = fresh & (before == EMPTY_CELL)
+
+        self.cells[rows[hit], cols[hit]] = HIT_CELL
+        self.cells[rows[miss], cols[miss]] = MISS_CELL
+        self.remaining -= int(hit.sum())
+        if fresh.any():
+            last = np.flatnonzero(fresh)[-1]
+            self.last_shot = (int(rows[last]), int(cols[last]))
+
+        # Count the hits per ship and report the ships left without intact cells
+        sunk = []
+        ship_ids = self.ship_ids[rows[hit], cols[hit]]
+        ship_ids = ship_ids[ship_ids >= 0]
+        for ship_id, hits in zip(*np.unique(ship_ids, return_counts=True)):
+            self.ship_remaining[ship_id] -= int(hits)
+            if self.ship_remaining[ship_id] == 0:
+                sunk.append(self.ship_names[ship_id])
+
+        states = np.full(rows.size, -1, dtype=np.int8)
+        states[hit] = HIT_CELL
+        states[miss] = MISS_CELL
+
+        return states, sunk
+
+
+    def ship_cells(self):
+        """
+        Returns the number of cells occupied by ships.
+        """
+        return int(np.count_nonzero((self.cells == SHIP_CELL) | (self.cells == HIT_CELL)))
+
+
+    def count_remaining(self):
+        """
+        Counts the intact ship cells from the array instead of the tracked counter.
+        """
+        return int(np.count_nonzero(self.cells == SHIP_CELL))
+
+
+    def cell(self, row, col):
+        """
+        Returns the value of a cell in the grid encoding used by the ui.
+
+        :return: True for an intact ship cell, False for a hit ship cell, 'miss' for a missed shot and None otherwise.
+        """
+        if not (0 <= row < self.rows and 0 <= col < self.cols):
+            raise IndexError(f'cell ({row}, {col}) is outside of the board')
+
+        return GRID_VALUES[self.cells[row, col]]
+
+
+    def row_slice(self, row, start, stop):
+        """
+        Returns the cell values of a part of a row, without decoding the rest of the row.
+
+        :row: Zero-based row index.
+        :start: First column.
+        :stop: Column after the last one.
+        :return: List of the cell values in the grid encoding used by the ui.
+        """
+        if not 0 <= row < self.rows:
+            raise IndexError(f'row {row} is outside of the board')
+
+        return [GRID_VALUES[state] for state in self.cells[row, start:stop].tolist()]
+
+
+    def overview(self, block):
+        """
+        Summarizes square blocks of cells, e.g. for a minimap of a large board.
+
+        :block: Number of rows and columns of a block.
+        :return: List of rows of block values: False if a ship cell in the block was hit, 'miss' if
+                 cells were missed, True if the block contains intact ship cells and None otherwise.
+        """
+        # Pad the cells to whole blocks and reduce every block to its most important state
+        rows, cols = -(-self.rows // block), -(-self.cols // block)
+        cells = np.zeros((rows * block, cols * block), dtype=np.int8)
+        cells[:self.rows, :self.cols] = self.cells
+        blocks = cells.reshape(rows, block, cols, block)
+
+        hits = (blocks == HIT_CELL).any(axis=(1, 3))
+        misses = (blocks == MISS_CELL).any(axis=(1, 3))
+        ships = (blocks == SHIP_CELL).any(axis=(1, 3))
+
+        return [[False if hit else 'miss' if miss else True if ship else None
+                 for hit, miss, ship in zip(*values)]
+                for values in zip(hits.tolist(), misses.tolist(), ships.tolist())]
+
+
+    def __getitem__(self, row):
+        return self.row_slice(row, 0, self.cols)
@@ -0,0 +1,181 @@
+import functools
+
+# Boards with more cells use computed masks instead of precomputed placement tables
+MAX_TABLE_CELLS = 10_000
+
+
+class PlacementTable:
+    """
+    Every horizontal and vertical placement of a ship of one length on a board of one size.
+
+    Placement ids index the lists ends and masks. The ends of a placement are
+    (start_row, start_col, end_row, end_col) with the start being the top left
+    cell, the mask has the bits of the covered cells set (bit row * cols + col).
+    """
+
+    def __init__(self, rows, cols, length):
+        """
+        Builds the table.
+
+        :rows: Number of rows of the board.
+        :cols: Number of columns of the board.
+        :length: Length of the ship.
+        """
+        self.rows = rows
+        self.cols = cols
+        self.length = length
+        self.ends = []
+        self.masks = []
+        self.ids = {}  # Ends -> placement id
+        self.covering = [[] for _ in range(rows * cols)]  # Cell index -> ids of the placements covering it
+
+        horizontal = (1 << length) - 1
+        vertical = sum(1 << (i * cols) for i in range(length))
+
+        for row in range(rows):
+            for col in range(cols - length + 1):
+                self.__add((row, col, row, col + length - 1), horizontal << (row * cols + col))
+
+        # A ship of length 1 would otherwise be added twice
+        if length > 1:
+            for row in range(rows - length + 1):
+                for col in range(cols):
+                    self.__add((row, col, row + length - 1, col), vertical << (row * cols + col))
+
+
+    def __add(self, ends, mask):
+        placement_id = len(self.ends)
+        self.ends.append(ends)
+        self.masks.append(mask)
+        self.ids[ends] = placement_id
+
+        start_row, start_col, end_row, end_col = ends
+        for row in range(start_row, end_row + 1):
+            for col in range(start_col, end_col + 1):
+                self.covering[row * self.cols + col].append(placement_id)
+
+
+    def __len__(self):
+        return len(self.ends)
+
+
+
+
+@functools.lru_cache(maxsize=64)
+def placement_table(rows, cols, length):
+    """
+    Returns the placement table of a board size and ship length.
+    Tables are cached, so all boards of the same size share them.
+
+    :return: The PlacementTable.
+    """
+    return PlacementTable(rows, cols, length)
+
+
+
+
+def placement_count(rows, cols, length):
+    """
+    Returns the number of horizontal and vertical placements of a ship length, without building a table.
+    """
+    horizontal = rows * max(cols - length + 1, 0)
+    vertical = max(rows - length + 1, 0) * cols if length > 1 else 0
+
+    return horizontal + vertical
+
+
+
+
+def placement_ends(rows, cols, length, placement_id):
+    """
+    Returns the ends of a placement by its id, in the order used by placement tables.
+    This allows drawing placements uniformly on boards that are too large for tables.
+
+    :placement_id: Id between 0 and placement_count(rows, cols, length) - 1.
+    :return: Tuple (start_row, start_col, end_row, end_col).
+    """
+    per_row = max(cols - length + 1, 0)
+
+    if placement_id < rows * per_row:
+        row, col = divmod(placement_id, per_row)
+        return row, col, row, col + length - 1
+
+    row, col = divmod(placement_id - rows * per_row, cols)
+    return row, col, row + length - 1, col
+
+
+
+
+def normalize_ends(start_row, start_col, end_row, end_col):
+    """
+    Orders the ends of a horizontal or vertical ship so that the start is the top left cell.
+
+    :return: Tuple (start_row, start_col, end_row, end_col) as used by placement tables.
+    """
+    return min(start_row, end_row), min(start_col, end_col), max(start_row, end_row), max(start_col, end_col)
+
+
+
+
+class LegalPlacements:
+    """
+    The placements of each ship length that are still free on a board.
+
+    The sets of free placement ids are computed once from the board and then
+    updated incrementally: placing a ship only removes the placements that
+    cross one of its cells.
+    """
+
+    def __init__(self, board, lengths):
+        """
+        Collects the free placements of a board.
+
+        :board: The Board (or NumpyBoard) ships are placed on.
+        :lengths: Ship lengths to track.
+        """
+        self.board = board
+        self.tables = {length: placement_table(board.rows, board.cols, length) for length in set(lengths)}
+        self.free = {
+            length: {placement_id for placement_id, ends in enumerate(table.ends)
+                     if board.is_free(board.line_mask(*ends))}
+            for length, table in self.tables.items()
+        }
+
+
+    def place(self, start_row, start_col, end_row, end_col):
+        """
+        Removes the placements crossing the cells of a newly placed ship.
+        """
+        start_row, start_col, end_row, end_col = normalize_ends(start_row, start_col, end_row, end_col)
+
+        for length, table in self.tables.items():
+            free = self.free[length]
+            for row in range(start_row, end_row + 1):
+                for col in range(start_col, end_col + 1):
+                    free.difference_update(table.covering[row * table.cols + col])
+
+
+    def is_free(self, start_row, start_col, end_row, end_col):
+        """
+        Checks if a ship can still be placed at the given ends.
+        """
+        ends = normalize_ends(start_row, start_col, end_row, end_col)
+        length = ends[2] - ends[0] + ends[3] - ends[1] + 1
+        table = self.tables.get(length)
+
+        return table is not None and table.ids.get(ends) in self.free[length]
+
+
+    def count(self, length):
+        """
+        Returns the number of free placements of a ship length.
+        """
+        return len(self.free[length])
+
+
+    def placements(self, length):
+        """
+        Returns the ends of all free placements of a ship length.
+        """
+        table = self.tables[length]
+        return [table.ends[placement_id] for placement_id in sorted(self.free[length])]
@@ -0,0 +1,1588 @@
+import atexit
+import datetime
+import heapq
+import itertools
+import mmap
+import os
+import pickle
+import struct
+import sys
+import threading
+import time
+import zlib
+
+from instrument import timer
+
+SCOREBOARD_FILE = 'scoreboard.dat'
+DATABASE_FILE = 'scoreboard.db'
+HASHED_FILE = 'scoreboard.map'
+PERIODS_DIRECTORY = 'scoreboard.days'
+
+# Names of the scoreboard backends, the file is the default
+SCOREBOARD_BACKENDS = ('file', 'sqlite', 'mmap')
+
+# Leaderboards of the wins of the last days, and how many days the wins are kept for them
+PERIODS = {'daily': 1, 'weekly': 7, 'monthly': 30}
+KEEP_DAYS = max(PERIODS.values())
+
+# The log of wins is compacted once it has more records than this and than there are players
+COMPACT_RECORDS = 1000
+
+# Wins are written in the background once no win followed for this many seconds, or at once after this many wins
+FLUSH_DELAY = 2.0
+FLUSH_WINS = 20
+
+# Binary scoreboard files start with the magic bytes, the number of blocks of the snapshot and a random
+# generation, which changes whenever the file is replaced by a new snapshot
+MAGIC = b'BSB\x02'
+HEADER = struct.Struct('<4sQQ')
+# Files of the first version have no generation, they are read and converted when written next
+MAGIC_V1 = b'BSB\x01'
+HEADER_V1 = struct.Struct('<4sQ')
+# Every block of records starts with the number of records and the sizes of the names and the scores in bytes
+BLOCK = struct.Struct('<III')
+BLOCK_RECORDS = 4096  # Records per block of a snapshot, larger blocks mean the file is corrupt
+MAX_VARINT_BYTES = 10  # Scores up to 2 ** 70, longer varints mean the file is corrupt
+
+# Hashed scoreboard files start with the magic bytes, the number of players and a checksum of both,
+# followed by slots of a fixed size. The header takes the place of one slot, so slots stay aligned.
+HASHED_MAGIC = b'BSH\x01'
+HASHED_HEADER = struct.Struct('<4sQI')
+# Every slot holds the length of the name plus one (0 for an empty slot) and the UTF-8 encoded name,
+# followed by two versions of the score with a sequence number and a checksum each
+SLOT = struct.Struct('<H86sQQIQQI')
+SLOT_NAME = struct.Struct('<H86s')
+SLOT_VERSION = struct.Struct('<QQI')
+SLOT_SCORE = struct.Struct('<QQ')  # Sequence number and score of a version, the part covered by its checksum
+SLOT_SIZE = SLOT.size  # 128 bytes
+VERSION_OFFSETS = (SLOT_NAME.size, SLOT_NAME.size + SLOT_VERSION.size)
+MAX_NAME_BYTES = SLOT_NAME.size - 3
+MIN_SLOTS = 1024  # Slots of a new file, always a power of two
+MAX_LOAD = 0.7  # The file is rehashed into twice as many slots once more slots than this are used
+
+
+def valid_scores(scoreboard):
+    """
+    Returns the players with a valid name (a string) and score (a positive integer) of a loaded scoreboard.
+    """
+    if not isinstance(scoreboard, dict):
+        return {}
+
+    return {player: score for player, score in scoreboard.items()
+            if isinstance(player, str) and isinstance(score, int) and score > 0}
+
+
+
+
+def encode_varint(value):
+    """
+    Encodes a non-negative integer as varint, 7 bits per byte from the lowest ones,
+    with the high bit set in every byte but the last one.
+    """
+    if value < 0x80:
+        return bytes((value,))
+
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value >>= 7
+    encoded.append(value)
+
+    return bytes(encoded)
+
+
+
+
+def decode_varints(data):
+    """
+    Decodes a sequence of varints.
+
+    :return: List of the integers, None if the data ends in the middle of a varint or a varint is too long.
+    """
+    if data.isascii():
+        return list(data)  # Every integer fits in one byte
+
+    values, value, shift = [], 0, 0
+
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            if shift >= 7 * MAX_VARINT_BYTES:
+                return None
+        else:
+            values.append(value)
+            value, shift = 0, 0
+
+    return None if shift else values
+
+
+
+
+def encode_block(records):
+    """
+    Encodes a block of records of a scoreboard file. After the block header come the lengths of the
+    UTF-8 encoded names as unsigned 16 bit integers, the names and the scores as varints, so a whole
+    block is decoded with a few calls instead of one per record.
+
+    :records: List of (name, score) tuples, at most BLOCK_RECORDS.
+    :return: The block as bytes.
+    """
+    names = [player.encode('utf-8') for player, _ in records]
+    scores = [score for _, score in records]
+
+    try:
+        lengths = struct.pack(f'<{len(names)}H', *map(len, names))
+    except struct.error:
+        raise ValueError('player name is too long') from None
+
+    names = b''.join(names)
+    scores = bytes(scores) if max(scores, default=0) < 0x80 else b''.join(map(encode_varint, scores))
+
+    return BLOCK.pack(len(records), len(names), len(scores)) + lengths + names + scores
+
+
+
+
+def decode_names(data, lengths):
+    """
+    Splits the names of a block and decodes them.
+
+    :return: List of the names, None for names that are not valid UTF-8.
+    """
+    offsets = list(itertools.accumulate(lengths, initial=0))
+
+    if data.isascii():
+        # Characters and bytes are the same, decode all names at once
+        text = data.decode('ascii')
+        return [text[start:stop] for start, stop in zip(offsets, offsets[1:])]
+
+    names = []
+    for start, stop in zip(offsets, offsets[1:]):
+        try:
+            names.append(data[start:stop].decode('utf-8'))
+        except UnicodeDecodeError:
+            names.append(None)
+
+    return names
+
+
+
+
+def read_blocks(file):
+    """
+    Decodes the blocks of a scoreboard file one by one, so the file is never read as a whole.
+    Records with a name that is not valid UTF-8 or a score of 0 are skipped while decoding,
+    decoding stops at a block that was not completely written or is corrupt.
+
+    :file: Binary file positioned after the header.
+    :return: Generator of lists of (name, score) tuples, one list per block.
+    """
+    while True:
+        header = file.read(BLOCK.size)
+        if len(header) < BLOCK.size:
+            return
+
+        count, names_size, scores_size = BLOCK.unpack(header)
+        if count > BLOCK_RECORDS or names_size > 0xFFFF * count or scores_size > MAX_VARINT_BYTES * count:
+            return
+
+        data = file.read(2 * count + names_size + scores_size)
+        if len(data) < 2 * count + names_size + scores_size:
+            return  # The block was not completely written
+
+        lengths = struct.unpack_from(f'<{count}H', data)
+        scores = decode_varints(data[2 * count + names_size:])
+        if scores is None or len(scores) != count or sum(lengths) != names_size:
+            return
+
+        names = decode_names(data[2 * count:2 * count + names_size], lengths)
+        yield [(name, score) for name, score in zip(names, scores) if name is not None and score > 0]
+
+
+
+
+class ScoreUnpickler(pickle.Unpickler):
+    """
+    Unpickler for scoreboard files of earlier versions. It refuses to load anything but
+    builtin data like dictionaries, strings and integers, so a file cannot run code.
+    """
+
+    def find_class(self, module, name):
+        raise pickle.UnpicklingError(f'{module}.{name} is not allowed in a scoreboard file')
+
+
+
+
+def read_pickle(file):
+    """
+    Reads a pickled scoreboard file of an earlier version, a pickled dictionary followed by the pickled
+    name of every winner since. Only builtin data is unpickled, see ScoreUnpickler. A file
+    may come from anyone, so a corrupt one raises any exception, not only pickle.UnpicklingError.
+
+    :return: Tuple of the scoreboard, only players with a valid score, and the number of wins after the dictionary.
+    """
+    unpickler = ScoreUnpickler(file)
+    scores = valid_scores(unpickler.load())
+    records = 0
+
+    while True:
+        try:
+            player = unpickler.load()
+        except Exception:
+            break  # End of the log, or a record that was not completely written or is corrupt
+
+        if isinstance(player, str):
+            scores[player] = scores.get(player, 0) + 1
+            records += 1
+
+    return scores, records
+
+
+
+
+def convert_pickle(path=SCOREBOARD_FILE):
+    """
+    Converts a pickled scoreboard file of an earlier version to the binary format.
+
+    :return: The converted scoreboard.
+    """
+    scoreboard = ScoreboardLog(path)
+    scores = scoreboard.load()
+    scoreboard.save(scores)
+
+    return scores
+
+
+
+
+class FileLock:
+    """
+    Context manager holding an exclusive lock of a file, shared by all processes, while its block runs.
+    The lock file is created if needed and never removed. Locks are not reentrant, not even in one process.
+    """
+
+    def __init__(self, path):
+        """
+        :path: Path of the lock file.
+        """
+        self.path = path
+        self.file = None
+
+
+    def __enter__(self):
+        self.file = open(self.path, 'a+b')
+
+        if os.name == 'nt':
+            import msvcrt  # Windows only
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+        else:
+            import fcntl  # Everywhere else
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+
+        return self
+
+
+    def __exit__(self, *exc_info):
+        if os.name == 'nt':
+            import msvcrt
+            self.file.seek(0)
+            msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        else:
+            import fcntl
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+        self.file.close()
+        self.file = None
+
+
+
+
+def file_identity(file):
+    """
+    Returns what identifies an open file. It changes when the file at the path is replaced,
+    as long as the file is kept open, so its inode number cannot be reused.
+    """
+    status = os.fstat(file.fileno())
+
+    return status.st_dev, status.st_ino
+
+
+
+
+class SnapshotLog:
+    """
+    A file made of a snapshot and an append-only log of records, the base of the scoreboard
+    file and of the player statistics.
+
+    The file starts with a header with a random generation, which changes whenever the
+    file is replaced by a new snapshot, followed by the snapshot and then by a record for
+    every change since. A change only appends its record instead of rewriting the whole
+    file. Once the log has more records than compact_records and than there are entries in
+    the snapshot, it is compacted by writing a new snapshot, so loading reads at most about
+    twice the size of a snapshot.
+
+    Many processes can share the file. Every write holds the lock file next to it, and
+    first reads the records other processes appended since this process read the file, or
+    the whole file again if another process replaced it with a new snapshot. So no record
+    is lost, and after many processes appended records at once only the first one to find
+    the log too long compacts it.
+
+    Subclasses define the format with clear, read_snapshot, write_snapshot, read_records,
+    encode_record, apply_record and snapshot_size.
+    """
+
+    def __init__(self, path, compact_records=COMPACT_RECORDS):
+        """
+        Creates the log of a file, call load to read it.
+
+        :path: Path of the file.
+        :compact_records: Minimum number of records in the log before it is compacted.
+        """
+        self.path = path
+        self.compact_records = compact_records
+        self.clear()
+
+
+    def clear(self):
+        """
+        Forgets everything that was read, without writing the file.
+        """
+        self.records = 0  # Records in the log after the snapshot
+        self.identity = None  # Header of the file that was read, None if the file must be rewritten before appending
+        self.position = 0  # End of the last record that was read
+
+
+    def read_snapshot(self, file):
+        """
+        Reads the header and the snapshot from the start of a file. Sets identity to the header
+        if the file is in the current format, and position to the end of the snapshot.
+
+        :return: True if a log of records follows the snapshot.
+        """
+        raise NotImplementedError
+
+
+    def write_snapshot(self, file):
+        """
+        Writes the header with a new generation and the snapshot to an empty file.
+
+        :return: The header.
+        """
+        raise NotImplementedError
+
+
+    def read_records(self, file):
+        """
+        Decodes the records of the log from the position of a file one by one, decoding stops at a
+        record that was not completely written or is corrupt.
+
+        :return: Generator of the records.
+        """
+        raise NotImplementedError
+
+
+    def encode_record(self, record):
+        """
+        Encodes a record of the log, raises a ValueError if it cannot be written.
+
+        :return: The record as bytes.
+        """
+        raise NotImplementedError
+
+
+    def apply_record(self, record):
+        """
+        Adds a record to what was read.
+        """
+        raise NotImplementedError
+
+
+    def snapshot_size(self):
+        """
+        Returns the number of entries of a new snapshot.
+        """
+        raise NotImplementedError
+
+
+    def open(self):
+        """
+        Loads the file, see load.
+
+        :return: The log itself.
+        """
+        self.load()
+        return self
+
+
+    def lock(self):
+        """
+        Returns the lock of the file, held by every write.
+        """
+        return FileLock(self.path + '.lock')
+
+
+    def load(self):
+        """
+        Loads the snapshot and replays the log. A missing or invalid file is empty, a last record
+        torn by a crash is ignored.
+
+        :return: The log itself.
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                self.__read(file)
+        except FileNotFoundError:
+            self.clear()
+
+        return self
+
+
+    def __read(self, file):
+        # Reads the whole file
+        self.clear()
+        file.seek(0)
+
+        if self.read_snapshot(file):
+            file.seek(self.position)
+            self.__replay(file)
+
+
+    def __replay(self, file):
+        # Applies the records of the log from the position of the file
+        for record in self.read_records(file):
+            self.apply_record(record)
+            self.records += 1
+            self.position = file.tell()
+
+
+    def __catch_up(self, file):
+        # Reads the records appended since the file was read, or the whole file if it was replaced
+        if self.identity is None or file.read(len(self.identity)) != self.identity \
+                or os.fstat(file.fileno()).st_size < self.position:
+            self.__read(file)
+        else:
+            file.seek(self.position)
+            self.__replay(file)
+
+
+    def refresh(self):
+        """
+        Reads the records other processes appended since the file was read.
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                self.__catch_up(file)
+        except FileNotFoundError:
+            pass  # Keep what was read, it is written again with the next record
+
+
+    def save(self):
+        """
+        Writes what was read as new snapshot with an empty log, replacing the records of all processes.
+        """
+        with self.lock():
+            self.__write()
+
+
+    def __write(self):
+        # Writes the snapshot to a temporary file first, which then replaces the file,
+        # so a crash never leaves a partial snapshot. The lock must be held.
+        temporary = self.path + '.tmp'
+
+        with open(temporary, 'wb') as file:
+            header = self.write_snapshot(file)
+            position = file.tell()
+
+        os.replace(temporary, self.path)
+
+        self.records, self.identity, self.position = 0, header, position
+
+
+    def append(self, records):
+        """
+        Adds records with a single append to the log, and compacts the log if it got too long.
+        The records other processes appended since are read first.
+
+        :records: List of records, see read_records.
+        """
+        data = b''.join(self.encode_record(record) for record in records)  # Fails before anything is changed
+
+        with self.lock():
+            try:
+                with open(self.path, 'r+b') as file:
+                    self.__catch_up(file)
+
+                    if self.identity is not None and data:
+                        if os.fstat(file.fileno()).st_size > self.position:
+                            file.truncate(self.position)  # A record torn by a crash, records after it would never be read
+
+                        file.seek(self.position)
+                        file.write(data)
+                        self.position = file.tell()
+                        self.records += len(records)
+            except FileNotFoundError:
+                self.identity = None  # Keep what was read, it is written again
+
+            # Apply the records only now, so they are not read again from the log
+            for record in records:
+                self.apply_record(record)
+
+            if self.identity is None or self.records > max(self.compact_records, self.snapshot_size()):
+                self.__write()  # The file must be converted, was missing or the log is long enough to compact it
+
+
+
+
+class ScoreboardLog(SnapshotLog):
+    """
+    A scoreboard file made of a snapshot and an append-only log of wins, see SnapshotLog.
+
+    The file is binary: a header, blocks with the name and score of every
+    player of the snapshot, followed by a block with a single record with a
+    score of 1 for every game won since the snapshot was written. Loading adds
+    up the scores of all records.
+
+    Pickled files of earlier versions are still read, without running any code,
+    and are converted to the binary format when the scoreboard is written next.
+    """
+
+    def __init__(self, path=SCOREBOARD_FILE, compact_records=COMPACT_RECORDS):
+        """
+        Creates the scoreboard of a file, call load to read it.
+
+        :path: Path of the scoreboard file.
+        :compact_records: Minimum number of records in the log before it is compacted.
+        """
+        super().__init__(path, compact_records)
+
+
+    def clear(self):
+        """
+        Removes all players, without writing the file.
+        """
+        super().clear()
+        self.scores = {}
+
+
+    def read_snapshot(self, file):
+        header = file.read(HEADER.size)
+
+        if len(header) == HEADER.size and header.startswith(MAGIC):
+            self.identity, self.position = header, HEADER.size
+            snapshot = HEADER.unpack(header)[1]
+        elif len(header) >= HEADER_V1.size and header.startswith(MAGIC_V1):
+            self.position = HEADER_V1.size  # No identity, the file is converted before the next win is appended
+            file.seek(HEADER_V1.size)
+            snapshot = HEADER_V1.unpack_from(header)[1]
+        else:
+            file.seek(0)
+            try:
+                self.scores, self.records = read_pickle(file)
+            except Exception:
+                self.scores, self.records = {}, 0  # Neither a binary nor a valid pickled scoreboard
+            return False
+
+        for records in itertools.islice(read_blocks(file), snapshot):
+            self.scores.update(records)  # Every player appears once in the snapshot
+            self.position = file.tell()
+
+        return True
+
+
+    def write_snapshot(self, file):
+        records = list(valid_scores(self.scores).items())
+        blocks = [encode_block(records[start:start + BLOCK_RECORDS]) for start in range(0, len(records), BLOCK_RECORDS)]
+        header = HEADER.pack(MAGIC, len(blocks), int.from_bytes(os.urandom(8), 'little'))
+
+        file.write(header)
+        file.write(b''.join(blocks))
+
+        return header
+
+
+    def read_records(self, file):
+        return read_blocks(file)
+
+
+    def encode_record(self, record):
+        return encode_block(record)
+
+
+    def apply_record(self, record):
+        for player, score in record:
+            self.scores[player] = self.scores.get(player, 0) + score
+
+
+    def snapshot_size(self):
+        return len(self.scores)
+
+
+    def load(self):
+        """
+        Loads the snapshot and replays the log of wins. A missing or invalid file yields an
+        empty scoreboard, a last record torn by a crash is ignored.
+
+        :return: The scoreboard as dictionary of player names and their scores, only players with a positive
+                 integer score. It is updated in place by record_win.
+        """
+        super().load()
+        return self.scores
+
+
+    def refresh(self):
+        """
+        Reads the wins other processes recorded since the file was read.
+
+        :return: The scoreboard, see load.
+        """
+        super().refresh()
+        return self.scores
+
+
+    def save(self, scoreboard):
+        """
+        Writes a scoreboard as new snapshot with an empty log, replacing the wins of all processes.
+
+        :scoreboard: The scoreboard as dictionary of player names and their scores.
+        """
+        if scoreboard is not self.scores:
+            self.scores = valid_scores(scoreboard)
+
+        super().save()
+
+
+    def record_win(self, player):
+        """
+        Adds a win of a player by appending a record to the log, and compacts the log if it got too long.
+
+        :player: Name of the winner.
+        :return: The updated scoreboard, including the wins of other processes.
+        """
+        return self.record_wins({player: 1})
+
+
+    def record_wins(self, wins):
+        """
+        Adds the wins of several players with a single append to the log, see record_win.
+
+        :wins: Dictionary of player names and their number of wins.
+        :return: The updated scoreboard, including the wins of other processes.
+        """
+        records = [(player, count) for player, count in wins.items() if count > 0]
+        self.append([records[start:start + BLOCK_RECORDS] for start in range(0, len(records), BLOCK_RECORDS)])
+
+        return self.scores
+
+
+    def top(self, count, offset=0):
+        """
+        Returns a page of the players with the highest scores, players with equal scores in the order they were added.
+        The wins other processes recorded since are read first.
+
+        :count: Number of players.
+        :offset: Number of players to skip.
+        :return: List of (name, score) tuples in descending order of the scores.
+        """
+        self.refresh()
+
+        return heapq.nlargest(offset + count, self.scores.items(), key=lambda item: item[1])[offset:]
+
+
+    def close(self):
+        """
+        Closes the scoreboard, every win is already written.
+        """
+
+
+
+
+class SqliteScoreboard:
+    """
+    A scoreboard stored in an SQLite database, meant for many players.
+
+    Scores are kept in a table indexed by score, so a win is an update of a
+    single row and a page of the highest scores is read from the index without
+    loading or sorting the other players. A new database imports the scoreboard
+    file, if there is one.
+    """
+
+    def __init__(self, path=DATABASE_FILE, migrate_from=SCOREBOARD_FILE):
+        """
+        Creates the scoreboard of a database, call open to connect to it.
+
+        :path: Path of the database file.
+        :migrate_from: Path of the scoreboard file imported into a new database, None to start empty.
+        """
+        self.path = path
+        self.migrate_from = migrate_from
+        self.connection = None
+
+
+    def open(self):
+        """
+        Connects to the database, creates the table and index and imports the scoreboard file if the database is new.
+
+        :return: The scoreboard itself.
+        """
+        import sqlite3  # Only imported when the backend is selected
+
+        if self.connection is None:
+            new = not os.path.exists(self.path)
+            # The connection may be used by the thread of a WriteBehindScoreboard, which never uses it at the same time
+            self.connection = sqlite3.connect(self.path, check_same_thread=False)
+            self.connection.execute('CREATE TABLE IF NOT EXISTS scores (player TEXT PRIMARY KEY, score INTEGER NOT NULL)')
+            self.connection.execute('CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, player)')
+            self.connection.commit()
+
+            if new and self.migrate_from and os.path.exists(self.migrate_from):
+                self.save(ScoreboardLog(self.migrate_from).load())
+
+        return self
+
+
+    def load(self):
+        """
+        Reads all players of the database.
+
+        :return: The scoreboard as dictionary of player names and their scores, only players with a positive score.
+        """
+        self.open()
+
+        return dict(self.connection.execute('SELECT player, score FROM scores WHERE score > 0'))
+
+
+    def save(self, scoreboard):
+        """
+        Replaces all players of the database.
+
+        :scoreboard: The scoreboard as dictionary of player names and their scores.
+        """
+        self.open()
+
+        with self.connection:
+            self.connection.execute('DELETE FROM scores')
+            self.connection.executemany('INSERT INTO scores VALUES (?, ?)', valid_scores(scoreboard).items())
+
+
+    def record_win(self, player):
+        """
+        Adds a win of a player.
+
+        :player: Name of the winner.
+        """
+        self.record_wins({player: 1})
+
+
+    def record_wins(self, wins):
+        """
+        Adds the wins of several players in one transaction.
+
+        :wins: Dictionary of player names and their number of wins.
+        """
+        self.open()
+
+        with self.connection:
+            self.connection.executemany('INSERT INTO scores VALUES (?, ?) '
+                                        'ON CONFLICT (player) DO UPDATE SET score = score + excluded.score',
+                                        [(player, count) for player, count in wins.items() if count > 0])
+
+
+    def top(self, count, offset=0):
+        """
+        Returns a page of the players with the highest scores, players with equal scores in alphabetical order.
+
+        :count: Number of players.
+        :offset: Number of players to skip.
+        :return: List of (name, score) tuples in descending order of the scores.
+        """
+        self.open()
+
+        return self.connection.execute('SELECT player, score FROM scores WHERE score > 0 '
+                                       'ORDER BY score DESC, player LIMIT ? OFFSET ?', (count, offset)).fetchall()
+
+
+    def close(self):
+        """
+        Closes the connection to the database.
+        """
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+
+
+class HashedScoreboard:
+    """
+    A scoreboard in a memory-mapped file with a slot of a fixed size per player, meant for
+    large scoreboards that should neither be read at startup nor rewritten for a win.
+
+    Players are placed in the slot given by a hash of their name, or the next free one
+    (linear probing), so a win reads and writes a single slot in place. Opening the file
+    only reads its header. Every slot keeps two versions of the score, each with a
+    sequence number and a checksum, and a win overwrites the older one: a crash in the
+    middle of an update leaves the other version intact, and a version with a wrong
+    checksum is ignored. Once the slots are more than MAX_LOAD full, the players are
+    rehashed into a new file with twice as many slots, which then replaces the old one.
+    A new file imports the scoreboard file, if there is one.
+
+    Many processes can share the file: wins are recorded holding the lock file next
+    to it, and a process maps the file again once another one replaced it.
+
+    Player names are limited to MAX_NAME_BYTES bytes in UTF-8.
+    """
+
+    def __init__(self, path=HASHED_FILE, migrate_from=SCOREBOARD_FILE):
+        """
+        Creates the scoreboard of a file, call open to map it.
+
+        :path: Path of the hashed scoreboard file.
+        :migrate_from: Path of the scoreboard file imported into a new file, None to start empty.
+        """
+        self.path = path
+        self.migrate_from = migrate_from
+        self.file = None
+        self.map = None
+        self.slots = 0
+        self.players = 0
+
+
+    def open(self):
+        """
+        Maps the file into memory, creates it first if it does not exist, or maps it again if
+        another process replaced it. Only the header is read.
+
+        :return: The scoreboard itself.
+        """
+        if self.map is not None and not self.__replaced():
+            return self
+
+        self.close()
+        if not os.path.exists(self.path):
+            with self.lock():
+                self.__create()
+        self.__map()
+
+        return self
+
+
+    def lock(self):
+        """
+        Returns the lock of the file, held by every write.
+        """
+        return FileLock(self.path + '.lock')
+
+
+    def __create(self):
+        # Writes a new file with the players of the scoreboard file, unless another process did. The lock must be held.
+        if not os.path.exists(self.path):
+            self.write(ScoreboardLog(self.migrate_from).load() if self.migrate_from else {}, self.path)
+
+
+    def __replaced(self):
+        # True if the file at the path is no longer the mapped one
+        try:
+            status = os.stat(self.path)
+        except FileNotFoundError:
+            return True
+
+        return (status.st_dev, status.st_ino) != file_identity(self.file)
+
+
+    def __map(self):
+        # Maps the file and reads the header
+        self.file = open(self.path, 'r+b')
+        size = os.fstat(self.file.fileno()).st_size
+        self.slots = size // SLOT_SIZE - 1
+
+        if size % SLOT_SIZE or self.slots < 1 or self.slots & (self.slots - 1):
+            self.file.close()
+            self.file = None
+            raise ValueError(f'{self.path} is not a hashed scoreboard file')
+
+        self.map = mmap.mmap(self.file.fileno(), size)
+        magic, self.players, checksum = HASHED_HEADER.unpack_from(self.map)
+
+        if magic != HASHED_MAGIC:
+            self.close()
+            raise ValueError(f'{self.path} is not a hashed scoreboard file')
+
+        if checksum != zlib.crc32(self.map[:HASHED_HEADER.size - 4]):
+            # The header was torn by a crash, count the players again
+            self.players = sum(1 for slot in SLOT.iter_unpack(self.map[SLOT_SIZE:]) if slot[0])
+            self.__write_header()
+
+
+    @staticmethod
+    def write(scoreboard, path, slots=MIN_SLOTS):
+        """
+        Writes a new hashed scoreboard file with enough slots for a scoreboard. The file is written
+        to a temporary file first and then replaces the file, so a crash never leaves a partial file.
+
+        :scoreboard: The scoreboard as dictionary of player names and their scores.
+        :path: Path of the hashed scoreboard file.
+        :slots: Minimum number of slots, a power of two.
+        """
+        scores = valid_scores(scoreboard)
+        while len(scores) > slots * MAX_LOAD:
+            slots *= 2
+
+        data = bytearray(SLOT_SIZE * (slots + 1))
+        HASHED_HEADER.pack_into(data, 0, HASHED_MAGIC, len(scores), 0)
+        HASHED_HEADER.pack_into(data, 0, HASHED_MAGIC, len(scores), zlib.crc32(data[:HASHED_HEADER.size - 4]))
+
+        for player, score in scores.items():
+            name = encode_slot_name(player)
+            index = zlib.crc32(name) & (slots - 1)
+            while data[SLOT_SIZE * (index + 1)] or data[SLOT_SIZE * (index + 1) + 1]:
+                index = (index + 1) & (slots - 1)
+
+            offset = SLOT_SIZE * (index + 1)
+            data[offset:offset + SLOT_NAME.size] = name
+            pack_version(data, offset, 0, 1, score)
+
+        temporary = path + '.tmp'
+        with open(temporary, 'wb') as file:
+            file.write(data)
+
+        os.replace(temporary, path)
+
+
+    def __write_header(self):
+        header = HASHED_HEADER.pack(HASHED_MAGIC, self.players, 0)
+        self.map[:HASHED_HEADER.size] = HASHED_HEADER.pack(HASHED_MAGIC, self.players, zlib.crc32(header[:-4]))
+
+
+    def find(self, name):
+        """
+        Looks up the slot of a player.
+
+        :name: Name of the player encoded with encode_slot_name.
+        :return: Tuple of the offset of the slot in the file and True if it belongs to the player,
+                 False if it is the empty slot the player would be placed in.
+        """
+        index = zlib.crc32(name) & (self.slots - 1)
+
+        while True:
+            offset = SLOT_SIZE * (index + 1)
+            field = self.map[offset:offset + SLOT_NAME.size]
+
+            if field == name:
+                return offset, True
+            if field[:2] == b'\0\0':
+                return offset, False
+
+            index = (index + 1) & (self.slots - 1)
+
+
+    def score(self, player):
+        """
+        Returns the score of a player, 0 for players without a win.
+        """
+        self.open()
+
+        offset, found = self.find(encode_slot_name(player))
+
+        return newest_version(*SLOT.unpack_from(self.map, offset))[1] if found else 0
+
+
+    def load(self):
+        """
+        Reads all players of the file.
+
+        :return: The scoreboard as dictionary of player names and their scores, only players with a positive score.
+        """
+        self.open()
+
+        with memoryview(self.map)[SLOT_SIZE:] as buffer:
+            return dict(read_slots(buffer))
+
+
+    def save(self, scoreboard):
+        """
+        Replaces all players of the file.
+
+        :scoreboard: The scoreboard as dictionary of player names and their scores.
+        """
+        with self.lock():
+            self.close()
+            self.write(scoreboard, self.path)
+            self.__map()
+
+
+    def record_win(self, player):
+        """
+        Adds a win of a player by updating the slot of the player in place, holding the lock of the file,
+        so processes sharing the file do not overwrite each other's wins.
+
+        :player: Name of the winner, a ValueError is raised if it is longer than MAX_NAME_BYTES.
+        """
+        encode_slot_name(player)  # Refuse a name that is too long before taking the lock
+        self.record_wins({player: 1})
+
+
+    def record_wins(self, wins):
+        """
+        Adds the wins of several players holding the lock of the file once, see record_win. Players with names
+        longer than MAX_NAME_BYTES are reported on standard error and skipped, so they do not fail the other wins.
+
+        :wins: Dictionary of player names and their number of wins.
+        """
+        names = []
+        for player, count in wins.items():
+            try:
+                if count > 0:
+                    names.append((encode_slot_name(player), count))
+            except ValueError as error:
+                print(f'{error}, the wins of {player!r} are not recorded', file=sys.stderr)
+
+        with self.lock():
+            if self.map is None or self.__replaced():
+                self.close()
+                self.__create()
+                self.__map()
+
+            self.players = HASHED_HEADER.unpack_from(self.map)[1]  # Other processes may have added players
+
+            for name, count in names:
+                self.__add(name, count)
+
+
+    def __add(self, name, count):
+        # Adds wins to the slot of a player, the lock must be held
+        offset, found = self.find(name)
+
+        if not found:
+            if self.players + 1 > self.slots * MAX_LOAD:
+                # Rehash into twice as many slots
+                scores, slots = self.load(), 2 * self.slots
+                self.close()
+                self.write(scores, self.path, slots)
+                self.__map()
+                offset, found = self.find(name)
+
+            self.map[offset:offset + SLOT_NAME.size] = name
+            self.players += 1
+            self.__write_header()
+
+        sequence, score, version = newest_version(*SLOT.unpack_from(self.map, offset))
+        pack_version(self.map, offset, 1 - version, sequence + 1, score + count)
+
+
+    def top(self, count, offset=0):
+        """
+        Returns a page of the players with the highest scores, players with equal scores in the order of their slots.
+
+        :count: Number of players.
+        :offset: Number of players to skip.
+        :return: List of (name, score) tuples in descending order of the scores.
+        """
+        self.open()
+
+        with memoryview(self.map)[SLOT_SIZE:] as buffer:
+            return heapq.nlargest(offset + count, read_slots(buffer), key=lambda item: item[1])[offset:]
+
+
+    def close(self):
+        """
+        Writes the changed slots back to the file, unmaps and closes it.
+        """
+        if self.map is not None:
+            self.map.flush()
+            self.map.close()
+            self.map = None
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+
+
+def encode_slot_name(player):
+    """
+    Encodes the name field of the slot of a player in a hashed scoreboard file.
+
+    :return: The field as bytes.
+    """
+    name = player.encode('utf-8')
+    if len(name) > MAX_NAME_BYTES:
+        raise ValueError(f'player name is longer than {MAX_NAME_BYTES} bytes')
+
+    return SLOT_NAME.pack(len(name) + 1, name)
+
+
+
+
+def pack_version(buffer, offset, version, sequence, score):
+    """
+    Writes a version of the score into a slot of a hashed scoreboard file, with a checksum of it and the name.
+
+    :buffer: Writable buffer with the file.
+    :offset: Offset of the slot in the buffer.
+    :version: 0 or 1.
+    """
+    checksum = zlib.crc32(SLOT_SCORE.pack(sequence, score), zlib.crc32(buffer[offset:offset + SLOT_NAME.size]))
+    SLOT_VERSION.pack_into(buffer, offset + VERSION_OFFSETS[version], sequence, score, checksum)
+
+
+
+
+def newest_version(size, name, *versions):
+    """
+    Finds the newest version of the score of a slot of a hashed scoreboard file whose checksum is valid.
+
+    :size: Size field of the slot.
+    :name: Name field of the slot.
+    :versions: Sequence number, score and checksum of both versions, as unpacked with SLOT.
+    :return: Tuple (sequence number, score, version), (0, 0, 1) if no version is valid, so version 0 is written next.
+    """
+    name_checksum = zlib.crc32(name, zlib.crc32(size.to_bytes(2, 'little')))
+    newest = (0, 0, 1)
+
+    for version in (0, 1):
+        sequence, score, checksum = versions[3 * version:3 * version + 3]
+        if sequence > newest[0] and checksum == zlib.crc32(SLOT_SCORE.pack(sequence, score), name_checksum):
+            newest = (sequence, score, version)
+
+    return newest
+
+
+
+
+def read_slots(buffer):
+    """
+    Decodes all slots of a hashed scoreboard file.
+
+    :buffer: Buffer with the slots, without the header.
+    :return: Generator of (name, score) tuples of the players with a positive score. Slots without a valid
+             version and with a name that is not valid UTF-8 are skipped.
+    """
+    crc32, pack = zlib.crc32, SLOT_SCORE.pack
+
+    for size, name, sequence, score, checksum, sequence_b, score_b, checksum_b in SLOT.iter_unpack(buffer):
+        if not size or size - 1 > MAX_NAME_BYTES:
+            continue
+
+        # Same as newest_version, inlined as this runs for every slot of the file
+        name_checksum = crc32(name, crc32(size.to_bytes(2, 'little')))
+        if sequence_b > sequence and checksum_b == crc32(pack(sequence_b, score_b), name_checksum):
+            score = score_b
+        elif not sequence or checksum != crc32(pack(sequence, score), name_checksum):
+            score = score_b if sequence_b and checksum_b == crc32(pack(sequence_b, score_b), name_checksum) else 0
+
+        if score > 0:
+            try:
+                yield name[:size - 1].decode('utf-8'), score
+            except UnicodeDecodeError:
+                pass
+
+
+
+
+class PeriodScoreboard:
+    """
+    Wins of the last days, for leaderboards of a day, a week or a month.
+
+    Every day has a bucket of its own, a scoreboard file named after the date in the
+    directory. A win is only added to the bucket of the day it is recorded on, and the
+    buckets of days that are older than keep_days are removed. A leaderboard adds up the
+    buckets of the days of its window and selects the best players with a heap, so it
+    reads a few buckets however long the game has been played. The buckets that were
+    read are kept, and only the wins recorded since are read the next time.
+    """
+
+    def __init__(self, directory=PERIODS_DIRECTORY, keep_days=KEEP_DAYS, clock=time.time):
+        """
+        Creates the scoreboard of a directory, nothing is read until it is used.
+
+        :directory: Directory of the bucket files, created with the first win.
+        :keep_days: Number of days the buckets are kept, the longest window of a leaderboard.
+        :clock: Function returning the current time in seconds since the epoch.
+        """
+        self.directory = directory
+        self.keep_days = keep_days
+        self.clock = clock
+        self.buckets = {}  # Day as ordinal of the date -> ScoreboardLog of the wins of the day
+        self.pruned = None  # Day the old buckets were last removed on
+
+
+    def today(self):
+        """
+        Returns the current day as ordinal of the local date.
+        """
+        return datetime.date.fromtimestamp(self.clock()).toordinal()
+
+
+    def bucket(self, day):
+        """
+        Returns the scoreboard of the wins of a day.
+
+        :day: Day as ordinal of the date.
+        """
+        bucket = self.buckets.get(day)
+        if bucket is None:
+            path = os.path.join(self.directory, datetime.date.fromordinal(day).isoformat() + '.dat')
+            bucket = self.buckets[day] = ScoreboardLog(path)
+
+        return bucket
+
+
+    def prune(self, today):
+        """
+        Removes the buckets of the days before the last keep_days days.
+        """
+        first = today - self.keep_days + 1
+        self.buckets = {day: bucket for day, bucket in self.buckets.items() if day >= first}
+
+        for name in os.listdir(self.directory):
+            try:
+                day = datetime.date.fromisoformat(name.partition('.')[0]).toordinal()
+            except ValueError:
+                continue  # Not a bucket file
+            if day < first:
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass  # Removed by another process
+
+        self.pruned = today
+
+
+    def record_win(self, player):
+        """
+        Adds a win of a player to the bucket of the current day.
+        """
+        self.record_wins({player: 1})
+
+
+    def record_wins(self, wins):
+        """
+        Adds the wins of several players to the bucket of the current day, and removes the old buckets once a day.
+
+        :wins: Dictionary of the players and the number of their wins.
+        """
+        today = self.today()
+        os.makedirs(self.directory, exist_ok=True)
+        self.bucket(today).record_wins(wins)
+
+        if self.pruned != today:
+            self.prune(today)
+
+
+    def window(self, days):
+        """
+        Returns the wins of every player in the last days, the current one included.
+
+        :days: Number of days, at most keep_days.
+        :return: Dictionary of the players and their wins.
+        """
+        if not 1 <= days <= self.keep_days:
+            raise ValueError(f'only the wins of the last {self.keep_days} days are kept')
+
+        today = self.today()
+        wins = {}
+
+        for day in range(today - days + 1, today + 1):
+            for player, count in self.bucket(day).refresh().items():
+                wins[player] = wins.get(player, 0) + count
+
+        return wins
+
+
+    def load(self):
+        """
+        Returns the wins of every player in all kept days.
+        """
+        return self.window(self.keep_days)
+
+
+    def top(self, count, offset=0, days=PERIODS['weekly']):
+        """
+        Returns a page of the players with the most wins in the last days. The wins other processes recorded since
+        are read first.
+
+        :count: Number of players.
+        :offset: Number of players to skip.
+        :days: Number of days of the window, see PERIODS.
+        :return: List of (name, wins) tuples in descending order of the wins.
+        """
+        return heapq.nlargest(offset + count, self.window(days).items(), key=lambda item: item[1])[offset:]
+
+
+    def close(self):
+        """
+        Closes the scoreboard, every win is already written.
+        """
+
+
+
+
+def open_scoreboard(backend='file'):
+    """
+    Opens the scoreboard with the selected backend.
+
+    :backend: 'file' for a ScoreboardLog in SCOREBOARD_FILE, 'sqlite' for a SqliteScoreboard in DATABASE_FILE or
+              'mmap' for a HashedScoreboard in HASHED_FILE, both import the scoreboard file when they are created.
+    :return: The opened scoreboard.
+    """
+    if backend == 'file':
+        return ScoreboardLog().open()
+
+    if backend == 'sqlite':
+        return SqliteScoreboard().open()
+
+    if backend == 'mmap':
+        return HashedScoreboard().open()
+
+    raise ValueError(f'unknown scoreboard backend {backend!r}')
+
+
+
+
+class LazyScoreboard:
+    """
+    A scoreboard that is only opened when it is first used, by the first win or the
+    scoreboard screen, so the menu is shown without reading a large scoreboard first.
+    """
+
+    def __init__(self, backend='file'):
+        """
+        Creates the scoreboard, nothing is read until it is used.
+
+        :backend: Backend of the scoreboard, see open_scoreboard.
+        """
+        if backend not in SCOREBOARD_BACKENDS:
+            raise ValueError(f'unknown scoreboard backend {backend!r}')
+
+        self.backend = backend
+        self.scoreboard = None
+
+
+    def open(self):
+        """
+        Opens the scoreboard with the backend, unless it is already open.
+
+        :return: The scoreboard of the backend.
+        """
+        if self.scoreboard is None:
+            with timer('load'):
+                self.scoreboard = open_scoreboard(self.backend)
+
+        return self.scoreboard
+
+
+    def load(self):
+        """
+        Opens the scoreboard and reads all players, see the backend.
+        """
+        return self.open().load()
+
+
+    def save(self, scoreboard):
+        """
+        Opens the scoreboard and replaces all players, see the backend.
+        """
+        self.open().save(scoreboard)
+
+
+    def record_win(self, player):
+        """
+        Opens the scoreboard and adds a win of a player, see the backend.
+        """
+        return self.open().record_win(player)
+
+
+    def record_wins(self, wins):
+        """
+        Opens the scoreboard and adds the wins of several players, see the backend.
+        """
+        return self.open().record_wins(wins)
+
+
+    def top(self, count, offset=0):
+        """
+        Opens the scoreboard and returns a page of the players with the highest scores, see the backend.
+        """
+        return self.open().top(count, offset)
+
+
+    def close(self):
+        """
+        Closes the scoreboard if it was opened.
+        """
+        if self.scoreboard is not None:
+            self.scoreboard.close()
+            self.scoreboard = None
+
+
+
+
+class WriteBehind:
+    """
+    A cache that keeps new records in memory and writes them on a background thread,
+    so the game never waits for the disk.
+
+    The pending records are written together, once no record followed for delay seconds,
+    at once after max_records records, and whenever they are read or closed. Closing is
+    also registered to run when the program exits, so no record is lost when the program
+    is left in any other way than by closing the cache. Subclasses write the pending
+    records with write.
+    """
+
+    def __init__(self, delay=FLUSH_DELAY, max_records=FLUSH_WINS):
+        """
+        Creates the cache.
+
+        :delay: Seconds without a record before the pending records are written.
+        :max_records: Number of pending records that are written at once.
+        """
+        self.delay = delay
+        self.max_records = max_records
+        self.pending = []  # Records that are not written yet, in the order they were added
+        self.timer = None
+        self.lock = threading.Lock()  # Held while the pending records change, never while writing
+        self.writing = threading.RLock()  # Held while what the records are written to is used
+
+        atexit.register(self.close)
+
+
+    def write(self, records):
+        """
+        Writes pending records, with a single write if possible.
+        """
+        raise NotImplementedError
+
+
+    def defer(self, record):
+        """
+        Adds a record to the pending records and schedules writing them.
+        """
+        with self.lock:
+            self.pending.append(record)
+
+            # Every record delays writing again, unless enough records are pending
+            if self.timer is not None:
+                self.timer.cancel()
+            self.timer = threading.Timer(0 if len(self.pending) >= self.max_records else self.delay, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+
+    def flush(self):
+        """
+        Writes the pending records.
+        """
+        with self.writing:
+            with self.lock:
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+                records, self.pending = self.pending, []
+
+            if not records:
+                return
+
+            try:
+                with timer('flush'):
+                    self.write(records)
+            except BaseException:
+                # Keep the records to write them with the next ones
+                with self.lock:
+                    self.pending[:0] = records
+                raise
+
+
+    def close(self):
+        """
+        Writes the pending records.
+        """
+        atexit.unregister(self.close)
+
+        with self.writing:
+            self.flush()
+
+
+
+
+class WriteBehindScoreboard(WriteBehind):
+    """
+    A cache in front of a scoreboard that keeps new wins in memory and writes them on a
+    background thread, so a win never waits for the disk, see WriteBehind.
+    """
+
+    def __init__(self, scoreboard, delay=FLUSH_DELAY, max_wins=FLUSH_WINS):
+        """
+        Creates the cache.
+
+        :scoreboard: The scoreboard the wins are written to, with a record_wins method.
+        :delay: Seconds without a win before the pending wins are written.
+        :max_wins: Number of pending wins that are written at once.
+        """
+        super().__init__(delay, max_wins)
+        self.scoreboard = scoreboard
+
+
+    def write(self, records):
+        wins = {}
+        for player in records:
+            wins[player] = wins.get(player, 0) + 1
+
+        self.scoreboard.record_wins(wins)
+
+
+    def record_win(self, player):
+        """
+        Adds a win of a player to the pending wins and schedules writing them.
+
+        :player: Name of the winner.
+        """
+        self.defer(player)
+
+
+    def load(self):
+        """
+        Writes the pending wins and reads all players, see the scoreboard.
+        """
+        with self.writing:
+            self.flush()
+            return self.scoreboard.load()
+
+
+    def save(self, scoreboard):
+        """
+        Replaces all players and drops the pending wins, see the scoreboard.
+        """
+        with self.writing:
+            with self.lock:
+                self.pending = []
+            self.scoreboard.save(scoreboard)
+
+
+    def top(self, count, offset=0, **options):
+        """
+        Writes the pending wins and returns a page of the players with the highest scores, see the scoreboard.
+
+        :options: Passed on to the scoreboard, like the days of a PeriodScoreboard.
+        """
+        with self.writing:
+            self.flush()
+            return self.scoreboard.top(count, offset, **options)
+
+
+    def close(self):
+        """
+        Writes the pending wins and closes the scoreboard.
+        """
+        with self.writing:
+            super().close()
+            self.scoreboard.close()
+
+
+
+
+if __name__ == '__main__':
+    # Convert pickled scoreboard files of earlier versions: python scoreboard.py [FILE ...]
+    for path in sys.argv[1:] or [SCOREBOARD_FILE]:
+        print(f'{path}: {len(convert_pickle(path))} players')
@@ -0,0 +1,180 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from bot import BOT_NAMES, create_bot
+from engine import GameState
+from fleet import random_board
+
+
+def play_game(index, seed, rows, cols, ships, bots=('random', 'random'), backend='bitboard'):
+    """
+    Plays a whole game between two bots with random fleets.
+
+    :index: Number of the game, copied to the result.
+    :seed: Seed of the game, the same seed always yields the same game.
+    :rows: Number of rows of the boards.
+    :cols: Number of columns of the boards.
+    :ships: The fleet of each player as list of (name, length) tuples like SHIPS.
+    :bots: Names of the bots of player A and player B, see create_bot.
+    :backend: Board backend, see create_board.
+    :return: Dictionary with the game number, seed, winner, number of turns and shots and hits per player.
+    """
+    rng = random.Random(seed)
+    game = GameState('A', 'B', ships, rows, cols, backend)
+
+    for player in game.players:
+        game.set_board(player, random_board(rows, cols, ships, backend, rng=rng))
+
+    players = {player: create_bot(name, rows, cols, ships, rng) for player, name in zip(game.players, bots)}
+
+    while game.winner is None:
+        player = game.turn
+        row, col = players[player].choose()
+        players[player].observe(row, col, game.fire(player, row, col))
+
+    return {'game': index, 'seed': seed, 'winner': game.winner, 'turns': game.turns,
+            'shots': game.shots, 'hits': game.hits}
+
+
+
+
+def play_chunk(chunk):
+    """
+    Plays a range of games, the unit of work of a worker process.
+
+    :chunk: Tuple (first game, number of games, base seed, rows, cols, ships, bots, backend).
+    :return: List of the results of play_game.
+    """
+    first, count, seed, rows, cols, ships, bots, backend = chunk
+
+    return [play_game(index, game_seed(seed, index), rows, cols, ships, bots, backend)
+            for index in range(first, first + count)]
+
+
+
+
+def game_seed(seed, index):
+    """
+    Returns the seed of a game of a simulation.
+
+    The seed is derived from both numbers, so simulations with nearby base seeds share no
+    games, unlike with seed + index.
+
+    :seed: Base seed of the simulation.
+    :index: Number of the game.
+    :return: Seed for random.Random, a string that is also written to the results.
+    """
+    return f'{seed}:{index}'
+
+
+
+
+def simulate(games, workers, ships, rows=8, cols=8, bots=('random', 'random'), backend='bitboard',
+             seed=0, chunk_size=100, output=None):
+    """
+    Plays many games between bots, spread over worker processes, and streams the results as JSON lines.
+
+    Games are handed to the workers in chunks to keep the communication between
+    processes low. Game i is played with game_seed(seed, i), so the results do not
+    depend on the number of workers.
+
+    :games: Number of games to play.
+    :workers: Number of worker processes, 1 plays all games in this process.
+    :ships: The fleet of each player as list of (name, length) tuples like SHIPS.
+    :output: File the JSON lines are written to, standard output by default.
+    :return: Tuple (number of games played, seconds taken).
+    """
+    output = output or sys.stdout
+    chunks = [(first, min(chunk_size, games - first), seed, rows, cols, ships, bots, backend)
+              for first in range(0, games, chunk_size)]
+    start = time.perf_counter()
+
+    if workers == 1:
+        write_results(map(play_chunk, chunks), output)
+    else:
+        with multiprocessing.Pool(workers) as pool:
+            write_results(pool.imap(play_chunk, chunks), output)
+
+    return games, time.perf_counter() - start
+
+
+
+
+def write_results(chunks, output):
+    """
+    Writes the results of chunks of games as JSON lines, as soon as each chunk is done.
+    """
+    for chunk in chunks:
+        for result in chunk:
+            output.write(json.dumps(result) + '\n')
+
+
+
+
+def parse_ships(text):
+    """
+    Parses a fleet given as comma-separated name:length pairs, e.g. 'Speedboat:2,Destroyer:4'.
+
+    :return: List of (name, length) tuples.
+    """
+    ships = []
+
+    for entry in text.split(','):
+        name, length = entry.rsplit(':', 1)
+        ships.append((name.strip(), int(length)))
+
+    return ships
+
+
+
+
+def positive_int(text):
+    """
+    Parses a count that must be at least 1, like the number of workers.
+
+    :return: The count.
+    """
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f'{text} is not at least 1')
+
+    return value
+
+
+
+
+def main(argv, ships):
+    """
+    Runs the simulate command line: python -m battleships simulate --games N --workers K
+
+    :argv: Command line arguments after 'simulate'.
+    :ships: The default fleet.
+    """
+    parser = argparse.ArgumentParser(prog='battleships simulate', description='Play games between bots.')
+    parser.add_argument('--games', type=int, default=1000, help='number of games to play')
+    parser.add_argument('--workers', type=positive_int, default=multiprocessing.cpu_count(), help='number of worker processes')
+    parser.add_argument('--chunk-size', type=positive_int, default=100, help='games per unit of work')
+    parser.add_argument('--seed', type=int, default=0, help='base seed of the games')
+    parser.add_argument('--rows', type=int, default=8)
+    parser.add_argument('--cols', type=int, default=8)
+    parser.add_argument('--ships', type=parse_ships, default=ships, help='fleet as name:length pairs, e.g. A:2,B:3')
+    parser.add_argument('--bot-a', choices=BOT_NAMES, default='random')
+    parser.add_argument('--bot-b', choices=BOT_NAMES, default='random')
+    parser.add_argument('--backend', choices=['bitboard', 'numpy'], default='bitboard')
+    parser.add_argument('--output', help='JSON lines file, standard output by default')
+    args = parser.parse_args(argv)
+
+    output = open(args.output, 'w') if args.output else sys.stdout
+
+    try:
+        games, seconds = simulate(args.games, args.workers, args.ships, args.rows, args.cols,
+                                  (args.bot_a, args.bot_b), args.backend, args.seed, args.chunk_size, output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+    print(f'{games} games in {seconds:.2f} s ({games / seconds:.1f} games/sec)', file=sys.stderr)
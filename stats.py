@@ -0,0 +1,414 @@
+"""
+Statistics of the players of finished games, kept column by column for millions of players.
+
+Every counter is an array with one entry per player, and every statistic players can be
+ranked by keeps the players in ranking order. A finished game only moves its two players
+within these orders, so a page of the best players of any statistic is read from its order
+without looking at the other players.
+
+The file is a snapshot of all arrays followed by a log with a record for every game
+finished since, a SnapshotLog like the scoreboard file. Every write holds the lock file
+next to it and first reads the games other processes recorded.
+"""
+import array
+import bisect
+import os
+import struct
+import sys
+
+from scoreboard import COMPACT_RECORDS, FLUSH_DELAY, FLUSH_WINS, SnapshotLog, WriteBehind, decode_names
+
+STATS_FILE = 'stats.dat'
+
+# Counters of every player, win_turns adds up the turns the player needed for the games won
+COLUMNS = ('games', 'wins', 'shots', 'hits', 'win_turns')
+
+# Statistics players are ranked by: a function of the counters of a player returning the statistic,
+# None for players without it, and whether higher values rank first
+RANKINGS = {
+    'wins': (lambda games, wins, shots, hits, win_turns: wins, True),
+    'games': (lambda games, wins, shots, hits, win_turns: games, True),
+    'shots': (lambda games, wins, shots, hits, win_turns: shots, True),
+    'accuracy': (lambda games, wins, shots, hits, win_turns: hits / shots if shots else None, True),
+    'turns_to_win': (lambda games, wins, shots, hits, win_turns: win_turns / wins if wins else None, False),
+}
+
+# Stats files start with the magic bytes, the number of players, the number of head-to-head
+# records and a random generation, which changes whenever the file is replaced by a new snapshot
+MAGIC = b'BST\x01'
+HEADER = struct.Struct('<4sQQQ')
+# Every game in the log: the lengths of the names of the winner and the loser, then shots and hits of both
+GAME = struct.Struct('<HHQQQQ')
+
+
+
+
+def to_bytes(values):
+    """
+    Returns the entries of an array as little-endian bytes.
+    """
+    if sys.byteorder == 'big':
+        values = array.array(values.typecode, values)
+        values.byteswap()
+
+    return values.tobytes()
+
+
+
+
+def read_array(file, typecode, count):
+    """
+    Reads an array of little-endian entries.
+
+    :return: The array, None if the file ends before.
+    """
+    values = array.array(typecode)
+    data = file.read(values.itemsize * count)
+    if len(data) < values.itemsize * count:
+        return None
+
+    values.frombytes(data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+
+    return values
+
+
+
+
+def encode_game(winner, loser, shots, hits):
+    """
+    Encodes the record of a finished game for the log of a stats file.
+
+    :shots: Dictionary of the players and the number of their shots.
+    :hits: Dictionary of the players and the number of their hits.
+    :return: The record as bytes.
+    """
+    names = [winner.encode('utf-8'), loser.encode('utf-8')]
+
+    try:
+        header = GAME.pack(len(names[0]), len(names[1]), shots[winner], hits[winner], shots[loser], hits[loser])
+    except struct.error:
+        raise ValueError('player name is too long') from None
+
+    return header + b''.join(names)
+
+
+
+
+def read_games(file):
+    """
+    Decodes the records of the games in the log of a stats file one by one, decoding
+    stops at a record that was not completely written or is corrupt.
+
+    :file: Binary file positioned at the first record.
+    :return: Generator of tuples (winner, loser, shots, hits) like the arguments of PlayerStats.record_game.
+    """
+    while True:
+        header = file.read(GAME.size)
+        if len(header) < GAME.size:
+            return
+
+        winner_size, loser_size, winner_shots, winner_hits, loser_shots, loser_hits = GAME.unpack(header)
+        data = file.read(winner_size + loser_size)
+        if len(data) < winner_size + loser_size:
+            return  # The record was not completely written
+
+        winner, loser = decode_names(data, (winner_size, loser_size))
+        if winner is None or loser is None or winner == loser:
+            return
+
+        yield winner, loser, {winner: winner_shots, loser: loser_shots}, {winner: winner_hits, loser: loser_hits}
+
+
+
+
+class PlayerStats(SnapshotLog):
+    """
+    Statistics of every player: games played, wins, shots fired, hits and the turns needed to win,
+    the accuracy and average turns to win derived from them, and the wins of each player against
+    each other player.
+
+    Each counter is a column, an array with an entry per player indexed by the row of the
+    player. For every ranking in RANKINGS an array holds the rows of the players in ranking
+    order, players with equal statistics in the order they were added. Recording a game
+    takes its two players out of every order, updates their counters and inserts them again
+    where their new statistics belong, with binary searches. The file is written as a
+    SnapshotLog with a record for every game.
+    """
+
+    def __init__(self, path=STATS_FILE, compact_records=COMPACT_RECORDS):
+        """
+        Creates the statistics of a file, call load to read it.
+
+        :path: Path of the stats file.
+        :compact_records: Minimum number of games in the log before it is compacted.
+        """
+        super().__init__(path, compact_records)
+
+
+    def clear(self):
+        """
+        Removes all players, without writing the file.
+        """
+        super().clear()
+        self.names = []  # Row -> name of the player
+        self.rows = {}  # Name of the player -> row
+        self.columns = {column: array.array('q') for column in COLUMNS}
+        self.orders = {ranking: array.array('q') for ranking in RANKINGS}  # Rows in ranking order
+        self.head_to_head = {}  # (row of the winner, row of the loser) -> wins
+
+
+    def value(self, ranking, row):
+        """
+        Returns the statistic of a ranking of the player in a row, None if the player has none.
+        """
+        return RANKINGS[ranking][0](*[self.columns[column][row] for column in COLUMNS])
+
+
+    def __key(self, ranking):
+        # Function returning the key of the row of a player in the order of a ranking
+        function, descending = RANKINGS[ranking]
+        columns = [self.columns[column] for column in COLUMNS]
+
+        if descending:
+            return lambda row: (-function(*[values[row] for values in columns]), row)
+        return lambda row: (function(*[values[row] for values in columns]), row)
+
+
+    def __unrank(self, row):
+        # Removes a player from every order, before the counters change
+        for ranking, order in self.orders.items():
+            if self.value(ranking, row) is not None:
+                key = self.__key(ranking)
+                del order[bisect.bisect_left(order, key(row), key=key)]
+
+
+    def __rank(self, row):
+        # Inserts a player into every order, after the counters changed
+        for ranking, order in self.orders.items():
+            if self.value(ranking, row) is not None:
+                key = self.__key(ranking)
+                order.insert(bisect.bisect_left(order, key(row), key=key), row)
+
+
+    def __row(self, player):
+        # Returns the row of a player, a new one with zero counters for new players
+        row = self.rows.get(player)
+
+        if row is None:
+            row = self.rows[player] = len(self.names)
+            self.names.append(player)
+            for values in self.columns.values():
+                values.append(0)
+            self.__rank(row)
+
+        return row
+
+
+    def __apply(self, winner, loser, shots, hits):
+        # Adds a finished game to the counters and orders
+        rows = {player: self.__row(player) for player in (winner, loser)}
+
+        for row in rows.values():
+            self.__unrank(row)
+
+        for player, row in rows.items():
+            self.columns['games'][row] += 1
+            self.columns['shots'][row] += shots[player]
+            self.columns['hits'][row] += hits[player]
+        self.columns['wins'][rows[winner]] += 1
+        self.columns['win_turns'][rows[winner]] += shots[winner]  # The winner fired once per turn
+
+        for row in rows.values():
+            self.__rank(row)
+
+        pair = (rows[winner], rows[loser])
+        self.head_to_head[pair] = self.head_to_head.get(pair, 0) + 1
+
+
+    def read_snapshot(self, file):
+        header = file.read(HEADER.size)
+
+        if len(header) < HEADER.size or not header.startswith(MAGIC):
+            return False
+
+        _, players, pairs, _ = HEADER.unpack(header)
+        lengths = read_array(file, 'H', players)
+        names = file.read(sum(lengths)) if lengths is not None else b''
+        columns = {column: read_array(file, 'q', players) for column in COLUMNS}
+        orders = {}
+        for ranking in RANKINGS:
+            count = read_array(file, 'Q', 1)
+            orders[ranking] = read_array(file, 'q', count[0]) if count and count[0] <= players else None
+        head_to_head = [read_array(file, 'q', pairs) for _ in range(3)]
+
+        if lengths is None or len(names) < sum(lengths) or None in columns.values() or None in orders.values() \
+                or None in head_to_head:
+            return False  # The file is not a complete snapshot
+
+        names = decode_names(names, lengths)
+        if None in names:
+            return False
+
+        self.names, self.columns, self.orders = names, columns, orders
+        self.rows = {name: row for row, name in enumerate(names)}
+        self.head_to_head = dict(zip(zip(head_to_head[0], head_to_head[1]), head_to_head[2]))
+        self.identity, self.position = header, file.tell()
+
+        return True
+
+
+    def write_snapshot(self, file):
+        names = [name.encode('utf-8') for name in self.names]
+        header = HEADER.pack(MAGIC, len(names), len(self.head_to_head), int.from_bytes(os.urandom(8), 'little'))
+
+        file.write(header)
+        file.write(to_bytes(array.array('H', map(len, names))))
+        file.write(b''.join(names))
+        for column in COLUMNS:
+            file.write(to_bytes(self.columns[column]))
+        for ranking in RANKINGS:
+            file.write(to_bytes(array.array('Q', [len(self.orders[ranking])])))
+            file.write(to_bytes(self.orders[ranking]))
+        pairs = list(self.head_to_head)
+        for values in [winner for winner, _ in pairs], [loser for _, loser in pairs], self.head_to_head.values():
+            file.write(to_bytes(array.array('q', values)))
+
+        return header
+
+
+    def read_records(self, file):
+        return read_games(file)
+
+
+    def encode_record(self, record):
+        return encode_game(*record)
+
+
+    def apply_record(self, record):
+        self.__apply(*record)
+
+
+    def snapshot_size(self):
+        return len(self.names)
+
+
+    def record_game(self, winner, loser, shots, hits):
+        """
+        Adds a finished game by appending a record to the log, and compacts the log if it got too long.
+
+        :winner: Name of the winner.
+        :loser: Name of the loser.
+        :shots: Dictionary of both players and the number of their shots.
+        :hits: Dictionary of both players and the number of their hits.
+        """
+        self.record_games([(winner, loser, shots, hits)])
+
+
+    def record_games(self, games):
+        """
+        Adds finished games with a single append to the log, see record_game.
+
+        :games: List of tuples (winner, loser, shots, hits) like the arguments of record_game.
+        """
+        self.append(games)
+
+
+    def top(self, ranking, count, offset=0):
+        """
+        Returns a page of the best players of a ranking. The games other processes recorded since are read first.
+
+        :ranking: Name of the statistic, see RANKINGS.
+        :count: Number of players.
+        :offset: Number of players to skip.
+        :return: List of (name, statistic) tuples in ranking order.
+        """
+        if ranking not in RANKINGS:
+            raise ValueError(f'unknown ranking {ranking!r}, choose one of {", ".join(RANKINGS)}')
+
+        self.refresh()
+
+        return [(self.names[row], self.value(ranking, row)) for row in self.orders[ranking][offset:offset + count]]
+
+
+    def player(self, name):
+        """
+        Returns the counters and statistics of a player.
+
+        :return: Dictionary of every column and ranking, None if the player did not finish a game.
+        """
+        row = self.rows.get(name)
+        if row is None:
+            return None
+
+        return dict({column: self.columns[column][row] for column in COLUMNS},
+                    **{ranking: self.value(ranking, row) for ranking in RANKINGS})
+
+
+    def versus(self, player, opponent):
+        """
+        Returns the head-to-head record of two players.
+
+        :return: Tuple of the wins of the player against the opponent and the wins of the opponent against the player.
+        """
+        rows = self.rows.get(player), self.rows.get(opponent)
+
+        return self.head_to_head.get(rows, 0), self.head_to_head.get(rows[::-1], 0)
+
+
+    def close(self):
+        """
+        Closes the statistics, every game is already written.
+        """
+
+
+
+
+class WriteBehindStats(WriteBehind):
+    """
+    A cache in front of the statistics that keeps finished games in memory and records them
+    on a background thread, so the end of a game never waits for the disk, see WriteBehind.
+    """
+
+    def __init__(self, stats, delay=FLUSH_DELAY, max_games=FLUSH_WINS):
+        """
+        Creates the cache.
+
+        :stats: The PlayerStats the games are recorded in.
+        :delay: Seconds without a finished game before the pending games are recorded.
+        :max_games: Number of pending games that are recorded at once.
+        """
+        super().__init__(delay, max_games)
+        self.stats = stats
+
+
+    def write(self, records):
+        self.stats.record_games(records)
+
+
+    def record_game(self, winner, loser, shots, hits):
+        """
+        Adds a finished game to the pending games and schedules recording them, see PlayerStats.record_game.
+        A name too long for a record raises a ValueError now instead of when the games are recorded.
+        """
+        encode_game(winner, loser, shots, hits)
+        self.defer((winner, loser, dict(shots), dict(hits)))
+
+
+    def top(self, ranking, count, offset=0):
+        """
+        Records the pending games and returns a page of the best players of a ranking, see PlayerStats.top.
+        """
+        with self.writing:
+            self.flush()
+            return self.stats.top(ranking, count, offset)
+
+
+    def close(self):
+        """
+        Records the pending games and closes the statistics.
+        """
+        with self.writing:
+            super().close()
+            self.stats.close()
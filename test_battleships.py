@@ -1,15 +1,30 @@
+import json
 import os
 import re
+import subprocess
+import sys
 import time
 from unittest.mock import Mock
 
+import pytest
+
+import battleships
 from battleships import *
 
 SCOREBOARD_FILE = 'scoreboard.dat'
 
+STARTUP_BUDGET = 2 # Seconds until the menu is shown, far more than needed so slow machines pass too
+
 PLACEMENT_INPUT = ["1 1, 1 2", "1 1, 1 2"]
 
 
+@pytest.fixture(autouse=True)
+def temporary_statistics(monkeypatch, tmp_path):
+    "Keeps the leaderboards and statistics written by main out of the working tree, the tests only check the scoreboard"
+    monkeypatch.setattr('battleships.PERIODS_DIRECTORY', str(tmp_path / 'scoreboard.days'))
+    monkeypatch.setattr('battleships.STATS_FILE', str(tmp_path / 'stats.dat'))
+
+
 def remove_file(path):
     try:
         os.remove(path)
@@ -106,12 +121,51 @@ def test_main_play_battleships_exit(monkeypatch):
     play_battleships_mock.assert_called_once()
 
 
+def test_main_play_against_computer_exit(monkeypatch):
+    "Runs main and checks that the last menu option starts a game against the strongest bot available"
+    play_battleships_mock = Mock()
+    play_battleships_mock.return_value = None
+    monkeypatch.setattr('battleships.play_battleships', play_battleships_mock)
+    monkeypatch.setattr('importlib.util.find_spec', Mock(return_value=None))
+    mock_menu_end_with_exit(monkeypatch, [4])
+    assert play_battleships_mock.call_args.kwargs['bot'] == 'random'
+
+
+def test_main_computer_wins_not_recorded(monkeypatch, tmp_path):
+    "Checks that wins of the computer are neither added to the scoreboard nor to the leaderboards"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr('battleships.menu', Mock(side_effect=[4, 1, 3]))
+    monkeypatch.setattr('battleships.play_battleships', Mock(side_effect=[BOT_PLAYER, 'Player A']))
+    main()
+    assert load_scoreboard() == {'Player A': 1}
+    assert PeriodScoreboard(battleships.PERIODS_DIRECTORY).top(10, days=1) == [('Player A', 1)]
+
+
+def test_play_battleships_rejects_computer_name(monkeypatch):
+    "Checks that no human player may take the name of the computer"
+    monkeypatch.setattr('sys.stdin', STDIN([BOT_PLAYER, 'A', BOT_PLAYER, 'B'] + PLACEMENT_INPUT +
+                                           ["1 1", "1 1", "1 2", "ENTER"]))
+    assert play_battleships([("Speedboat", 2), ]) == 'A'
+
+
 def test_main_scoreboard_exit(monkeypatch):
     "Runs main and checks the menu by selecting the scoreboard option and exit"
     monkeypatch.setattr('sys.stdin', STDIN(['']))
     mock_menu_end_with_exit(monkeypatch, [2])
 
 
+def test_main_startup_budget(tmp_path):
+    "Runs the program with a large scoreboard and checks that the menu is shown in time without reading the scoreboard"
+    ScoreboardLog(str(tmp_path / SCOREBOARD_FILE)).save({f'Player {i}': i + 1 for i in range(200_000)})
+    profile = tmp_path / 'profile.json'
+    program = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'battleships.py')
+    subprocess.run([sys.executable, program], input='3\n', capture_output=True, text=True, cwd=tmp_path, timeout=10,
+                   env=dict(os.environ, BATTLESHIPS_PROFILE=str(profile)), check=True)
+    phases = json.loads(profile.read_text())
+    assert 'load' not in phases
+    assert phases['import']['max_us'] <= phases['first_paint']['max_us'] < STARTUP_BUDGET * 1e6
+
+
 ###############################################################################
 ### MENU
 ###############################################################################
@@ -127,7 +181,7 @@ def test_menu_return(monkeypatch):
 
 def test_menu_input_validation(monkeypatch):
     "Checks that the menu returns the correct values for invalid and valid inputs"
-    stdin = STDIN(['-1', '-5', 'hello', 'hi', '4', 'True', '5', '1'])
+    stdin = STDIN(['-1', '-5', 'hello', 'hi', '0', 'True', '5', '1'])
     monkeypatch.setattr('sys.stdin', stdin)
     assert [menu() for _ in range(1)] == [1]
     assert stdin.done()  # Check that all inputs were read
@@ -135,13 +189,14 @@ def test_menu_input_validation(monkeypatch):
 
 def test_menu_interaction(monkeypatch, capfd):
     "Checks the user interaction with the menu"
-    inputs = ['1', '2', 'a', '3', '4', '3', 'hi', '3']
+    inputs = ['1', '2', 'a', '3', '5', '3', 'hi', '3']
     subject = lambda: [menu() for _ in range(5)]
     expected_output = ''.join(["""cMENU BATTLESHIPS
 
 1. Play Battleships
 2. Scoreboard
 3. Exit
+4. Play against the computer
                                  
 """ + "Enter the number of your choice: " * prompts for prompts in [1, 1, 2, 2, 2]])
     assert_interaction(monkeypatch, capfd, subject, expected_output, inputs)
@@ -0,0 +1,37 @@
+import json
+
+from benchmark import compare, main, run
+
+
+###############################################################################
+### BENCHMARK
+###############################################################################
+
+def test_benchmark_run():
+    "Checks that every benchmark reports a time per operation"
+    results = run((8,), (8,), (10,), log=None)
+    assert {result['benchmark'] for result in results} == {
+        'is_ship_position_possible', 'is_game_won', 'fire', 'display_game', 'headless_game',
+        'save_scoreboard', 'load_scoreboard', 'record_win'}
+    assert all(result['seconds'] > 0 for result in results)
+
+
+def test_benchmark_compare():
+    "Checks that only benchmarks slower than the baseline by more than the threshold are regressions"
+    baseline = [{'benchmark': 'fire', 'size': 8, 'seconds': 1.0}, {'benchmark': 'fire', 'size': 100, 'seconds': 1.0}]
+    results = [{'benchmark': 'fire', 'size': 8, 'seconds': 1.2}, {'benchmark': 'fire', 'size': 100, 'seconds': 1.3},
+               {'benchmark': 'is_game_won', 'size': 8, 'seconds': 5.0}]
+    assert compare(results, baseline, 0.25) == [('fire[100x100]', 1.0, 1.3)]
+
+
+def test_benchmark_main(tmp_path):
+    "Checks that results are written to a file and compared with a baseline"
+    output = tmp_path / 'bench.json'
+    baseline = tmp_path / 'baseline.json'
+    args = ['--sizes', '8', '--game-sizes', '8', '--players', '10']
+    assert main(args + ['--output', str(output)]) == 0
+    results = json.loads(output.read_text())['results']
+    for result in results:
+        result['seconds'] /= 1000
+    baseline.write_text(json.dumps({'results': results}))
+    assert main(args + ['--output', str(output), '--compare', str(baseline)]) == 1
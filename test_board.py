@@ -0,0 +1,127 @@
+import pytest
+
+from board import Board, create_board
+from battleships import is_game_won, is_ship_position_possible, play_turn
+from test_battleships import STDIN
+
+
+###############################################################################
+### BOARD
+###############################################################################
+
+def test_board_grid_round_trip():
+    "Checks that converting a grid to a board and back yields the same grid"
+    grid = [[None] * 9 for _ in range(10)]
+    grid[0][0] = True
+    grid[3][8] = False
+    grid[9][4] = 'miss'
+    assert Board.from_grid(grid).to_grid() == grid
+
+
+def test_board_line_mask():
+    "Checks that horizontal and vertical lines cover exactly the cells between both ends"
+    board = Board(8, 8)
+    board.place(board.line_mask(1, 5, 1, 2))
+    board.place(board.line_mask(7, 7, 4, 7))
+    assert board.ship_cells() == 8
+    assert [col for col in range(8) if board.cell(1, col)] == [2, 3, 4, 5]
+    assert [row for row in range(8) if board.cell(row, 7)] == [4, 5, 6, 7]
+
+
+def test_board_line_mask_out_of_bounds():
+    "Checks that lines leaving the board raise an IndexError"
+    board = Board(8, 8)
+    with pytest.raises(IndexError):
+        board.line_mask(0, 6, 0, 8)
+    with pytest.raises(IndexError):
+        board.line_mask(-1, 0, 1, 0)
+
+
+def test_board_fire():
+    "Checks that fire reports hits, sunk ships, misses and repeated shots"
+    board = Board(8, 8)
+    board.place(board.line_mask(0, 0, 0, 1), 'Speedboat')
+    assert board.fire(0, 0) == 'hit'
+    assert board.fire(5, 5) == 'miss'
+    assert board.fire(0, 0) is None
+    assert board.fire(5, 5) is None
+    assert board[0][:2] == [False, True]
+    assert board[5][5] == 'miss'
+    assert is_game_won(board) == False
+    assert board.fire(0, 1) == 'sunk Speedboat'
+    assert is_game_won(board) == True
+
+
+def test_board_row_slice_and_last_shot():
+    "Checks that parts of rows are decoded like whole rows and that the last shot is remembered"
+    board = Board(3, 70)
+    board.place(board.line_mask(1, 60, 1, 63))
+    assert board.last_shot is None
+    board.fire(1, 61)
+    board.fire(1, 64)
+    board.fire(1, 61)
+    assert board.last_shot == (1, 64)
+    assert board.row_slice(1, 59, 66) == board[1][59:66] == [None, True, False, True, True, 'miss', None]
+
+
+def test_board_ship_identity():
+    "Checks that every ship cell is indexed with the id of its ship"
+    board = Board(8, 8)
+    assert board.place(board.line_mask(0, 0, 0, 2), 'Attacker') == 0
+    assert board.place(board.line_mask(1, 0, 3, 0), 'Attacker') == 1
+    assert board.ship_ids == {0: 0, 1: 0, 2: 0, 8: 1, 16: 1, 24: 1}
+    assert [board.fire(row, 0) for row in range(1, 4)] == ['hit', 'hit', 'sunk Attacker']
+    assert board.ship_remaining == [3, 0]
+
+
+def test_board_ship_position_possible():
+    "Checks that is_ship_position_possible accepts boards"
+    board = Board(8, 8)
+    board.place(board.line_mask(2, 0, 2, 4))
+    assert is_ship_position_possible(3, 0, 2, 2, 2, board) == False
+    assert is_ship_position_possible(3, 3, 2, 5, 2, board) == True
+    assert is_ship_position_possible(3, 3, 2, 6, 2, board) == False
+
+
+def test_board_play_turn(monkeypatch):
+    "Checks that play_turn fires at boards and skips cells that were already shot at"
+    stdin = STDIN(['9 1', '0 0', '1 1', '1 1', '2 2'])
+    monkeypatch.setattr('sys.stdin', stdin)
+    board_a = Board(8, 8)
+    board_b = Board(8, 8)
+    board_b.place(board_b.line_mask(0, 0, 0, 1))
+    assert play_turn(board_a, board_b, "Player A", True) == True
+    assert play_turn(board_a, board_b, "Player A", True) == False
+    assert stdin.done()
+
+
+def test_board_remaining():
+    "Checks that the number of intact ship cells is tracked as ships are placed and hit"
+    board = Board(8, 8)
+    board.place(board.line_mask(0, 0, 0, 2))
+    board.place(board.line_mask(4, 4, 5, 4))
+    assert board.remaining == 5
+    board.fire(0, 1)
+    board.fire(0, 1)
+    board.fire(7, 7)
+    assert board.remaining == 4
+    assert board.remaining == board.count_remaining()
+    assert Board.from_grid(board.to_grid()).remaining == 4
+
+
+def test_board_remaining_debug_cross_check(monkeypatch):
+    "Checks that debug mode detects a counter that is out of sync with the masks"
+    monkeypatch.setattr('board.DEBUG', True)
+    board = Board(8, 8)
+    board.place(board.line_mask(0, 0, 0, 1))
+    assert is_game_won(board) == False
+    board.remaining = 0
+    with pytest.raises(AssertionError):
+        is_game_won(board)
+
+
+def test_create_board_unknown_backend():
+    "Checks that creating a board with an unknown backend raises a ValueError"
+    assert isinstance(create_board(8, 8), Board)
+    with pytest.raises(ValueError):
+        create_board(8, 8, 'lists')
@@ -0,0 +1,112 @@
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from battleships import SHIPS, play_battleships
+from bot import create_bot
+from density_bot import DensityBot, SUNK_SHIP
+from simulate import play_game
+from test_battleships import STDIN
+
+
+###############################################################################
+### DENSITY BOT
+###############################################################################
+
+def test_density_empty_board():
+    "Checks that the density counts the placements covering each cell"
+    bot = DensityBot(3, 3, [("Ship", 3)])
+    assert bot.density().tolist() == [[2, 2, 2], [2, 2, 2], [2, 2, 2]]
+    bot = DensityBot(1, 4, [("Ship", 2)])
+    assert bot.density().tolist() == [[1, 2, 2, 1]]
+
+
+def test_density_misses():
+    "Checks that placements crossing a miss are not counted and cells fired at are excluded"
+    bot = DensityBot(1, 5, [("Ship", 2)])
+    bot.observe(0, 2, 'miss')
+    assert bot.density().tolist() == [[1, 1, -1, 1, 1]]
+
+
+def test_density_targets_hits():
+    "Checks that the bot fires next to a hit ship"
+    bot = DensityBot(8, 8, SHIPS, random.Random(1))
+    bot.observe(4, 4, 'hit')
+    assert bot.choose() in [(3, 4), (5, 4), (4, 3), (4, 5)]
+
+
+def test_density_sunk():
+    "Checks that a sunk ship is retired with its cells"
+    bot = DensityBot(8, 8, [("Speedboat", 2), ("Destroyer", 4)])
+    bot.observe(0, 0, 'hit')
+    bot.observe(0, 1, 'sunk Speedboat')
+    assert bot.afloat == [("Destroyer", 4)]
+    assert (bot.state[0, :2] == SUNK_SHIP).all()
+
+
+def test_density_bot_beats_random_bot():
+    "Checks that the density bot needs fewer shots than the random bot"
+    results = [play_game(i, i, 8, 8, SHIPS, ('density', 'random')) for i in range(20)]
+    assert sum(result['winner'] == 'A' for result in results) >= 17
+
+
+def test_density_bot_large_board():
+    "Checks that the density bot works on boards that are not square"
+    bot = create_bot('density', 100, 60, SHIPS, random.Random(2))
+    row, col = bot.choose()
+    assert 0 <= row < 100 and 0 <= col < 60
+
+
+def test_play_battleships_against_bot(monkeypatch):
+    "Checks that player B can be played by a bot in the turn loop"
+    inputs = ['Player A', 'auto'] + [f'{row} {col}' for row in range(1, 9) for col in range(1, 9)] + ['']
+    monkeypatch.setattr('sys.stdin', STDIN(inputs))
+    assert play_battleships(bot='density') in ('Player A', 'Computer')
+
+
+###############################################################################
+### INCREMENTAL DENSITY
+###############################################################################
+
+def test_density_incremental_matches_recount():
+    "Checks that the incremental counts equal a full recount during whole games"
+    for seed in range(5):
+        result = play_game(seed, seed, 9, 7, SHIPS + [("Dinghy", 1)], ('density', 'density'))
+        assert result['winner'] in ('A', 'B')
+
+    rng = random.Random(3)
+    bot = DensityBot(8, 8, SHIPS, rng, verify=True)
+    for row, col in [(0, 0), (0, 1), (4, 4), (4, 5), (7, 7)]:
+        bot.observe(row, col, 'miss' if row == 7 else 'hit')
+    bot.observe(4, 6, 'sunk Attacker')
+    assert np.array_equal(bot.counts, bot.count_density())
+
+
+def test_density_sunk_retires_length():
+    "Checks that the placements of a length are retired once no ship of that length is afloat"
+    bot = DensityBot(6, 6, [("Speedboat", 2), ("Attacker", 3)], verify=True)
+    bot.observe(0, 0, 'hit')
+    bot.observe(0, 1, 'sunk Speedboat')
+    assert 2 not in bot.multiplicity
+    assert (2, 0) not in bot.weights and (2, 1) not in bot.weights
+
+
+def test_density_sunk_unknown_name():
+    "Checks that a sunk ship that is not afloat raises a ValueError"
+    bot = DensityBot(6, 6, [("Speedboat", 2)])
+    with pytest.raises(ValueError, match='Submarine'):
+        bot.observe(0, 0, 'sunk Submarine')
+    bot.observe(1, 0, 'hit')
+    bot.observe(1, 1, 'sunk Speedboat')
+    with pytest.raises(ValueError):
+        bot.sink(1, 1, 'Speedboat')
+
+
+def test_density_verify_detects_drift():
+    "Checks that verify mode detects counts that differ from a full recount"
+    bot = DensityBot(8, 8, SHIPS, verify=True)
+    bot.counts[3, 3] += 1
+    with pytest.raises(AssertionError):
+        bot.observe(0, 0, 'miss')
@@ -0,0 +1,96 @@
+import random
+
+import pytest
+
+from battleships import SHIPS
+from engine import GameState, is_placement_possible
+from board import Board
+from fleet import random_board
+
+FLEET = [("Speedboat", 2), ("Attacker", 3)]
+
+
+def placed_game():
+    game = GameState("A", "B", FLEET)
+    for _ in game.players:
+        assert game.place(("Speedboat", 2), (0, 0), (0, 1)) == True
+        assert game.place(("Attacker", 3), (2, 2), (4, 2)) == True
+    return game
+
+
+###############################################################################
+### PLACEMENT
+###############################################################################
+
+def test_is_placement_possible():
+    "Checks that placements must be straight, of the right length, on the board and free"
+    board = Board(8, 8)
+    board.place(board.line_mask(0, 0, 0, 1))
+    assert is_placement_possible(board, 2, (1, 0), (1, 1)) == True
+    assert is_placement_possible(board, 2, (0, 1), (1, 1)) == False
+    assert is_placement_possible(board, 2, (1, 0), (2, 1)) == False
+    assert is_placement_possible(board, 3, (1, 0), (1, 1)) == False
+    assert is_placement_possible(board, 2, (7, 7), (7, 8)) == False
+
+
+def test_game_place_order():
+    "Checks that player A places the fleet before player B"
+    game = GameState("A", "B", FLEET)
+    assert game.placing == "A"
+    assert game.place(("Speedboat", 2), (0, 0), (1, 1)) == False
+    assert game.place(("Speedboat", 2), (0, 0), (0, 1)) == True
+    with pytest.raises(ValueError):
+        game.place(("Speedboat", 2), (1, 0), (1, 1))
+    assert game.place(("Attacker", 3), (1, 0), (1, 2)) == True
+    assert game.placing == "B"
+
+
+def test_game_same_names():
+    "Checks that both players need different names"
+    with pytest.raises(ValueError):
+        GameState("A", "A", FLEET)
+
+
+###############################################################################
+### FIRE
+###############################################################################
+
+def test_game_fire():
+    "Checks that players take turns and that the first player to sink every ship wins"
+    game = placed_game()
+    with pytest.raises(ValueError):
+        game.fire("B", 0, 0)
+    assert game.fire("A", 0, 0) == 'hit'
+    assert game.fire("B", 7, 7) == 'miss'
+    assert game.fire("A", 0, 0) is None
+    assert game.turn == "A"
+    assert game.fire("A", 0, 1) == 'sunk Speedboat'
+    for row in range(2, 5):
+        game.fire("B", 6, row)
+        result = game.fire("A", row, 2)
+    assert result == 'sunk Attacker'
+    assert game.winner == "A"
+    assert game.shots == {"A": 5, "B": 4}
+    assert game.hits == {"A": 5, "B": 0}
+    with pytest.raises(ValueError):
+        game.fire("B", 0, 0)
+
+
+def test_game_fire_before_placement():
+    "Checks that shots are only allowed once both fleets are placed"
+    game = GameState("A", "B", FLEET)
+    with pytest.raises(ValueError):
+        game.fire("A", 0, 0)
+
+
+def test_game_headless():
+    "Checks that a whole game can be played without any user interaction"
+    rng = random.Random(7)
+    game = GameState("A", "B", SHIPS)
+    for player in game.players:
+        game.set_board(player, random_board(8, 8, SHIPS, rng=rng))
+    cells = [(row, col) for row in range(8) for col in range(8)]
+    shots = {player: rng.sample(cells, len(cells)) for player in game.players}
+    while game.winner is None:
+        game.fire(game.turn, *shots[game.turn].pop())
+    assert game.hits[game.winner] == sum(length for _, length in SHIPS)
@@ -0,0 +1,127 @@
+import random
+from collections import Counter
+from unittest.mock import Mock
+
+import pytest
+
+import fleet
+from board import Board
+from battleships import SHIPS, position_ships
+from fleet import FleetCounts, place_randomly, place_uniformly, random_board, random_ends
+from placement import LegalPlacements
+from test_battleships import STDIN
+
+
+def fleet_cells(board):
+    return frozenset((row, col) for row in range(board.rows) for col in range(board.cols) if board.cell(row, col))
+
+
+###############################################################################
+### RANDOM FLEETS
+###############################################################################
+
+def test_random_board():
+    "Checks that a random board contains the whole fleet without overlaps"
+    for uniform in (False, True):
+        board = random_board(8, 8, SHIPS, uniform=uniform, rng=random.Random(1))
+        assert board.ship_names == [name for name, _ in SHIPS]
+        assert board.ship_cells() == board.remaining == sum(length for _, length in SHIPS)
+
+
+def test_place_randomly_crowded():
+    "Checks that the fast sampler fills a board where every cell is needed"
+    board = place_randomly(Board(4, 4), [("Ship", 4)] * 4, random.Random(2))
+    assert board.ship_cells() == 16
+
+
+def test_place_randomly_tracks_crowded_board(monkeypatch):
+    "Checks that the free placements are tracked once the board is crowded and every ship is drawn from them"
+    legal_placements = Mock(wraps=LegalPlacements)
+    monkeypatch.setattr(fleet, 'LegalPlacements', legal_placements)
+    board = place_randomly(Board(4, 4), [("Ship", 4)] * 4, random.Random(8))
+    assert board.ship_cells() == 16
+    assert legal_placements.call_args.args[1] == [4, 4]
+
+
+def test_random_ends_legal():
+    "Checks that tracked free placements are drawn from"
+    board = Board(3, 3)
+    board.place(board.line_mask(1, 0, 1, 2))
+    legal = LegalPlacements(board, [3])
+    rng = random.Random(9)
+    assert {random_ends(board, 3, rng, legal) for _ in range(50)} == {(0, 0, 0, 2), (2, 0, 2, 2)}
+    legal.place(0, 0, 0, 2)
+    legal.place(2, 0, 2, 2)
+    assert random_ends(board, 3, rng, legal) is None
+
+
+def test_place_randomly_keeps_board():
+    "Checks that ships are added to a copy of the board"
+    board = Board(8, 8)
+    board.place(board.line_mask(0, 0, 0, 4), 'Aircraft Carrier')
+    placed = place_randomly(board, [("Speedboat", 2)], random.Random(3))
+    assert board.ship_cells() == 5
+    assert placed.ship_cells() == 7
+    assert placed.ship_names == ['Aircraft Carrier', 'Speedboat']
+
+
+def test_place_randomly_impossible():
+    "Checks that fleets that do not fit raise a ValueError"
+    with pytest.raises(ValueError):
+        place_randomly(Board(3, 3), [("Ship", 3)] * 4, random.Random(4), attempts=5)
+    with pytest.raises(ValueError):
+        place_uniformly(Board(3, 3), [("Ship", 4)], random.Random(4))
+    with pytest.raises(ValueError):
+        place_uniformly(Board(3, 3), [("Ship", 3)] * 4, random.Random(4), count_after=0)
+    with pytest.raises(ValueError):
+        place_uniformly(Board(10, 10), [("Ship", 4)] * 26, random.Random(4), max_tries=10)
+
+
+def test_place_uniformly_distribution():
+    "Checks that every fitting fleet is drawn about equally often"
+    # The ship of length 3 fills one of the two rows and the other ship fits in the other row in 2 ways
+    rng = random.Random(5)
+    for count_after in (0, 1000):
+        counts = Counter(fleet_cells(place_uniformly(Board(2, 3), [("A", 3), ("B", 2)], rng, count_after=count_after))
+                         for _ in range(3000))
+        assert len(counts) == 4
+        assert min(counts.values()) > 600
+
+
+def test_fleet_counts():
+    "Checks the number of fleets that fit on small boards"
+    assert FleetCounts(Board(2, 3), [3, 2]).total == 4
+    assert FleetCounts(Board(4, 4), [4] * 4).total == 2
+    assert FleetCounts(Board(3, 2), [2] * 3).total == 3
+    assert FleetCounts(Board(8, 8), [4]).total == 2 * 8 * 5
+    board = Board(2, 3)
+    board.place(board.line_mask(0, 1, 0, 1), 'Buoy')
+    assert FleetCounts(board, [2, 1]).total == 4 * 3
+
+
+def test_place_uniformly_crowded():
+    "Checks that the exact sampler draws fleets far too crowded to be drawn by rejection"
+    board = place_uniformly(Board(7, 7), [("Ship", 4)] * 11, random.Random(6))
+    assert board.ship_cells() == 44
+    assert board.ship_names == ["Ship"] * 11
+    # The 3 tilings of the board by dominoes, with the ships in any of 6 orders
+    rng = random.Random(7)
+    ships = [("A", 2), ("B", 2), ("C", 2)]
+    counts = Counter(tuple(sorted(place_uniformly(Board(3, 2), ships, rng, count_after=0).ship_ids.items()))
+                     for _ in range(1800))
+    assert len(counts) == 18
+    assert min(counts.values()) > 50
+
+
+###############################################################################
+### AUTO PLACEMENT PROMPT
+###############################################################################
+
+def test_position_ships_auto(monkeypatch):
+    "Checks that entering auto at the placement prompt places the remaining ships"
+    stdin = STDIN(['1 1, 1 2', 'auto'])
+    monkeypatch.setattr('sys.stdin', stdin)
+    board = position_ships("Player A", 8, 8, SHIPS)
+    assert board.cell(0, 0) and board.cell(0, 1)
+    assert board.ship_cells() == sum(length for _, length in SHIPS)
+    assert stdin.done()
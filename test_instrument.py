@@ -0,0 +1,67 @@
+import io
+import json
+
+import instrument
+from battleships import play_turn
+from test_battleships import STDIN, grid_empty
+
+
+def enable(monkeypatch):
+    monkeypatch.setattr(instrument, 'enabled', True)
+    monkeypatch.setattr(instrument, 'histograms', {})
+
+
+###############################################################################
+### INSTRUMENTATION
+###############################################################################
+
+def test_timer_disabled(monkeypatch):
+    "Checks that nothing is recorded while instrumentation is disabled"
+    monkeypatch.setattr(instrument, 'histograms', {})
+    with instrument.timer('parse'):
+        pass
+    assert instrument.histograms == {}
+
+
+def test_timer_enabled(monkeypatch):
+    "Checks that timers and timed functions record one latency per call"
+    enable(monkeypatch)
+    function = instrument.timed('render')(lambda: 42)
+    with instrument.timer('parse'):
+        pass
+    assert function() == 42
+    assert function() == 42
+    assert instrument.histograms['parse'].count == 1
+    assert instrument.histograms['render'].count == 2
+
+
+def test_histogram_percentiles():
+    "Checks that percentiles are the upper bounds of the buckets"
+    histogram = instrument.Histogram()
+    for nanoseconds in [100] * 90 + [5000] * 9 + [70000]:
+        histogram.add(nanoseconds)
+    assert histogram.percentile(50) == 128
+    assert histogram.percentile(90) == 128
+    assert histogram.percentile(99) == 8192
+    assert histogram.percentile(100) == 70000
+
+
+def test_play_turn_phases(monkeypatch):
+    "Checks that a turn records parsing, clearing and rendering"
+    enable(monkeypatch)
+    monkeypatch.setattr('sys.stdin', STDIN(['hello', '1 1']))
+    play_turn(grid_empty(8, 8), grid_empty(8, 8), "Player A", True)
+    assert instrument.histograms['parse'].count == 2
+    assert instrument.histograms['clear'].count == 1
+    assert instrument.histograms['render'].count == 1
+
+
+def test_report_and_dump(monkeypatch, tmp_path):
+    "Checks that the report lists every phase and that the dump is valid JSON"
+    enable(monkeypatch)
+    instrument.record('save', 3000)
+    output = io.StringIO()
+    instrument.report(output)
+    assert 'save' in output.getvalue()
+    instrument.dump(tmp_path / 'profile.json')
+    assert json.loads((tmp_path / 'profile.json').read_text())['save']['count'] == 1
@@ -0,0 +1,75 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from board import Board, create_board
+from battleships import is_game_won, is_ship_position_possible, play_turn
+from numpy_board import NumpyBoard, HIT_CELL, MISS_CELL
+from test_battleships import STDIN
+
+
+###############################################################################
+### NUMPY BOARD
+###############################################################################
+
+def test_numpy_board_create():
+    "Checks that the numpy backend can be selected when creating a board"
+    board = create_board(10, 12, 'numpy')
+    assert isinstance(board, NumpyBoard)
+    assert board.cells.shape == (10, 12)
+    assert board.cells.dtype == np.int8
+
+
+def test_numpy_board_matches_bitboard():
+    "Checks that the numpy backend behaves like the bitboard for the same placements and shots"
+    boards = [Board(8, 9), NumpyBoard(8, 9)]
+    for board in boards:
+        board.place(board.line_mask(0, 0, 0, 1), 'Speedboat')
+        board.place(board.line_mask(7, 8, 4, 8), 'Destroyer')
+        assert is_ship_position_possible(3, 0, 1, 2, 1, board) == False
+        assert is_ship_position_possible(3, 1, 1, 3, 1, board) == True
+
+    shots = [(0, 0), (3, 3), (0, 0), (0, 1), (4, 8)]
+    results = [[board.fire(row, col) for row, col in shots] for board in boards]
+    assert results[0] == results[1] == ['hit', 'miss', None, 'sunk Speedboat', 'hit']
+    assert boards[0].to_grid() == boards[1].to_grid()
+    assert boards[0].remaining == boards[1].remaining == 3
+
+
+def test_numpy_board_fire_many():
+    "Checks that a batch of shots is applied at once and reports sunk ships"
+    board = NumpyBoard(100, 100)
+    board.place(board.line_mask(50, 10, 50, 12), 'Attacker')
+    states, sunk = board.fire_many([50, 50, 50, 50, 0], [10, 11, 12, 10, 0])
+    assert states.tolist() == [HIT_CELL, HIT_CELL, HIT_CELL, -1, MISS_CELL]
+    assert sunk == ['Attacker']
+    assert is_game_won(board) == True
+
+
+def test_numpy_board_overview_matches_bitboard():
+    "Checks that both backends summarize blocks, decode parts of rows and track the last shot alike"
+    boards = [Board(7, 9), NumpyBoard(7, 9)]
+    for board in boards:
+        board.place(board.line_mask(0, 0, 0, 3))
+        board.place(board.line_mask(6, 8, 4, 8))
+        for row, col in [(0, 1), (3, 3), (5, 8), (3, 3)]:
+            board.fire(row, col)
+    assert boards[0].overview(3) == boards[1].overview(3) == [[False, True, None], [None, 'miss', False], [None, None, True]]
+    assert boards[0].overview(4) == boards[1].overview(4)
+    assert boards[0].row_slice(0, 1, 5) == boards[1].row_slice(0, 1, 5)
+    assert boards[0].last_shot == boards[1].last_shot == (5, 8)
+    boards[1].fire_many([1, 2], [1, 2])
+    assert boards[1].last_shot == (2, 2)
+
+
+def test_numpy_board_play_turn(monkeypatch):
+    "Checks that play_turn fires at numpy boards"
+    stdin = STDIN(['0 1', '1 1', '1 1', '1 2'])
+    monkeypatch.setattr('sys.stdin', stdin)
+    board_a = NumpyBoard(8, 8)
+    board_b = NumpyBoard(8, 8)
+    board_b.place(board_b.line_mask(0, 0, 0, 1))
+    assert play_turn(board_a, board_b, "Player A", True) == True
+    assert play_turn(board_a, board_b, "Player A", True) == True
+    assert is_game_won(board_b) == True
+    assert stdin.done()
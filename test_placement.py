@@ -0,0 +1,55 @@
+from board import Board
+from battleships import is_ship_position_possible
+from placement import LegalPlacements, placement_table
+
+
+###############################################################################
+### PLACEMENT TABLE
+###############################################################################
+
+def test_placement_table_size():
+    "Checks that the table contains every horizontal and vertical placement exactly once"
+    assert len(placement_table(8, 8, 5)) == 2 * 8 * 4
+    assert len(placement_table(10, 9, 3)) == 10 * 7 + 8 * 9
+    assert len(placement_table(8, 8, 1)) == 64
+    assert len(placement_table(4, 4, 5)) == 0
+
+
+def test_placement_table_shared():
+    "Checks that boards of the same size share the cached table"
+    assert placement_table(8, 8, 3) is placement_table(8, 8, 3)
+
+
+def test_placement_table_masks():
+    "Checks that the masks of the table match the masks of the board"
+    board = Board(6, 7)
+    table = placement_table(6, 7, 3)
+    for ends, mask in zip(table.ends, table.masks):
+        assert mask.bit_count() == 3
+        assert mask == board.line_mask(*ends)
+
+
+###############################################################################
+### LEGAL PLACEMENTS
+###############################################################################
+
+def test_legal_placements_update():
+    "Checks that placing a ship only keeps the placements that do not cross it"
+    board = Board(8, 8)
+    legal = LegalPlacements(board, [2, 5])
+    assert legal.count(2) == 112
+    board.place(board.line_mask(0, 0, 0, 4))
+    legal.place(0, 4, 0, 0)
+    assert legal.is_free(0, 4, 1, 4) == False
+    assert legal.is_free(1, 4, 2, 4) == True
+    for length in (2, 5):
+        expected = [ends for ends in placement_table(8, 8, length).ends
+                    if is_ship_position_possible(length, *ends, board)]
+        assert legal.placements(length) == expected
+
+
+def test_legal_placements_from_occupied_board():
+    "Checks that the free placements are collected from a board with ships"
+    board = Board(3, 3)
+    board.place(board.line_mask(1, 0, 1, 2))
+    assert LegalPlacements(board, [3]).placements(3) == [(0, 0, 0, 2), (2, 0, 2, 2)]
@@ -0,0 +1,564 @@
+import multiprocessing
+import os
+import pickle
+import time
+from unittest.mock import Mock
+
+import pytest
+
+import battleships
+import scoreboard
+from scoreboard import (BLOCK, HEADER, HEADER_V1, MAGIC, MAGIC_V1, SLOT_SIZE, VERSION_OFFSETS, HashedScoreboard,
+                        LazyScoreboard, PeriodScoreboard, ScoreboardLog, SqliteScoreboard, WriteBehindScoreboard,
+                        encode_block, encode_slot_name, open_scoreboard, read_blocks)
+from test_battleships import assert_interaction
+
+
+###############################################################################
+### SCOREBOARD LOG
+###############################################################################
+
+def test_log_replays_wins(tmp_path):
+    "Checks that wins are appended to the file and replayed on top of the snapshot"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path)
+    log.save({'Player A': 2, 'Player B': 0})
+    size = os.path.getsize(path)
+    assert log.record_win('Player B') == {'Player A': 2, 'Player B': 1}
+    log.record_win('Player A')
+    assert os.path.getsize(path) > size
+    reloaded = ScoreboardLog(path)
+    assert reloaded.load() == {'Player A': 3, 'Player B': 1}
+    assert reloaded.records == 2
+
+
+def test_log_compaction(tmp_path):
+    "Checks that a long log is compacted into a snapshot"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path, compact_records=3)
+    log.load()
+    for player in ['A', 'B', 'A', 'A']:
+        log.record_win(player)
+    assert log.records == 3
+    log.record_win('B')
+    assert log.records == 0
+    with open(path, 'rb') as file:
+        assert HEADER.unpack(file.read(HEADER.size))[:2] == (MAGIC, 1)
+        assert list(read_blocks(file)) == [[('A', 3), ('B', 2)]]
+
+
+def test_log_missing_file(tmp_path):
+    "Checks that a win recorded after the file was removed writes a new snapshot"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path)
+    log.save({'A': 1})
+    os.remove(path)
+    log.record_win('B')
+    assert ScoreboardLog(path).load() == {'A': 1, 'B': 1}
+
+
+def test_log_torn_record(tmp_path):
+    "Checks that a record that was not completely written is ignored"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path)
+    log.save({'A': 1})
+    log.record_win('B')
+    with open(path, 'ab') as file:
+        file.write(encode_block([('C', 300)])[:-1])
+    assert ScoreboardLog(path).load() == {'A': 1, 'B': 1}
+    log.record_win('D')
+    assert ScoreboardLog(path).load() == {'A': 1, 'B': 1, 'D': 1}
+
+
+def test_log_record_wins(tmp_path):
+    "Checks that the wins of several players are appended at once"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path)
+    log.save({'A': 1})
+    assert log.record_wins({'A': 2, 'B': 1, 'C': 0}) == {'A': 3, 'B': 1}
+    assert log.records == 1
+    assert ScoreboardLog(path).load() == {'A': 3, 'B': 1}
+
+
+def test_log_shared_file(tmp_path):
+    "Checks that scoreboards sharing a file read each other's wins and compactions before writing"
+    path = str(tmp_path / 'scoreboard.dat')
+    first, second = ScoreboardLog(path, compact_records=2), ScoreboardLog(path, compact_records=2)
+    first.load()
+    second.load()
+    first.record_win('A')
+    assert second.record_win('B') == {'A': 1, 'B': 1}
+    for _ in range(3):
+        second.record_win('B')  # The log is compacted, the file replaced
+    assert first.record_win('A') == {'A': 2, 'B': 4}
+    assert first.top(1) == [('B', 4)]
+    assert ScoreboardLog(path).load() == {'A': 2, 'B': 4}
+
+
+def record_wins(backend, path, player, wins):
+    scoreboard = ScoreboardLog(path, compact_records=5) if backend == 'file' else HashedScoreboard(path, None)
+    for _ in range(wins):
+        scoreboard.record_win(player)
+    scoreboard.close()
+
+
+@pytest.mark.parametrize('backend', ['file', 'mmap'])
+def test_processes_lose_no_wins(tmp_path, backend):
+    "Checks that no win is lost when many processes record wins in the same file at once"
+    path = str(tmp_path / 'scoreboard')
+    processes = [multiprocessing.Process(target=record_wins, args=(backend, path, f'Player {i % 2}', 40)) for i in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    scoreboard = ScoreboardLog(path) if backend == 'file' else HashedScoreboard(path, None)
+    assert scoreboard.load() == {'Player 0': 80, 'Player 1': 80}
+    scoreboard.close()
+
+
+###############################################################################
+### BINARY FORMAT
+###############################################################################
+
+def test_blocks_round_trip(tmp_path):
+    "Checks that names and scores of any size are decoded block by block"
+    blocks = [[('A', 1), ('B', 127)], [('Ünïcödé 🚢', 128), ('C' * 300, 2 ** 40 + 5), ('', 2)], [('A', 2)]]
+    path = tmp_path / 'blocks'
+    path.write_bytes(b''.join(encode_block(block) for block in blocks))
+    with open(path, 'rb') as file:
+        assert list(read_blocks(file)) == blocks
+
+
+def test_blocks_invalid(tmp_path):
+    "Checks that invalid names and scores are skipped and that a corrupt block stops decoding"
+    invalid_name = BLOCK.pack(2, 3, 2) + b'\x02\x00\x01\x00' + b'\xff\xfeD' + b'\x01\x02'
+    too_long = BLOCK.pack(1, 1, 12) + b'\x01\x00E' + b'\xff' * 11 + b'\x01'
+    path = tmp_path / 'blocks'
+    path.write_bytes(encode_block([('A', 0), ('B', 3)]) + invalid_name + too_long + encode_block([('F', 1)]))
+    with open(path, 'rb') as file:
+        assert list(read_blocks(file)) == [[('B', 3)], [('D', 2)]]
+    path.write_bytes(BLOCK.pack(2 ** 31, 0, 0) + encode_block([('F', 1)]))
+    with open(path, 'rb') as file:
+        assert list(read_blocks(file)) == []
+
+
+def test_name_too_long():
+    "Checks that names longer than the format allows are refused"
+    with pytest.raises(ValueError):
+        encode_block([('A' * 70000, 1)])
+
+
+def test_convert_pickle(tmp_path):
+    "Checks that pickled files of earlier versions are read and converted when written next"
+    path = str(tmp_path / 'scoreboard.dat')
+    with open(path, 'wb') as file:
+        pickle.dump({'A': 2, 'B': 'x'}, file)
+        pickle.dump('A', file)
+    log = ScoreboardLog(path)
+    assert log.load() == {'A': 3}
+    log.record_win('C')
+    with open(path, 'rb') as file:
+        assert file.read(len(MAGIC)) == MAGIC
+    assert ScoreboardLog(path).load() == {'A': 3, 'C': 1}
+    with open(path, 'wb') as file:
+        pickle.dump({'D': 4}, file)
+    assert scoreboard.convert_pickle(path) == {'D': 4}
+    assert ScoreboardLog(path).load() == {'D': 4}
+
+
+def test_convert_first_version(tmp_path):
+    "Checks that binary files without a generation are read and converted when written next"
+    path = str(tmp_path / 'scoreboard.dat')
+    with open(path, 'wb') as file:
+        file.write(HEADER_V1.pack(MAGIC_V1, 1) + encode_block([('A', 2)]) + encode_block([('A', 1)]))
+    log = ScoreboardLog(path)
+    assert log.load() == {'A': 3}
+    log.record_win('B')
+    with open(path, 'rb') as file:
+        assert file.read(len(MAGIC)) == MAGIC
+    assert ScoreboardLog(path).load() == {'A': 3, 'B': 1}
+
+
+class Exploit:
+    def __reduce__(self):
+        return (os.remove, (self.path,))
+
+
+def test_pickle_runs_no_code(tmp_path):
+    "Checks that pickled files cannot run code when they are read"
+    victim = tmp_path / 'victim'
+    victim.write_text('')
+    exploit = Exploit()
+    exploit.path = str(victim)
+    path = str(tmp_path / 'scoreboard.dat')
+    with open(path, 'wb') as file:
+        pickle.dump({'A': exploit}, file)
+    assert ScoreboardLog(path).load() == {}
+    assert victim.exists()
+
+
+def test_pickle_malformed(tmp_path, monkeypatch):
+    "Checks that malformed pickled files of any kind are read as empty scoreboards"
+    payloads = [
+        b'\x80\x04\x8e' + (2 ** 62).to_bytes(8, 'little'),  # MemoryError
+        b'\x80\x04\x8e' + (2 ** 64 - 1).to_bytes(8, 'little'),  # OverflowError
+        b'\x80\x04\x8c\x02\xff\xfe\x94.',  # UnicodeDecodeError
+        b'I12x\n.',  # ValueError
+        b'\x80\x04}(]K\x01u.',  # TypeError
+        b'\x80\x04}\x94(K\x01K\x03u.',  # A name that is not a string
+    ]
+    path = str(tmp_path / 'scoreboard.dat')
+    for payload in payloads:
+        with open(path, 'wb') as file:
+            file.write(payload)
+        assert ScoreboardLog(path).load() == {}
+    with open(path, 'wb') as file:
+        pickle.dump({'A': 2}, file)
+        file.write(payloads[2])
+    assert ScoreboardLog(path).load() == {'A': 2}
+    monkeypatch.setattr(battleships, 'SCOREBOARD_FILE', path)
+    with open(path, 'wb') as file:
+        file.write(payloads[0])
+    assert battleships.load_scoreboard() == {}
+
+
+###############################################################################
+### HASHED SCOREBOARD
+###############################################################################
+
+def test_hashed_record_win_and_top(tmp_path):
+    "Checks that wins are updated in place, survive reopening and that pages are read in descending order"
+    path = str(tmp_path / 'scoreboard.map')
+    scoreboard = HashedScoreboard(path, None).open()
+    size = os.path.getsize(path)
+    for player in ['B', 'A', 'C', 'A', 'C', 'C', 'Ünïcödé']:
+        scoreboard.record_win(player)
+    assert scoreboard.top(2) == [('C', 3), ('A', 2)]
+    assert scoreboard.score('A') == 2 and scoreboard.score('D') == 0
+    scoreboard.close()
+    assert os.path.getsize(path) == size
+    reopened = HashedScoreboard(path, None).open()
+    assert reopened.players == 4
+    assert reopened.load() == {'A': 2, 'B': 1, 'C': 3, 'Ünïcödé': 1}
+    reopened.close()
+
+
+def test_hashed_growth(tmp_path):
+    "Checks that the slots are rehashed into a larger file once they are too full"
+    path = str(tmp_path / 'scoreboard.map')
+    HashedScoreboard.write({'A': 5}, path, 4)
+    scoreboard = HashedScoreboard(path, None).open()
+    assert scoreboard.slots == 4
+    for i in range(20):
+        scoreboard.record_win(f'Player {i}')
+    assert scoreboard.slots == 32
+    assert scoreboard.load() == dict({'A': 5}, **{f'Player {i}': 1 for i in range(20)})
+    scoreboard.close()
+
+
+def test_hashed_torn_update(tmp_path):
+    "Checks that a version with a wrong checksum is ignored, so an update torn by a crash loses only itself"
+    path = str(tmp_path / 'scoreboard.map')
+    scoreboard = HashedScoreboard(path, None).open()
+    for _ in range(3):
+        scoreboard.record_win('A')
+    scoreboard.record_win('B')
+    offset, _ = scoreboard.find(encode_slot_name('A'))
+    scoreboard.map[offset + VERSION_OFFSETS[0] + 8] ^= 0xFF  # Score of the newest version, the third win
+    assert scoreboard.score('A') == 2
+    scoreboard.record_win('A')
+    assert scoreboard.score('A') == 3
+    scoreboard.map[offset + VERSION_OFFSETS[0]:offset + SLOT_SIZE] = bytes(SLOT_SIZE - VERSION_OFFSETS[0])
+    assert scoreboard.load() == {'B': 1}
+    scoreboard.close()
+
+
+def test_hashed_torn_header(tmp_path):
+    "Checks that the players are counted again if the header is invalid"
+    path = str(tmp_path / 'scoreboard.map')
+    HashedScoreboard.write({'A': 1, 'B': 2}, path)
+    with open(path, 'r+b') as file:
+        file.seek(4)
+        file.write(b'\xff')
+    scoreboard = HashedScoreboard(path, None).open()
+    assert scoreboard.players == 2
+    scoreboard.close()
+
+
+def test_hashed_skips_long_names(tmp_path, capfd):
+    "Checks that a name that is too long does not keep the other wins of a batch from being written"
+    path = str(tmp_path / 'scoreboard.map')
+    cache = WriteBehindScoreboard(HashedScoreboard(path, None), delay=60)
+    cache.record_win('alice')
+    cache.record_win('A' * 100)
+    cache.close()
+    assert 'are not recorded' in capfd.readouterr().err
+    scoreboard = HashedScoreboard(path, None)
+    assert scoreboard.load() == {'alice': 1}
+    scoreboard.close()
+
+
+def test_hashed_migration_and_errors(tmp_path):
+    "Checks that a new file imports the scoreboard file, and that long names and other files are refused"
+    ScoreboardLog(str(tmp_path / 'scoreboard.dat')).save({'A': 2, 'B': 0})
+    scoreboard = HashedScoreboard(str(tmp_path / 'scoreboard.map'), str(tmp_path / 'scoreboard.dat')).open()
+    assert scoreboard.load() == {'A': 2}
+    with pytest.raises(ValueError):
+        scoreboard.record_win('A' * 100)
+    scoreboard.close()
+    with pytest.raises(ValueError):
+        HashedScoreboard(str(tmp_path / 'scoreboard.dat')).open()
+
+
+###############################################################################
+### SQLITE SCOREBOARD
+###############################################################################
+
+def test_sqlite_record_win_and_top(tmp_path):
+    "Checks that wins update single rows and that pages are read in descending order"
+    scoreboard = SqliteScoreboard(str(tmp_path / 'scoreboard.db'), None).open()
+    for player in ['B', 'A', 'C', 'A', 'C', 'C']:
+        scoreboard.record_win(player)
+    assert scoreboard.top(2) == [('C', 3), ('A', 2)]
+    assert scoreboard.top(2, 2) == [('B', 1)]
+    assert scoreboard.load() == {'A': 2, 'B': 1, 'C': 3}
+    scoreboard.close()
+    assert SqliteScoreboard(str(tmp_path / 'scoreboard.db'), None).top(1) == [('C', 3)]
+
+
+def test_sqlite_migration(tmp_path):
+    "Checks that a new database imports the scoreboard file, but an existing one does not"
+    path = str(tmp_path / 'scoreboard.dat')
+    log = ScoreboardLog(path)
+    log.save({'A': 2, 'B': 0})
+    log.record_win('C')
+    scoreboard = SqliteScoreboard(str(tmp_path / 'scoreboard.db'), path).open()
+    assert scoreboard.load() == {'A': 2, 'C': 1}
+    scoreboard.close()
+    log.record_win('D')
+    assert SqliteScoreboard(str(tmp_path / 'scoreboard.db'), path).load() == {'A': 2, 'C': 1}
+
+
+def test_log_top(tmp_path):
+    "Checks that the scoreboard file is paged like the database, equal scores in the order they were added"
+    log = ScoreboardLog(str(tmp_path / 'scoreboard.dat'))
+    log.save({'B': 1, 'A': 2, 'C': 1})
+    assert log.top(2) == [('A', 2), ('B', 1)]
+    assert log.top(5, 2) == [('C', 1)]
+
+
+def test_lazy_scoreboard(monkeypatch, tmp_path):
+    "Checks that the scoreboard is only opened when it is first used"
+    monkeypatch.chdir(tmp_path)
+    ScoreboardLog().save({'A': 1})
+    opened = Mock(wraps=open_scoreboard)
+    monkeypatch.setattr(scoreboard, 'open_scoreboard', opened)
+    lazy = LazyScoreboard('file')
+    lazy.close()
+    opened.assert_not_called()
+    lazy.record_win('B')
+    assert lazy.top(5) == [('A', 1), ('B', 1)]
+    opened.assert_called_once_with('file')
+    lazy.close()
+    with pytest.raises(ValueError):
+        LazyScoreboard('csv')
+
+
+def wait_for(condition, seconds=5):
+    end = time.monotonic() + seconds
+    while not condition() and time.monotonic() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_write_behind_batches_wins():
+    "Checks that wins are written together in the background after enough wins or a pause"
+    backend = Mock()
+    cache = WriteBehindScoreboard(backend, delay=60, max_wins=3)
+    cache.record_win('A')
+    cache.record_win('B')
+    backend.record_wins.assert_not_called()
+    cache.record_win('A')
+    assert wait_for(lambda: backend.record_wins.called)
+    backend.record_wins.assert_called_once_with({'A': 2, 'B': 1})
+    cache.delay = 0.05
+    cache.record_win('C')
+    assert wait_for(lambda: backend.record_wins.call_count == 2)
+    backend.record_wins.assert_called_with({'C': 1})
+    cache.close()
+    assert backend.record_wins.call_count == 2
+    backend.close.assert_called_once()
+
+
+def test_write_behind_reads_and_close(tmp_path):
+    "Checks that pending wins are written before the scoreboard is read and when it is closed"
+    path = str(tmp_path / 'scoreboard.dat')
+    cache = WriteBehindScoreboard(ScoreboardLog(path), delay=60)
+    cache.record_win('B')
+    cache.record_win('B')
+    assert ScoreboardLog(path).load() == {}
+    assert cache.top(1) == [('B', 2)]
+    cache.record_win('C')
+    cache.close()
+    assert ScoreboardLog(path).load() == {'B': 2, 'C': 1}
+
+
+def test_write_behind_sqlite_opened_by_timer(monkeypatch, tmp_path):
+    "Checks that an SQLite scoreboard opened by the background thread is still used by the main thread"
+    monkeypatch.chdir(tmp_path)
+    cache = WriteBehindScoreboard(LazyScoreboard('sqlite'), delay=0.01)
+    cache.record_win('A')
+    assert wait_for(lambda: cache.scoreboard.scoreboard is not None and not cache.pending)
+    assert cache.top(10) == [('A', 1)]
+    cache.record_win('B')
+    cache.close()
+    assert SqliteScoreboard(migrate_from=None).load() == {'A': 1, 'B': 1}
+
+
+def test_write_behind_keeps_failed_wins():
+    "Checks that wins that could not be written are written with the next ones"
+    backend = Mock()
+    backend.record_wins.side_effect = [OSError('disk full'), None]
+    cache = WriteBehindScoreboard(backend, delay=60)
+    cache.record_win('A')
+    with pytest.raises(OSError):
+        cache.flush()
+    cache.record_win('A')
+    cache.close()
+    backend.record_wins.assert_called_with({'A': 2})
+
+
+def test_main_writes_wins_when_interrupted(monkeypatch, tmp_path):
+    "Checks that the pending wins are written when the program is interrupted"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[1, KeyboardInterrupt]))
+    monkeypatch.setattr(battleships, 'play_battleships', Mock(return_value='A'))
+    with pytest.raises(KeyboardInterrupt):
+        battleships.main()
+    assert battleships.load_scoreboard() == {'A': 1}
+
+
+###############################################################################
+### PERIOD SCOREBOARD
+###############################################################################
+
+DAY = 24 * 60 * 60
+
+
+def test_period_windows(tmp_path):
+    "Checks that the leaderboards add up the wins of the days of their window"
+    now = [time.time()]
+    periods = PeriodScoreboard(str(tmp_path / 'days'), clock=lambda: now[0])
+    periods.record_wins({'A': 3, 'B': 1})
+    now[0] += 2 * DAY
+    periods.record_wins({'B': 4, 'C': 1})
+    periods.record_win('C')
+    assert periods.top(10, days=1) == [('B', 4), ('C', 2)]
+    assert periods.top(10, days=7) == [('B', 5), ('A', 3), ('C', 2)]
+    assert periods.top(1, offset=1, days=7) == [('A', 3)]
+    assert periods.top(10, days=2) == [('B', 4), ('C', 2)]
+    assert periods.load() == {'A': 3, 'B': 5, 'C': 2}
+    with pytest.raises(ValueError):
+        periods.window(31)
+
+
+def test_period_prunes_old_days(tmp_path):
+    "Checks that the buckets of days older than the kept days are removed"
+    now = [time.time()]
+    directory = tmp_path / 'days'
+    periods = PeriodScoreboard(str(directory), keep_days=7, clock=lambda: now[0])
+    periods.record_win('A')
+    now[0] += 6 * DAY
+    periods.record_win('B')
+    assert len(os.listdir(directory)) == 4  # Two buckets with their lock files
+    now[0] += DAY
+    periods.record_win('B')
+    assert sorted(name for name in os.listdir(directory) if name.endswith('.dat')) == \
+           sorted(os.path.basename(periods.bucket(day).path) for day in (periods.today() - 1, periods.today()))
+    assert periods.top(10, days=7) == [('B', 2)]
+
+
+def test_period_shared_directory(tmp_path):
+    "Checks that scoreboards sharing a directory read each other's wins"
+    first, second = PeriodScoreboard(str(tmp_path / 'days')), PeriodScoreboard(str(tmp_path / 'days'))
+    first.record_win('A')
+    assert second.top(10) == [('A', 1)]
+    second.record_wins({'A': 1, 'B': 3})
+    assert first.top(10, days=1) == [('B', 3), ('A', 2)]
+
+
+def test_main_records_period_wins(monkeypatch, tmp_path):
+    "Checks that the wins of games played in main are added to the leaderboards"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[1, 1, 3]))
+    monkeypatch.setattr(battleships, 'play_battleships', Mock(side_effect=['A', None]))
+    battleships.main()
+    assert PeriodScoreboard().top(10, days=1) == [('A', 1)]
+
+
+def test_scoreboard_period_views(monkeypatch, capfd, tmp_path):
+    "Checks that the leaderboards of the last days are views of the scoreboard screen"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[2, 3]))
+    battleships.save_scoreboard({'A': 5, 'B': 1})
+    PeriodScoreboard().record_wins({'B': 2})
+    expected_output = """cSCOREBOARD BATTLESHIPS
+
+1. A (5)
+2. B (1)
+
+Press ENTER to return to the menu or v to change the view: cSCOREBOARD VIEWS
+
+1. All time
+2. Daily leaderboard
+3. Weekly leaderboard
+4. Monthly leaderboard
+5. Players by wins
+6. Players by games
+7. Players by shots
+8. Players by accuracy
+9. Players by turns to win
+
+Enter the number of the view: Enter the number of the view: cDAILY LEADERBOARD BATTLESHIPS
+
+1. B (2)
+
+Press ENTER to return to the menu or v to change the view: """
+    assert_interaction(monkeypatch, capfd, battleships.main, expected_output, ['v', '10', '2', ''])
+
+
+def test_open_scoreboard_unknown_backend():
+    "Checks that opening a scoreboard with an unknown backend raises a ValueError"
+    with pytest.raises(ValueError):
+        open_scoreboard('csv')
+
+
+@pytest.mark.parametrize('backend, path', [('sqlite', 'scoreboard.db'), ('mmap', 'scoreboard.map')])
+def test_scoreboard_pages(monkeypatch, capfd, tmp_path, backend, path):
+    "Checks that the scoreboard is shown page by page with continuous ranks"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'SCOREBOARD_PAGE', 2)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[2, 2, 3]))
+    battleships.save_scoreboard({'A': 5, 'B': 4, 'C': 3, 'D': 2, 'E': 1})
+    expected_output = """cSCOREBOARD BATTLESHIPS
+
+1. A (5)
+2. B (4)
+
+Press ENTER to show the next page, v to change the view or q to return to the menu: cSCOREBOARD BATTLESHIPS
+
+3. C (3)
+4. D (2)
+
+Press ENTER to show the next page, v to change the view or q to return to the menu: cSCOREBOARD BATTLESHIPS
+
+5. E (1)
+
+Press ENTER to return to the menu or v to change the view: cSCOREBOARD BATTLESHIPS
+
+1. A (5)
+2. B (4)
+
+Press ENTER to show the next page, v to change the view or q to return to the menu: """
+    assert_interaction(monkeypatch, capfd, lambda: battleships.main(backend), expected_output, ['', '', '', 'q'])
+    assert os.path.isfile(path)
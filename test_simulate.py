@@ -0,0 +1,68 @@
+import io
+import json
+
+import pytest
+
+from battleships import SHIPS
+from bot import create_bot
+from simulate import main, parse_ships, play_game, simulate
+
+
+###############################################################################
+### SIMULATE
+###############################################################################
+
+def test_play_game():
+    "Checks that a bot game is played to the end and that the same seed yields the same game"
+    result = play_game(3, 42, 8, 8, SHIPS)
+    assert result == play_game(3, 42, 8, 8, SHIPS)
+    assert result['game'] == 3
+    assert result['hits'][result['winner']] == sum(length for _, length in SHIPS)
+    assert result['turns'] == sum(result['shots'].values())
+
+
+def test_simulate_jsonl():
+    "Checks that every game is written as one JSON line"
+    output = io.StringIO()
+    games, seconds = simulate(25, 1, SHIPS, chunk_size=10, output=output)
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert games == 25
+    assert [result['game'] for result in results] == list(range(25))
+
+
+def test_simulate_workers():
+    "Checks that the results do not depend on the number of workers"
+    outputs = [io.StringIO(), io.StringIO()]
+    simulate(12, 1, SHIPS, rows=6, cols=7, chunk_size=5, output=outputs[0])
+    simulate(12, 2, SHIPS, rows=6, cols=7, chunk_size=5, output=outputs[1])
+    assert outputs[0].getvalue() == outputs[1].getvalue()
+
+
+def test_simulate_nearby_seeds():
+    "Checks that simulations with nearby base seeds do not share games"
+    outputs = [io.StringIO(), io.StringIO()]
+    simulate(6, 1, SHIPS, seed=0, output=outputs[0])
+    simulate(6, 1, SHIPS, seed=1, output=outputs[1])
+    games = [[json.loads(line) for line in output.getvalue().splitlines()] for output in outputs]
+    for first, second in zip(games[0][1:], games[1]):
+        assert first['seed'] != second['seed']
+        assert (first['turns'], first['shots']) != (second['turns'], second['shots'])
+
+
+def test_simulate_workers_invalid(capfd):
+    "Checks that fewer than one worker is rejected by the command line"
+    for workers in ('0', '-2'):
+        with pytest.raises(SystemExit):
+            main(['--games', '1', '--workers', workers], SHIPS)
+    assert 'is not at least 1' in capfd.readouterr().err
+
+
+def test_parse_ships():
+    "Checks that fleets can be given on the command line"
+    assert parse_ships('Speedboat:2, Aircraft Carrier:5') == [('Speedboat', 2), ('Aircraft Carrier', 5)]
+
+
+def test_create_bot_unknown():
+    "Checks that creating an unknown bot raises a ValueError"
+    with pytest.raises(ValueError):
+        create_bot('perfect', 8, 8, SHIPS)
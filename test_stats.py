@@ -0,0 +1,187 @@
+import os
+import random
+from unittest.mock import Mock
+
+import pytest
+
+import battleships
+import ui
+from stats import GAME, RANKINGS, PlayerStats, WriteBehindStats, encode_game
+from test_battleships import PLACEMENT_INPUT, STDIN
+
+
+def random_game(rng, players):
+    "Returns the arguments of a random finished game between two of a number of players"
+    winner, loser = rng.sample([f'Player {i}' for i in range(players)], 2)
+    shots = {winner: rng.randint(17, 64), loser: rng.randint(1, 64)}
+    shots[loser] = min(shots[loser], shots[winner])
+    return winner, loser, shots, {winner: 17, loser: rng.randint(0, min(16, shots[loser]))}
+
+
+def assert_orders(stats):
+    "Checks that the order of every ranking is the one of a full sort"
+    for ranking, (_, descending) in RANKINGS.items():
+        ranked = [(stats.value(ranking, row), row) for row in range(len(stats.names))
+                  if stats.value(ranking, row) is not None]
+        ranked.sort(key=lambda entry: (-entry[0] if descending else entry[0], entry[1]))
+        assert list(stats.orders[ranking]) == [row for _, row in ranked]
+
+
+###############################################################################
+### PLAYER STATS
+###############################################################################
+
+def test_stats_orders(tmp_path):
+    "Checks that the orders kept while recording games are those of a full sort"
+    rng = random.Random(0)
+    stats = PlayerStats(str(tmp_path / 'stats.dat'))
+    for _ in range(300):
+        stats.record_game(*random_game(rng, 40))
+    assert_orders(stats)
+    reloaded = PlayerStats(str(tmp_path / 'stats.dat')).open()
+    assert reloaded.names == stats.names and reloaded.columns == stats.columns and reloaded.orders == stats.orders
+    assert reloaded.head_to_head == stats.head_to_head
+
+
+def test_stats_top_and_player(tmp_path):
+    "Checks the rankings, counters and head-to-head records of players"
+    stats = PlayerStats(str(tmp_path / 'stats.dat'))
+    stats.record_game('A', 'B', {'A': 20, 'B': 19}, {'A': 17, 'B': 10})
+    stats.record_game('B', 'C', {'B': 40, 'C': 39}, {'B': 17, 'C': 16})
+    stats.record_game('A', 'B', {'A': 30, 'B': 30}, {'A': 17, 'B': 5})
+    assert stats.top('wins', 2) == [('A', 2), ('B', 1)]
+    assert stats.top('games', 1, offset=1) == [('A', 2)]
+    assert stats.top('turns_to_win', 3) == [('A', 25), ('B', 40)]
+    assert stats.top('accuracy', 1) == [('A', 34 / 50)]
+    assert stats.player('B') == {'games': 3, 'wins': 1, 'shots': 89, 'hits': 32, 'win_turns': 40,
+                                 'accuracy': 32 / 89, 'turns_to_win': 40.0}
+    assert stats.player('D') is None
+    assert stats.versus('A', 'B') == (2, 0)
+    assert stats.versus('C', 'B') == (0, 1)
+    with pytest.raises(ValueError):
+        stats.top('score', 10)
+
+
+def test_stats_log_and_compaction(tmp_path):
+    "Checks that games are appended to the log, replayed and compacted into a snapshot"
+    path = str(tmp_path / 'stats.dat')
+    stats = PlayerStats(path, compact_records=3)
+    stats.record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 3})
+    size = os.path.getsize(path)
+    for _ in range(3):
+        stats.record_game('B', 'A', {'A': 17, 'B': 17}, {'A': 3, 'B': 17})
+    assert stats.records == 3
+    assert os.path.getsize(path) > size
+    assert PlayerStats(path).open().player('B')['wins'] == 3
+    stats.record_game('C', 'A', {'A': 17, 'C': 17}, {'A': 3, 'C': 17})
+    assert stats.records == 0
+    reloaded = PlayerStats(path).open()
+    assert reloaded.records == 0
+    assert reloaded.top('wins', 3) == [('B', 3), ('A', 1), ('C', 1)]
+
+
+def test_stats_shared_file(tmp_path):
+    "Checks that statistics sharing a file read each other's games before writing"
+    path = str(tmp_path / 'stats.dat')
+    first, second = PlayerStats(path, compact_records=2), PlayerStats(path, compact_records=2)
+    first.record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 0})
+    for _ in range(3):
+        second.record_game('B', 'A', {'A': 17, 'B': 17}, {'A': 0, 'B': 17})  # The log is compacted, the file replaced
+    first.record_game('A', 'C', {'A': 17, 'C': 17}, {'A': 17, 'C': 0})
+    assert first.top('wins', 3) == [('B', 3), ('A', 2), ('C', 0)]
+    assert second.top('games', 1) == [('A', 5)]
+    assert_orders(second)
+
+
+def test_stats_torn_record(tmp_path):
+    "Checks that a record that was not completely written is ignored and overwritten"
+    path = str(tmp_path / 'stats.dat')
+    stats = PlayerStats(path)
+    stats.record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 0})
+    with open(path, 'ab') as file:
+        file.write(encode_game('C', 'D', {'C': 17, 'D': 17}, {'C': 17, 'D': 0})[:GAME.size + 1])
+    assert PlayerStats(path).open().names == ['A', 'B']
+    stats.record_game('B', 'A', {'A': 17, 'B': 17}, {'A': 0, 'B': 17})
+    assert PlayerStats(path).open().versus('A', 'B') == (1, 1)
+
+
+def test_stats_invalid_file(tmp_path):
+    "Checks that an invalid file yields no players and is replaced by the next game"
+    path = str(tmp_path / 'stats.dat')
+    with open(path, 'wb') as file:
+        file.write(b'no stats')
+    assert PlayerStats(path).open().names == []
+    PlayerStats(path).record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 0})
+    assert PlayerStats(path).open().top('wins', 10) == [('A', 1), ('B', 0)]
+
+
+def test_stats_name_too_long(tmp_path):
+    "Checks that a name too long for a record raises a ValueError without changing the statistics"
+    stats = PlayerStats(str(tmp_path / 'stats.dat'))
+    with pytest.raises(ValueError):
+        stats.record_game('A' * 70000, 'B', {'A' * 70000: 17, 'B': 17}, {'A' * 70000: 17, 'B': 0})
+    assert stats.names == []
+
+
+def test_write_behind_stats(tmp_path):
+    "Checks that finished games are recorded in the background, before the statistics are read and when closed"
+    path = str(tmp_path / 'stats.dat')
+    cache = WriteBehindStats(PlayerStats(path), delay=60)
+    cache.record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 0})
+    cache.record_game('A', 'C', {'A': 17, 'C': 17}, {'A': 17, 'C': 0})
+    assert PlayerStats(path).open().names == []
+    assert cache.top('wins', 1) == [('A', 2)]
+    cache.record_game('C', 'B', {'B': 17, 'C': 17}, {'B': 0, 'C': 17})
+    with pytest.raises(ValueError):
+        cache.record_game('A' * 70000, 'B', {'A' * 70000: 17, 'B': 17}, {'A' * 70000: 17, 'B': 0})
+    cache.close()
+    stats = PlayerStats(path).open()
+    assert stats.top('games', 3) == [('A', 2), ('B', 2), ('C', 2)]
+
+
+###############################################################################
+### GAME AND DISPLAY
+###############################################################################
+
+def test_main_records_stats_on_exit(monkeypatch, tmp_path):
+    "Checks that the games finished in main are recorded once the program exits"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[1, 3]))
+
+    def play_battleships(bot=None, stats=None):
+        stats.record_game('A', 'B', {'A': 17, 'B': 17}, {'A': 17, 'B': 3})
+        return 'A'
+
+    monkeypatch.setattr(battleships, 'play_battleships', play_battleships)
+    battleships.main()
+    assert PlayerStats('stats.dat').open().versus('A', 'B') == (1, 0)
+
+
+def test_play_battleships_records_stats(monkeypatch):
+    "Checks that a finished game is added to the statistics of both players"
+    monkeypatch.setattr('sys.stdin', STDIN(['A', 'B'] + PLACEMENT_INPUT + ["1 1", "1 1", "1 2", "ENTER"]))
+    stats = Mock()
+    assert battleships.play_battleships([("Speedboat", 2), ], stats=stats) == 'A'
+    stats.record_game.assert_called_once_with('A', 'B', {'A': 2, 'B': 1}, {'A': 2, 'B': 1})
+
+
+def test_scoreboard_stats_views(monkeypatch, capfd, tmp_path):
+    "Checks that the rankings of the statistics are views of the scoreboard screen"
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(battleships, 'menu', Mock(side_effect=[2, 3]))
+    stats = PlayerStats('stats.dat')
+    stats.record_game('A', 'B', {'A': 20, 'B': 19}, {'A': 17, 'B': 10})
+    stats.record_game('B', 'A', {'A': 30, 'B': 30}, {'A': 12, 'B': 17})
+    monkeypatch.setattr('sys.stdin', STDIN(['v', '8', '']))
+    battleships.main()
+    assert capfd.readouterr().out.endswith('PLAYERS BY ACCURACY\n\n1. A (58.0% accuracy)\n2. B (55.1% accuracy)\n\n'
+                                           'Press ENTER to return to the menu or v to change the view: ')
+
+
+def test_display_scoreboard_column(capfd):
+    "Checks that the scoreboard shows any statistic"
+    ui.display_scoreboard([('A', 0.5), ('B', 0.25)], column='accuracy')
+    ui.display_scoreboard([('C', 12.0)], 3, column='turns_to_win')
+    ui.display_scoreboard([('D', 7)], column='games')
+    assert capfd.readouterr().out == ('1. A (50.0% accuracy)\n2. B (25.0% accuracy)\n\n'
+                                      '3. C (12.0 turns to win)\n\n1. D (7 games)\n\n')
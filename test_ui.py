@@ -0,0 +1,267 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import ui
+from board import Board
+from test_battleships import grid_empty
+
+
+def paint(screen, output):
+    "Applies output to a screen given as list of lines, understands the escape sequences of the ui"
+    line, column = 0, 0
+    for sequence, text in re.findall(r'(\033c|\033\[[0-9;]*[A-Za-z])|([^\033])', output):
+        if sequence == '\033c':
+            screen[:], line, column = [''], 0, 0
+        elif sequence.endswith('H'):
+            line, column = [int(n) - 1 for n in sequence[2:-1].split(';')]
+        elif sequence == '\033[K':
+            screen[line] = screen[line][:column]
+        elif sequence == '\033[J':
+            screen.extend([''] * (line + 1 - len(screen)))
+            screen[line] = screen[line][:column]
+            del screen[line + 1:]
+        elif text == '\n':
+            line, column = line + 1, 0
+        else:
+            screen.extend([''] * (line + 1 - len(screen)))
+            screen[line] = screen[line][:column].ljust(column) + text + screen[line][column + 1:]
+            column += 1
+    while screen and not screen[-1]:
+        screen.pop()
+    return screen
+
+
+class Output:
+    "Stands in for standard output and records every write"
+
+    def __init__(self):
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+
+    def flush(self):
+        pass
+
+    def isatty(self):
+        return False
+
+
+class Terminal(Output):
+    "Output that claims to be a terminal"
+
+    def isatty(self):
+        return True
+
+
+###############################################################################
+### FRAMES
+###############################################################################
+
+def test_display_grid_single_write(monkeypatch):
+    "Checks that a grid is written with one write"
+    output = Output()
+    monkeypatch.setattr('sys.stdout', output)
+    grid = grid_empty(3, 2)
+    grid[1][0] = True
+    ui.display_grid(grid)
+    assert output.writes == [
+        "    1   2  \n"
+        "  +---+---+\n"
+        "1 |   |   |\n"
+        "  +---+---+\n"
+        "2 | 0 |   |\n"
+        "  +---+---+\n"
+        "3 |   |   |\n"
+        "  +---+---+\n"
+        "\n"
+    ]
+
+
+def test_display_game_single_write(monkeypatch):
+    "Checks that a game is written with one write and shows hits and misses only"
+    output = Output()
+    monkeypatch.setattr('sys.stdout', output)
+    board = Board(2, 2)
+    board.place(board.line_mask(0, 0, 0, 1))
+    board.fire(0, 0)
+    board.fire(1, 1)
+    ui.display_game(board, grid_empty(2, 2))
+    assert output.writes == [
+        "    1   2             1   2  \n"
+        "  +---+---+   |     +---+---+\n"
+        "1 | X |   |   |   1 |   |   |\n"
+        "  +---+---+   |     +---+---+\n"
+        "2 |   | 0 |   |   2 |   |   |\n"
+        "  +---+---+   |     +---+---+\n"
+        "\n"
+    ]
+
+
+def test_frame_parts_cached():
+    "Checks that the strings of a board size are only built once"
+    assert ui.frame_parts(5, 7) is ui.frame_parts(5, 7)
+
+
+def test_frame_labels_past_99():
+    "Checks that rows and columns stay aligned on boards with more than 99 rows"
+    grid_header, grid_line, grid_rows = ui.frame_parts(2, 2, 98, 99, 3)[:3]
+    assert grid_header == "    100 101 \n"
+    assert grid_rows[0] == "   +---+---+\n99 | {} | {} |\n"
+    assert grid_rows[1] == "   +---+---+\n100| {} | {} |\n"
+
+
+###############################################################################
+### VIEWPORT
+###############################################################################
+
+def test_view_window(monkeypatch):
+    "Checks that large boards are cropped to a window around the focus within the board"
+    monkeypatch.setattr(ui, 'view_size', (10, 20))
+    assert ui.view_window(8, 8, 2) == (0, 0, 8, 8)
+    assert ui.view_window(100, 100, 2) == (0, 0, 10, 20)
+    assert ui.view_window(100, 100, 2, (50, 50)) == (45, 40, 10, 20)
+    assert ui.view_window(100, 100, 2, (99, 99)) == (90, 80, 10, 20)
+
+
+def test_view_window_terminal(monkeypatch):
+    "Checks that only boards larger than the terminal are cropped, and never if the output is not a terminal"
+    monkeypatch.setenv('LINES', '40')
+    monkeypatch.setenv('COLUMNS', '100')
+    assert ui.view_window(200, 200, 2) == (0, 0, 200, 200)
+    monkeypatch.setattr('sys.stdout', Terminal())
+    assert ui.view_window(8, 8, 2) == (0, 0, 8, 8)
+    top, left, rows, cols = ui.view_window(200, 200, 2, (100, 100))
+    assert (rows, cols) == (11, 10)
+    assert top <= 100 < top + rows and left <= 100 < left + cols
+
+
+def test_display_game_viewport(monkeypatch):
+    "Checks that a cropped game shows the cells around the focus and an overview of both boards"
+    output = Output()
+    monkeypatch.setattr('sys.stdout', output)
+    monkeypatch.setattr(ui, 'view_size', (2, 3))
+    board = Board(12, 12)
+    board.place(board.line_mask(10, 10, 10, 11))
+    board.fire(0, 0)
+    board.fire(10, 10)
+    ui.display_game(board, Board(12, 12), board.last_shot)
+    frame = output.writes[0].split('\n')
+    assert frame[0] == "   10  11  12            10  11  12  "
+    assert frame[2] == "10|   |   |   |   |   10|   |   |   |"
+    assert frame[4] == "11|   | X |   |   |   11|   |   |   |"
+    assert frame[7] == "Overview, one character per 2x2 cells"
+    assert frame[8] == "   0....." + " " * 16 + "......"
+    assert frame[12] == "   ....::" + " " * 16 + "....::"
+    assert frame[13] == "   ....:X" + " " * 16 + "....::"
+
+
+def test_overview_backends():
+    "Checks that boards and plain grids are summarized alike"
+    board = Board(5, 5)
+    board.place(board.line_mask(0, 3, 0, 4))
+    board.place(board.line_mask(4, 0, 4, 1))
+    board.fire(0, 4)
+    board.fire(2, 2)
+    board.fire(4, 4)
+    expected = [[None, True, False], [None, 'miss', None], [True, None, 'miss']]
+    assert board.overview(2) == expected
+    assert ui.overview(board.to_grid(), 2) == expected
+
+
+###############################################################################
+### DIFFERENTIAL RENDERING
+###############################################################################
+
+def test_diff_rendering_disabled_by_default(monkeypatch, capfd):
+    "Checks that turns are painted in full unless differential rendering is enabled"
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    assert capfd.readouterr().out.count('\033c') == 2
+
+
+def test_diff_rendering_matches_full_repaint(monkeypatch, capfd):
+    "Checks that the changes painted over the last turn give the same screen as a full repaint"
+    monkeypatch.setattr(ui, 'renderer', ui.DiffRenderer())
+    monkeypatch.setenv('LINES', '40')
+    grid_a, grid_b = grid_empty(12, 12), grid_empty(12, 12)
+    grid_b[10][11] = 'miss'
+    ui.display_turn('A', True, grid_a, grid_b)
+    first = capfd.readouterr().out
+    grid_a[11][0] = False
+    ui.display_turn('B', False, grid_a, grid_b)
+    changes = capfd.readouterr().out
+    assert '\033c' not in changes
+    assert len(changes) < 100
+
+    ui.display_headline('Battleships')
+    ui.display_message(ui.turn_message('B', False))
+    ui.display_game(grid_a, grid_b)
+    full = capfd.readouterr().out
+    assert paint(paint([], first), changes) == paint([], full)
+
+
+def test_diff_rendering_invalidated(monkeypatch, capfd):
+    "Checks that any other screen, a different board size and a too small terminal cause a full repaint"
+    monkeypatch.setattr(ui, 'renderer', ui.DiffRenderer())
+    monkeypatch.setenv('LINES', '20')
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    ui.display_headline('menu battleships')
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    ui.display_turn('A', True, grid_empty(4, 4), grid_empty(4, 4))
+    ui.display_turn('A', True, grid_empty(4, 4), grid_empty(4, 4))
+    assert capfd.readouterr().out.count('\033c') == 4
+    ui.display_turn('A', True, grid_empty(6, 6), grid_empty(6, 6))
+    ui.display_turn('A', True, grid_empty(6, 6), grid_empty(6, 6))
+    assert capfd.readouterr().out.count('\033c') == 2
+
+
+###############################################################################
+### CLEARING
+###############################################################################
+
+def test_clear_strategies(monkeypatch, capfd):
+    "Checks the escape sequences written by each clear strategy"
+    for strategy, expected in [('reset', '\033c\n'), ('erase', '\033[H\033[2J\n'), ('none', ''), ('auto', '')]:
+        monkeypatch.setattr(ui, 'clear_strategy', strategy)
+        ui.display_headline('menu')
+        assert capfd.readouterr().out == expected + 'MENU\n\n'
+
+
+def test_clear_auto_terminal(monkeypatch):
+    "Checks that the auto strategy erases the display of a terminal"
+    output = Terminal()
+    monkeypatch.setattr('sys.stdout', output)
+    monkeypatch.setattr(ui, 'clear_strategy', 'auto')
+    assert ui.clear_sequence() == '\033[H\033[2J'
+
+
+def test_clear_default_auto():
+    "Checks that the screen is erased or not cleared at all by default, not reset"
+    environment = {name: value for name, value in os.environ.items() if name != 'BATTLESHIPS_CLEAR'}
+    result = subprocess.run([sys.executable, '-c', 'import ui; print(ui.clear_strategy)'], env=environment,
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True)
+    assert result.stdout == 'auto\n'
+
+
+def test_set_clear_strategy(monkeypatch):
+    "Checks that only known strategies can be selected"
+    monkeypatch.setattr(ui, 'clear_strategy', 'reset')
+    ui.set_clear_strategy('erase')
+    assert ui.clear_strategy == 'erase'
+    with pytest.raises(ValueError):
+        ui.set_clear_strategy('cls')
+    assert ui.clear_strategy == 'erase'
+
+
+def test_diff_rendering_without_clearing(monkeypatch, capfd):
+    "Checks that turns are painted in full if the screen is not cleared"
+    monkeypatch.setattr(ui, 'renderer', ui.DiffRenderer())
+    monkeypatch.setattr(ui, 'clear_strategy', 'none')
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    ui.display_turn('A', True, grid_empty(3, 3), grid_empty(3, 3))
+    assert '\033' not in capfd.readouterr().out
@@ -1,48 +1,309 @@
+import functools
 import sys
 import os
+import shutil
 
+from instrument import timed
 
+# Escape sequences of the differential renderer
+ERASE_LINE_END = '\033[K'
+ERASE_BELOW = '\033[J'
+
+TURN_HEADLINE = 'Battleships'
+
+# How the statistics of the players are shown on the scoreboard, others as the value followed by the name
+STAT_FORMATS = {
+    'accuracy': '{:.1%} accuracy',
+    'turns_to_win': '{:.1f} turns to win',
+}
+
+# Boards larger than the terminal are shown as a window of cells and an overview of at most this many rows
+OVERVIEW_ROWS = 6
+
+view_size = None  # (rows, cols) of the cells shown of each grid at most, None to fit the terminal
+
+# Escape sequences of the ways to clear the screen, None does not clear it
+CLEAR_SEQUENCES = {
+    'reset': '\033c',  # Full terminal reset, slow on many terminal emulators
+    'erase': '\033[H\033[2J',  # Move the cursor home and erase the display
+    'none': None,
+}
+CLEAR_STRATEGIES = ('auto',) + tuple(CLEAR_SEQUENCES)
+
+clear_strategy = 'auto'  # Selected with set_clear_strategy or the BATTLESHIPS_CLEAR environment variable
+
+
+def set_clear_strategy(strategy):
+    """
+    Selects how the screen is cleared.
+
+    :strategy: 'reset' for a full terminal reset, 'erase' to erase the display, 'none' to never clear,
+               or 'auto' to erase the display if standard output is a terminal and not clear it otherwise.
+    """
+    global clear_strategy
+
+    if strategy not in CLEAR_STRATEGIES:
+        raise ValueError(f'unknown clear strategy {strategy!r}')
+
+    clear_strategy = strategy
+
+
+if os.environ.get('BATTLESHIPS_CLEAR'):
+    set_clear_strategy(os.environ['BATTLESHIPS_CLEAR'])
+
+
+def clear_sequence():
+    """
+    Returns the escape sequence clearing the screen with the selected strategy, None if the screen is not cleared.
+    """
+    if clear_strategy == 'auto':
+        return CLEAR_SEQUENCES['erase'] if sys.stdout.isatty() else None
+
+    return CLEAR_SEQUENCES[clear_strategy]
+
+
+def enable_virtual_terminal():
+    """
+    Enables escape sequences in the Windows console, supported since Windows 10.
+    """
+    import ctypes
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(-11)  # Standard output
+    mode = ctypes.c_uint32()
+
+    if kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        kernel32.SetConsoleMode(handle, mode.value | 0x0004)  # ENABLE_VIRTUAL_TERMINAL_PROCESSING
+
+
+if sys.platform.startswith('win'):
+    enable_virtual_terminal()
+
+
+@timed('clear')
 def __clear():
     """
-    Clears the screen
+    Clears the screen with the selected strategy, see set_clear_strategy.
     """
-    if sys.platform.startswith('win'):
-        os.system('cls')
-    else:
-        print('\033c')
+    sequence = clear_sequence()
+
+    if sequence is not None:
+        print(sequence)
+
+
+@functools.lru_cache(maxsize=32)
+def frame_parts(rows, cols, top=0, left=0, label_width=2):
+    """
+    Builds the strings of a frame that only depend on the part of the board shown. They are cached,
+    so a frame only needs to fill in the cell symbols.
+
+    :rows: Number of rows shown.
+    :cols: Number of columns shown.
+    :top: First row shown.
+    :left: First column shown.
+    :label_width: Width of the row labels, the number of digits of the last row of the board.
+    :return: Tuple of the column header, the horizontal line and the template of every row
+             of a single grid, followed by the same three for two grids side by side.
+    """
+    numbers = ''.join([f'{i:2d}'.ljust(4) for i in range(left + 1, left + cols + 1)])  # Column numbers
+    cells = ' | '.join(['{}'] * cols) + ' |'
+    labels = [str(row + 1).ljust(label_width) + '| ' for row in range(top, top + rows)]
+    margin = ' ' * label_width
+
+    grid_header = margin + ' ' + numbers + '\n'
+    grid_line = margin + '+' + '---+' * cols + '\n'
+    grid_rows = [grid_line + label + cells + '\n' for label in labels]
+
+    game_header = margin + ' ' + numbers + margin + '        ' + numbers + '\n'
+    game_line = margin + '+' + '---+' * cols + '   |   ' + margin + '+' + '---+' * cols + '\n'
+    game_rows = [game_line + label + cells + '   |   ' + label + cells + '\n' for label in labels]
+
+    return grid_header, grid_line, grid_rows, game_header, game_line, game_rows
+
+
+def write_frame(frame):
+    """
+    Writes a whole frame with a single write and flush, so the terminal does not show half-drawn frames.
+
+    :frame: The frame as one string.
+    """
+    sys.stdout.write(frame)
+    sys.stdout.flush()
+
+
+def grid_size(grid):
+    """
+    Returns the number of rows and columns of a grid, boards know them without decoding a row.
+    """
+    if hasattr(grid, 'cols'):
+        return grid.rows, grid.cols
+
+    return len(grid), len(grid[0])
+
+
+def row_values(grid, row, left, cols):
+    """
+    Returns the values of some cells of a row of a grid, boards only decode these cells.
+    """
+    if hasattr(grid, 'row_slice'):
+        return grid.row_slice(row, left, left + cols)
+
+    return grid[row][left:left + cols]
+
+
+def label_width(rows):
+    """
+    Returns the width of the row labels of a grid, at least 2 for compatibility.
+    """
+    return max(2, len(str(rows)))
+
+
+def view_window(rows, cols, grids, focus=None):
+    """
+    Chooses the part of a board to show. Boards that fit the terminal are shown whole, larger boards
+    are cropped to a window around the focus that fits the terminal together with the overview.
+    Output that is not a terminal is never cropped, unless view_size is set.
+
+    :rows: Number of rows of the board.
+    :cols: Number of columns of the board.
+    :grids: Number of grids shown side by side, 1 or 2.
+    :focus: Tuple (row, col) the window is centered on, e.g. the last shot, None for the top left corner.
+    :return: Tuple (top, left, rows, cols) of the window.
+    """
+    size = view_size
+
+    if size is None:
+        if not sys.stdout.isatty():
+            return 0, 0, rows, cols
+
+        columns, lines = shutil.get_terminal_size()
+        # A grid takes four characters per column and two lines per row plus its labels and lines
+        width = (columns - grids * (label_width(rows) + 1) - 7 * (grids - 1)) // (4 * grids)
+        if 2 * rows + 4 <= lines and cols <= width:
+            return 0, 0, rows, cols
+
+        # Leave room for the headline and message of a turn, the overview and the prompt
+        size = max(1, (lines - 11 - OVERVIEW_ROWS) // 2), max(1, width)
+
+    height, width = min(rows, size[0]), min(cols, size[1])
+    row, col = focus or (0, 0)
+    top = min(max(0, row - height // 2), rows - height)
+    left = min(max(0, col - width // 2), cols - width)
+
+    return top, left, height, width
+
 
+def overview(grid, block):
+    """
+    Summarizes square blocks of cells of a grid, boards do this without decoding every cell.
 
-def display_grid(grid):
+    :block: Number of rows and columns of a block.
+    :return: List of rows of block values: False if a ship cell in the block was hit, 'miss' if
+             cells were missed, True if the block contains intact ship cells and None otherwise.
+    """
+    if hasattr(grid, 'overview'):
+        return grid.overview(block)
+
+    rows, cols = grid_size(grid)
+    rank = {False: 3, 'miss': 2, True: 1}  # The most important value of a block wins
+    values = [[None] * -(-cols // block) for _ in range(0, rows, block)]
+
+    for row in range(rows):
+        for col, value in enumerate(grid[row]):
+            current = values[row // block][col // block]
+            if rank.get(value, 0) > rank.get(current, 0):
+                values[row // block][col // block] = value
+
+    return values
+
+
+def overview_frame(grids, window, symbols):
+    """
+    Builds the overview of cropped grids, one character per block of cells. Blocks inside
+    the window shown are marked with ':' unless they show a hit or a miss.
+
+    :grids: List of the grids shown side by side.
+    :window: Tuple (top, left, rows, cols) of the window shown.
+    :symbols: Dictionary of the symbols of the block values, other values are shown as '.'.
+    :return: The overview as string.
+    """
+    rows, cols = grid_size(grids[0])
+    top, left, height, width = window
+    margin = label_width(rows)
+
+    # The overview is as wide as a grid and at most OVERVIEW_ROWS high
+    block = max(1, -(-rows // OVERVIEW_ROWS), -(-cols // (4 * width + margin)))
+    blocks = [overview(grid, block) for grid in grids]
+
+    lines = [f'Overview, one character per {block}x{block} cells\n']
+    for block_row in range(len(blocks[0])):
+        parts = []
+        for values in blocks:
+            part = ''
+            for block_col, value in enumerate(values[block_row]):
+                inside = (top // block <= block_row <= (top + height - 1) // block
+                          and left // block <= block_col <= (left + width - 1) // block)
+                part += symbols.get(value, ':' if inside else '.')
+            parts.append(' ' * (margin + 1) + part.ljust(4 * width + 7))
+        lines.append(''.join(parts).rstrip() + '\n')
+
+    return ''.join(lines) + '\n'
+
+
+@timed('render')
+def display_grid(grid, focus=None):
     """
     Displays a grid including column numbers, ships, and horizontal lines.
-    Appends an empty line.
+    Appends an empty line. Grids larger than the terminal are shown as a window around the focus and an overview.
 
     :grid: The grid as a two-dimensional array of rows and per-row column values,
            from left to right and bottom to top. True indicates a ship,
            None indicates an empty cell.
+    :focus: Tuple (row, col) of the cell to show if the grid is cropped.
     """
-    rows, cols = len(grid), len(grid[0])
-    print('   ' + ''.join([f'{i:2d}  ' for i in range(1, cols + 1)]))  # Display column numbers
+    rows, cols = grid_size(grid)
+    window = top, left, height, width = view_window(rows, cols, 1, focus)
+    header, horizontal_line, row_templates = frame_parts(height, width, top, left, label_width(rows))[:3]
 
-    # Horizontal line
-    horizontal_line = '  +' + '---+' * cols
+    frame = [header]
+    for row in range(height):
+        frame.append(row_templates[row].format(*['0' if v else ' ' for v in row_values(grid, top + row, left, width)]))
+    frame.append(horizontal_line + '\n')
 
-    for row in range(rows):
-        row_symbols = ['0' if v else ' ' for v in grid[row]]
-        print(horizontal_line)
-        if row < 9:
-            print(str(row + 1) + ' | ' + ' | '.join(row_symbols) + ' |')
-        else:
-            print(str(row + 1) + '| ' + ' | '.join(row_symbols) + ' |')
+    if (height, width) != (rows, cols):
+        frame.append(overview_frame([grid], window, {True: '0', False: '0'}))
+
+    write_frame(''.join(frame))
+
+
+def game_frame(gridA, gridB, focus=None):
+    """
+    Builds the frame displayed by display_game.
 
-    print(horizontal_line)
-    print('')
+    :return: The frame as string.
+    """
+    rows, cols = grid_size(gridA)
+    window = top, left, height, width = view_window(rows, cols, 2, focus)
+    header, horizontal_line, row_templates = frame_parts(height, width, top, left, label_width(rows))[3:]
+    symbols = {False: 'X', 'miss': '0'}  # Everything else is shown as an empty cell
+
+    frame = [header]
+    for row in range(height):
+        values = row_values(gridA, top + row, left, width) + row_values(gridB, top + row, left, width)
+        frame.append(row_templates[row].format(*[symbols.get(v, ' ') for v in values]))
+    frame.append(horizontal_line + '\n')
+
+    if (height, width) != (rows, cols):
+        frame.append(overview_frame([gridA, gridB], window, symbols))
 
+    return ''.join(frame)
 
-def display_game(gridA, gridB):
+
+@timed('render')
+def display_game(gridA, gridB, focus=None):
     """
     Displays the game, where the current grids of both players are placed side by side.
-    Appends an empty line.
+    Appends an empty line. Grids larger than the terminal are shown as a window around the focus and an overview.
 
     :gridA: The grid of player_a as a two-dimensional array of rows and per-row column values,
             from top to bottom and left to right. False indicates a hit ship and is represented by an 'X'
@@ -53,28 +314,97 @@ def display_game(gridA, gridB):
             from top to bottom and left to right. False indicates a hit ship and is represented by an 'X'
             'miss' indicates the cell was empty and shot at and is represented by a '0'
             True and None are represented by ' ' (empty cell), they are intact ship cells and empty cells not yet hit.
+
+    :focus: Tuple (row, col) of the cell to show if the grids are cropped, e.g. the last shot.
     """
-    rows, cols = len(gridA), len(gridB[0])
-    print('   ' + ''
-          .join([f'{i:2d}  ' for i in range(1, cols + 1)])
-          + '          ' + ''.join([f'{i:2d}  ' for i in range(1, cols + 1)]))  # Display column numbers
+    write_frame(game_frame(gridA, gridB, focus))
 
-    # Horizontal line
-    horizontal_line = '  +' + '---+' * cols + "   |   " + '  +' + '---+' * cols
 
-    for row in range(rows):
-        row_symbolsA = ['X' if v == False else '0' if v == 'miss' else ' ' for v in gridA[row]]
-        row_symbolsB = ['X' if v == False else '0' if v == 'miss' else ' ' for v in gridB[row]]
-        print(horizontal_line)
-        if row < 9:
-            print(str(row + 1) + ' | ' + ' | '.join(row_symbolsA) + ' |' + '   |   '
-                  + str(row + 1) + ' | ' + ' | '.join(row_symbolsB) + ' |')
+class DiffRenderer:
+    """
+    Repaints the screen of a turn by rewriting only what changed since the last turn.
+
+    The first turn is painted in full, like display_turn_start and display_game do.
+    The renderer keeps the painted lines, and on the next turn moves the cursor
+    with ANSI escape sequences to the changed part of every changed line and
+    rewrites only that, so a turn costs a few bytes instead of the whole frame.
+    Any other screen, a different number of lines, a screen taller than the
+    terminal or a screen that is not cleared causes a full repaint.
+    """
+
+    def __init__(self):
+        self.lines = None  # Lines of the screen as painted by the last turn, None if the screen has to be repainted
+
+
+    def invalidate(self):
+        """
+        Forces a full repaint on the next turn, called whenever something else is displayed.
+        """
+        self.lines = None
+
+
+    def display_turn(self, player_name, is_player_a, gridA, gridB, focus=None):
+        """
+        Displays the start of a turn and the game, see display_turn_start and display_game.
+        """
+        status = turn_message(player_name, is_player_a)
+        frame = game_frame(gridA, gridB, focus)
+
+        # Clearing the screen leaves an empty line, the prompt goes on the last line
+        lines = ['', TURN_HEADLINE.upper(), '', status, ''] + frame.split('\n')
+
+        if (self.lines is None or clear_sequence() is None or len(lines) != len(self.lines)
+                or len(lines) > shutil.get_terminal_size().lines):
+            display_headline(TURN_HEADLINE)
+            display_message(status)
+            write_frame(frame)
         else:
-            print(str(row + 1) + '| ' + ' | '.join(row_symbolsA) + ' |' + '   |   '
-                  + str(row + 1) + '| ' + ' | '.join(row_symbolsB) + ' |')
+            write_frame(self.changes(lines))
+
+        self.lines = lines
+
 
-    print(horizontal_line)
-    print('')
+    @timed('render')
+    def changes(self, lines):
+        """
+        Builds the escape sequences rewriting the changed parts of the lines.
+
+        :lines: Lines of the screen, as many as painted last.
+        :return: String to write to the terminal.
+        """
+        changes = []
+
+        for number, (old, new) in enumerate(zip(self.lines, lines), 1):
+            if old != new:
+                start = len(os.path.commonprefix([old, new]))
+                if len(old) == len(new):
+                    end = len(new) - len(os.path.commonprefix([old[:start - 1:-1], new[:start - 1:-1]]))
+                    changes.append(cursor(number, start + 1) + new[start:end])
+                else:
+                    changes.append(cursor(number, start + 1) + new[start:] + ERASE_LINE_END)
+
+        # Erase the prompts and inputs of the last turn and put the cursor where the prompt goes
+        changes.append(cursor(len(lines), 1) + ERASE_BELOW)
+
+        return ''.join(changes)
+
+
+renderer = None  # DiffRenderer if differential rendering is enabled
+
+
+def enable_diff_rendering(enabled=True):
+    """
+    Enables or disables differential rendering of turns, see DiffRenderer.
+    """
+    global renderer
+    renderer = DiffRenderer() if enabled else None
+
+
+def cursor(line, column):
+    """
+    Returns the escape sequence moving the cursor to a line and column, both starting at 1.
+    """
+    return f'\033[{line};{column}H'
 
 
 def display_headline(headline):
@@ -83,6 +413,9 @@ def display_headline(headline):
 
     :headline: Headline string to display.
     """
+    if renderer is not None:
+        renderer.invalidate()
+
     __clear()
     print(headline.upper(), '\n', sep='')
 
@@ -105,18 +438,37 @@ def display_message(message):
     print(message, '\n', sep='')
 
 
-def display_scoreboard(scoreboard):
+def display_scoreboard(scoreboard, first_rank=1, column=None):
     """
     Displays the scoreboard in descending order.
 
-    :scoreboard: The scoreboard as dictionary of player names and their scores as integers.
+    :scoreboard: The scoreboard as dictionary of player names and their scores as integers,
+                 or a page of it as list of bi-tuples (name, score) in descending order.
+    :first_rank: Rank of the first player, for pages after the first one.
+    :column: Name of the statistic shown instead of the score, e.g. 'accuracy', see STAT_FORMATS.
     """
     if len(scoreboard) == 0:
         display_message('no scores available')
     else:
         # Descendingly sorted list of bi-tuple (name, score)
-        highscore = sorted(scoreboard.items(), key=lambda x: x[1], reverse=True)
-        display_message('\n'.join([f'{i + 1}. {name} ({score})' for i, (name, score) in enumerate(highscore)]))
+        if isinstance(scoreboard, dict):
+            highscore = sorted(scoreboard.items(), key=lambda x: x[1], reverse=True)
+        else:
+            highscore = scoreboard
+        display_message('\n'.join([f'{first_rank + i}. {name} ({format_stat(score, column)})'
+                                   for i, (name, score) in enumerate(highscore)]))
+
+
+def format_stat(value, column=None):
+    """
+    Formats a score or a statistic of a player for the scoreboard.
+
+    :column: Name of the statistic, None for a score.
+    """
+    if column is None:
+        return str(value)
+
+    return STAT_FORMATS.get(column, '{} ' + column.replace('_', ' ')).format(value)
 
 
 def display_turn_start(player_name, is_player_a):
@@ -127,8 +479,33 @@ def display_turn_start(player_name, is_player_a):
     :player_name: Name of the player.
     :is_player_a: Boolean that is true if the player is player A.
     """
-    display_headline('Battleships')
-    display_message(f"{player_name}, it is your turn! Attack the {'right' if is_player_a else 'left'} board.")
+    display_headline(TURN_HEADLINE)
+    display_message(turn_message(player_name, is_player_a))
+
+
+def turn_message(player_name, is_player_a):
+    """
+    Returns the message telling a player that it is their turn and which board to attack.
+    """
+    return f"{player_name}, it is your turn! Attack the {'right' if is_player_a else 'left'} board."
+
+
+def display_turn(player_name, is_player_a, gridA, gridB, focus=None):
+    """
+    Displays the start of a turn and the game, only the changes since the last turn if differential
+    rendering is enabled.
+
+    :player_name: Name of the player.
+    :is_player_a: Boolean that is true if the player is player A.
+    :gridA: The grid of player_a, see display_game.
+    :gridB: The grid of player_b, see display_game.
+    :focus: Tuple (row, col) of the cell to show if the grids are cropped, e.g. the last shot.
+    """
+    if renderer is not None:
+        renderer.display_turn(player_name, is_player_a, gridA, gridB, focus)
+    else:
+        display_turn_start(player_name, is_player_a)
+        display_game(gridA, gridB, focus)
 
 
 def prompt(message):